@@ -1,9 +1,90 @@
 """
 file: EN 300 220-1 class for handling standard-specific test parameters
 author: rueck.joshua@gmail.com
-last updated: 02/07/2024
+last updated: 19/10/2026
 """
 
+import functools
+import numpy as np
+
+# spectral mask of the operating channel as offsets in multiples of the OCW and limits in dBm
+OC_MASK_OFFSETS = np.array([-2.5, -0.5, -0.5, 0.5, 0.5, 2.5])
+OC_MASK_LIMITS = np.array([-36, 0, 14, 14, 0, -36])
+
+# spectral mask of the operational frequency band as offsets in Hz to the lower/upper band edge and limits in dBm
+OFB_MASK_OFFSETS = np.array([-400000, -200000, 0, 0, 0, 0, 200000, 400000])
+OFB_MASK_EDGE = np.array([0, 0, 0, 0, 1, 1, 1, 1])        # 0: lower band edge, 1: upper band edge
+OFB_MASK_LIMITS = np.array([-36, -36, 0, 14, 14, 0, -36, -36])
+
+# RBW of the OBW measurement as fraction of the OCW, and share of the total power within the OBW
+OBW_RBW_MIN = 0.01
+OBW_RBW_MAX = 0.05
+OBW_POWER = 0.99
+
+# sweep settings: swept analyzer model T = k * span / (RBW * min(RBW, VBW)), at least one settling time 1/RBW per sweep point
+MIN_SWEEP_POINTS = 691          # default sweep points of the FSV, never swept with fewer
+MAX_SWEEP_POINTS = 32001
+BINS_PER_RBW = 2                # trace points per RBW for a valid OBW and mask evaluation on the host
+SWEEP_TIME_FACTOR = 2.5         # k of the gaussian RBW filters of the FSV
+MIN_SWEEP_TIME = 0.001          # in seconds
+RBW_STEPS = np.array([m*10**e for e in range(7) for m in (1, 2, 3, 5)], dtype=np.float64)      # selectable RBWs of the FSV (1 Hz ... 5 MHz)
+
+# OFB domains outside of the band edges as measured by the analyzer: span in Hz and RBW in Hz
+OFB_DOMAIN_SPAN = 4000000
+OFB_DOMAIN_RBW = 10000
+OFB_CENTER_RBW = 1000
+
+# analyzer settings per channel and mask vertex (vertical steps are two vertices at the same frequency)
+PARAMETER_DTYPE = np.dtype([('rbw', 'f8'), ('vbw_ratio', 'f8'), ('span', 'f8'), ('det_mode', 'U8')])
+MASK_DTYPE = np.dtype([('freq', 'i8'), ('limit', 'f8')])
+
+
+# hashable key of a scalar or array input, used to memoize the batch calculations
+def _key(values):
+    return tuple(np.atleast_1d(np.asarray(values, dtype=np.float64)).tolist())
+
+# results are shared between callers through the cache and therefore read-only
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+@functools.lru_cache(maxsize=256)
+def _obw_parameters(ocws):
+    ocws = np.array(ocws)
+    parameters = np.empty(len(ocws), dtype=PARAMETER_DTYPE)
+    parameters['rbw'] = np.maximum(0.02*ocws, 100)
+    parameters['vbw_ratio'] = 3
+    parameters['span'] = 3*ocws
+    parameters['det_mode'] = 'rms'
+    return _frozen(parameters)
+
+@functools.lru_cache(maxsize=256)
+def _oob_parameters(ocws):
+    ocws = np.array(ocws)
+    parameters = np.empty(len(ocws), dtype=PARAMETER_DTYPE)
+    parameters['rbw'] = 1000
+    parameters['vbw_ratio'] = np.nan        # not set for the OOB measurement
+    parameters['span'] = 6*ocws
+    parameters['det_mode'] = 'rms'
+    return _frozen(parameters)
+
+@functools.lru_cache(maxsize=256)
+def _limits_oc(centre_freqs, ocws):
+    centre_freqs, ocws = np.broadcast_arrays(np.array(centre_freqs)[:, None], np.array(ocws)[:, None])
+    limits = np.empty((len(centre_freqs), len(OC_MASK_OFFSETS)), dtype=MASK_DTYPE)
+    limits['freq'] = (centre_freqs + OC_MASK_OFFSETS*ocws).astype(np.int64)
+    limits['limit'] = OC_MASK_LIMITS
+    return _frozen(limits)
+
+@functools.lru_cache(maxsize=256)
+def _limits_ofb(f_lower_borders, f_higher_borders):
+    edges = np.stack([np.array(f_lower_borders), np.array(f_higher_borders)], axis=1).astype(np.int64)
+    limits = np.empty((len(edges), len(OFB_MASK_OFFSETS)), dtype=MASK_DTYPE)
+    limits['freq'] = edges[:, OFB_MASK_EDGE] + OFB_MASK_OFFSETS
+    limits['limit'] = OFB_MASK_LIMITS
+    return _frozen(limits)
+
+
 class EN_300_220_1:
 
     def __init__(self):
@@ -31,26 +112,124 @@ class EN_300_220_1:
             "det_mode": "rms"
         }
     
+    # check the RBW of an OBW measurement against the constraint of the standard
+    def check_obw_rbw(self, rbw, ocw):
+        return OBW_RBW_MIN*ocw <= rbw <= OBW_RBW_MAX*ocw
+
+    # settings of a single max-hold capture from which OBW and operating channel OOB can both be evaluated. None if no common settings exist
+    def calc_single_capture_parameters(self, ocw, dm2=False):
+        oob_parameters = self.calc_oob_parameters(ocw)
+        if dm2 or not self.check_obw_rbw(oob_parameters['rbw'], ocw):     # D-M2 needs an averaged trace for OOB, OBW needs max hold
+            return None
+
+        # span of the OOB measurement contains the OBW span
+        return self.calc_oob_sweep(ocw)
+
+    ### SWEEP OPTIMIZATION
+    # predicted duration in seconds of a sweep, for arrays of RBWs and point counts
+    def predict_sweep_time(self, span, rbw, points, vbw_ratio=3):
+        rbw = np.asarray(rbw, dtype=np.float64)
+        analog = SWEEP_TIME_FACTOR * span / (rbw * np.minimum(rbw, vbw_ratio*rbw))
+        return np.maximum(np.maximum(analog, np.asarray(points) / rbw), MIN_SWEEP_TIME)
+
+    # fastest sweep settings for a span with an RBW between rbw_min and rbw_max (both included) and at least BINS_PER_RBW points per RBW. None if no valid settings exist
+    def optimize_sweep(self, span, det_mode, rbw_min, rbw_max=None, vbw_ratio=3):
+        rbw_max = rbw_min if rbw_max is None else rbw_max
+        rbws = RBW_STEPS[(RBW_STEPS >= rbw_min) & (RBW_STEPS <= rbw_max)]
+        points = np.maximum(np.ceil(BINS_PER_RBW*span/rbws) + 1, MIN_SWEEP_POINTS)
+        rbws, points = rbws[points <= MAX_SWEEP_POINTS], points[points <= MAX_SWEEP_POINTS]
+        if not len(rbws):
+            return None
+
+        times = self.predict_sweep_time(span, rbws, points, vbw_ratio)
+        best = int(np.argmin(times))
+        return {
+            "rbw": float(rbws[best]),
+            "vbw_ratio": vbw_ratio,
+            "span": span,
+            "det_mode": det_mode,
+            "points": int(points[best]),
+            "sweep_time": float(times[best]) if det_mode == 'rms' else None,      # RMS needs the settling time per point, others use auto sweep time
+            "predicted_time": float(times[best])
+        }
+
+    # sweep settings of the OBW measurement, RBW within the constraint of the standard
+    def calc_obw_sweep(self, ocw):
+        parameters = self.calc_obw_parameters(ocw)
+        return self.optimize_sweep(parameters['span'], parameters['det_mode'], OBW_RBW_MIN*ocw, OBW_RBW_MAX*ocw)
+
+    # sweep settings of the OOB measurement of the operating channel, the RBW is fixed by the standard
+    def calc_oob_sweep(self, ocw):
+        parameters = self.calc_oob_parameters(ocw)
+        return self.optimize_sweep(parameters['span'], parameters['det_mode'], parameters['rbw'])
+
+    # sweep settings of the three domains of the OOB measurement of the operational frequency band (center, left, right)
+    def calc_ofb_sweeps(self, limit_points):
+        span = int(limit_points[-1][0]) - int(limit_points[0][0])
+        return {
+            'center': self.optimize_sweep(span, 'rms', OFB_CENTER_RBW),
+            'left': self.optimize_sweep(OFB_DOMAIN_SPAN, 'rms', OFB_DOMAIN_RBW),
+            'right': self.optimize_sweep(OFB_DOMAIN_SPAN, 'rms', OFB_DOMAIN_RBW)
+        }
+
+    # sweep settings of the hop capture of an FHSS device, one span over the operating channel masks of all hop channels with the OOB RBW
+    def calc_fhss_sweep(self, channels, ocw):
+        span = max(channels) - min(channels) + self.calc_oob_parameters(ocw)['span']
+        parameters = self.optimize_sweep(span, 'rms', self.calc_oob_parameters(ocw)['rbw'])
+        if parameters is not None:
+            parameters['centre'] = (max(channels) + min(channels)) / 2
+        return parameters
+
+    # occupied bandwidth of a trace in Hz: bandwidth containing 99 % of the total power, with 0.5 % of the power on either side
+    def calc_obw(self, freqs, levels, power=OBW_POWER):
+        linear = 10**(np.asarray(levels, dtype=np.float64)/10)
+        cumulative = np.cumsum(linear)
+        cumulative /= cumulative[-1]
+        lower = np.interp((1-power)/2, cumulative, freqs)
+        upper = np.interp(1-(1-power)/2, cumulative, freqs)
+        return upper - lower
+
     # calculate limit points for spectral mask for out-of-band emissions measurement of operating channel
     def calc_limit_oc(self, centre_freq, ocw):
-        return [
-                (int(centre_freq - 2.5*ocw), -36),
-                (int(centre_freq - 0.5*ocw), 0),
-                (int(centre_freq - 0.5*ocw), 14),
-                (int(centre_freq + 0.5*ocw), 14),
-                (int(centre_freq + 0.5*ocw), 0),
-                (int(centre_freq + 2.5*ocw), -36)
-            ]
-    
+        return [(int(freq), int(dbm)) for freq, dbm in self.calc_limits_oc(centre_freq, ocw)[0]]
+
     # calculate limit points for spectral mask for out-of-band emissions measurement of operational frequency band
     def calc_limit_ofb(self, f_lower_border, f_higher_border):
-        return [
-                    (f_lower_border - 400000, -36),
-                    (f_lower_border - 200000, -36),
-                    (f_lower_border, 0),
-                    (f_lower_border, 14),
-                    (f_higher_border, 14),
-                    (f_higher_border, 0),
-                    (f_higher_border + 200000, -36),
-                    (f_higher_border + 400000, -36)
-                ]
\ No newline at end of file
+        return [(int(freq), int(dbm)) for freq, dbm in self.calc_limits_ofb(f_lower_border, f_higher_border)[0]]
+
+    ### BATCH VARIANTS (arrays or scalars in, read-only structured arrays out, memoized per input set)
+    # OBW settings for many OCWs, structured array with rbw, vbw_ratio, span and det_mode
+    def calc_obw_parameters_batch(self, ocws):
+        return _obw_parameters(_key(ocws))
+
+    # OOB settings for many OCWs, structured array with rbw, vbw_ratio (NaN), span and det_mode
+    def calc_oob_parameters_batch(self, ocws):
+        return _oob_parameters(_key(ocws))
+
+    # operating channel masks of many channels, OCW as scalar or per channel. structured array of shape (channels, 6) with freq and limit
+    def calc_limits_oc(self, centre_freqs, ocws):
+        return _limits_oc(_key(centre_freqs), _key(ocws))
+
+    # operational frequency band masks of many bands, structured array of shape (bands, 8) with freq and limit
+    def calc_limits_ofb(self, f_lower_borders, f_higher_borders):
+        return _limits_ofb(_key(f_lower_borders), _key(f_higher_borders))
+
+    ### MASK EVALUATION
+    # limit of a mask at the given frequencies, the lower limit applies at vertical steps. NaN outside of the mask
+    def mask_limit(self, freqs, mask):
+        freqs = np.asarray(freqs, dtype=np.float64)[:, None]
+        x0, x1 = mask['freq'][:-1].astype(np.float64), mask['freq'][1:].astype(np.float64)
+        y0, y1 = mask['limit'][:-1], mask['limit'][1:]
+        sloped = x1 > x0        # vertical steps are covered by the segments on both sides
+        x0, x1, y0, y1 = x0[sloped], x1[sloped], y0[sloped], y1[sloped]
+
+        inside = (freqs >= x0) & (freqs <= x1)
+        limits = np.where(inside, y0 + (y1 - y0) * (freqs - x0) / (x1 - x0), np.inf).min(axis=1)
+        return np.where(np.isinf(limits), np.nan, limits)
+
+    # smallest distance in dB between mask and trace(s) on the common frequency axis, negative if the mask is violated. one value per trace
+    def mask_margin(self, freqs, levels, mask):
+        levels = np.atleast_2d(levels)
+        margins = self.mask_limit(freqs, mask)[None, :] - levels
+        margins = np.where(np.isnan(margins), np.inf, margins).min(axis=1)
+        return np.where(np.isinf(margins), np.nan, margins)
@@ -0,0 +1,49 @@
+"""
+file: index of the operational frequency bands of ERC Rec. 70-03 with vectorized lookup of many channels at once
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+import csv
+import numpy as np
+
+BANDS_FILE = 'ERC-data/bands_03-2024.csv'
+BANDS_FILE_FHSS = 'ERC-data/bands_03-2024_FHSS.csv'
+
+_tables = {}
+
+
+# bands of one ERC data file as arrays, in the order of the file
+class BandTable:
+
+    def __init__(self, filename):
+        with open(filename, 'r') as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader)        # skip header row
+            rows = [row for row in reader if row]
+
+        self.names = np.array([row[0] for row in rows])
+        self.lower = np.array([int(row[1]) for row in rows], dtype=np.int64)
+        self.upper = np.array([int(row[2]) for row in rows], dtype=np.int64)
+
+    # first band in file order containing each of the given frequencies. returns (lower, upper) arrays, -1 where no band was found
+    def lookup(self, freqs):
+        freqs = np.asarray(freqs, dtype=np.int64)[:, None]
+        inside = (self.lower <= freqs) & (freqs <= self.upper)
+        first = inside.argmax(axis=1)
+        found = inside.any(axis=1)
+        return np.where(found, self.lower[first], -1), np.where(found, self.upper[first], -1)
+
+
+# band table of the given file, loaded only once
+def table(fhss=False):
+    filename = BANDS_FILE_FHSS if fhss else BANDS_FILE
+    if filename not in _tables:
+        _tables[filename] = BandTable(filename)
+    return _tables[filename]
+
+
+# operational frequency band (lower, upper) for every channel, None for channels outside of all bands
+def band_ranges(freqs, fhss=False):
+    lower, upper = table(fhss).lookup(freqs)
+    return [(int(low), int(high)) if low >= 0 else None for low, high in zip(lower, upper)]
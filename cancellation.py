@@ -0,0 +1,34 @@
+"""
+file: cancellation token shared by measurement thread and instruments so that every wait ends immediately on stop
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+import threading
+
+class CancelToken:
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    # request cancellation, wakes up all threads currently waiting on this token
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    # raise if cancellation was requested
+    def check(self):
+        if self.event.is_set():
+            raise InterruptedError('Measurement was stopped.')
+
+    # wait for the given time in seconds, returns True as soon as cancellation is requested
+    def wait(self, seconds):
+        return self.event.wait(seconds)
+
+    # wait for the given time in seconds, raises as soon as cancellation is requested
+    def sleep(self, seconds):
+        if self.event.wait(seconds):
+            raise InterruptedError('Measurement was stopped.')
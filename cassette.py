@@ -0,0 +1,355 @@
+"""
+file: record and replay of the instrument conversation (VISA sessions and WKL socket) as cassettes, for regression runs and benchmarks without hardware
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import base64
+import bisect
+import gzip
+import json
+import socket
+import threading
+import time
+import numpy as np
+import pyvisa
+import instrument
+import tags
+import wkl
+
+CASSETTE_VERSION = 1
+CASSETTE_SUFFIX = '.cassette.gz'    # gzip compressed JSON lines, one header line and one line per operation
+
+
+# a recorded operation doesn't match the conversation of the replay
+class CassetteError(RuntimeError):
+    pass
+
+
+### ENCODING
+# responses and payloads in a JSON line: text as is, bytes and binary trace data as base64
+def _encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'bytes': base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, np.ndarray):
+        return {'array': base64.b64encode(value.tobytes()).decode('ascii'), 'dtype': value.dtype.str}
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], (int, float)):
+        return _encode(np.asarray(value))
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and 'bytes' in value:
+        return base64.b64decode(value['bytes'])
+    if isinstance(value, dict) and 'array' in value:
+        return np.frombuffer(base64.b64decode(value['array']), dtype=value['dtype']).copy()
+    return value
+
+
+# errors are recorded by type, replayed as VISA errors with the recorded code or as the socket error the drivers handle
+def _encode_error(e):
+    if isinstance(e, pyvisa.errors.VisaIOError):
+        return {'type': 'visa', 'code': e.error_code}
+    if isinstance(e, socket.timeout):
+        return {'type': 'timeout', 'message': str(e)}
+    return {'type': 'os' if isinstance(e, OSError) else 'other', 'message': f'{type(e).__name__}: {e}'}
+
+
+def _decode_error(error):
+    if error['type'] == 'visa':
+        return pyvisa.errors.VisaIOError(error['code'])
+    if error['type'] == 'timeout':
+        return socket.timeout(error['message'])
+    if error['type'] == 'os':
+        return ConnectionError(error['message'])
+    return CassetteError(f'Recorded error: {error["message"]}')
+
+
+### RECORDING
+# append-only cassette file, written while the session runs so that a crashed session can still be replayed up to the crash
+class Recorder:
+
+    def __init__(self, filename, note=''):
+        self.filename = filename
+        self.file = gzip.open(filename, 'wt', encoding='utf-8')
+        self.lock = threading.Lock()        # measurement, watchdog and telemetry threads talk to the instruments in parallel
+        self.started = time.monotonic()
+        self.count = 0
+        self._write({'version': CASSETTE_VERSION, 'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'note': note})
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    # device: VISA address or ip:port, op: operation name, command: command or payload sent, duration: time the instrument took in seconds
+    def record(self, device, op, command=None, response=None, error=None, started=None):
+        now = time.monotonic()
+        entry = {'t': round((started if started is not None else now) - self.started, 6), 'dev': device, 'op': op}
+        if started is not None:
+            entry['dur'] = round(now - started, 6)
+        if command is not None:
+            entry['cmd'] = _encode(command)
+        if response is not None:
+            entry['resp'] = _encode(response)
+        if error is not None:
+            entry['err'] = _encode_error(error)
+        with self.lock:
+            if self.file is not None:
+                self._write(entry)
+                self.count += 1
+
+    # run an operation on the real device and record it together with its result (unless it is a session object) or error
+    def call(self, device, op, command, operation, keep_response=True):
+        started = time.monotonic()
+        try:
+            response = operation()
+        except Exception as e:
+            self.record(device, op, command, error=e, started=started)
+            raise
+        self.record(device, op, command, response if keep_response else None, started=started)
+        return response
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        tags.log('Cassette', f'Recorded {self.count} operations to {self.filename}.')
+
+
+# VISA resource that passes everything on to the real session and records the traffic
+class RecordingResource:
+
+    def __init__(self, resource, recorder, address):
+        object.__setattr__(self, '_resource', resource)
+        object.__setattr__(self, '_recorder', recorder)
+        object.__setattr__(self, '_address', address)
+
+    # session attributes (timeout, terminations) are those of the real session
+    def __getattr__(self, name):
+        return getattr(self._resource, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resource, name, value)
+
+    def write(self, command):
+        return self._recorder.call(self._address, 'write', command, lambda: self._resource.write(command))
+
+    def read(self):
+        return self._recorder.call(self._address, 'read', None, self._resource.read)
+
+    def query(self, command):
+        return self._recorder.call(self._address, 'query', command, lambda: self._resource.query(command))
+
+    def query_binary_values(self, command, **kwargs):
+        return self._recorder.call(self._address, 'binary', command, lambda: self._resource.query_binary_values(command, **kwargs))
+
+    def close(self):
+        self._recorder.record(self._address, 'close')
+        self._resource.close()
+
+
+# resource manager handing out recording sessions, also used for the short-lived probe and sample sessions
+class RecordingResourceManager:
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.rm = pyvisa.ResourceManager()
+
+    def open_resource(self, address, **kwargs):
+        resource = self.recorder.call(address, 'open', None, lambda: self.rm.open_resource(address, **kwargs), keep_response=False)
+        return RecordingResource(resource, self.recorder, address)
+
+    def list_resources(self, query='?*::INSTR'):
+        return self.rm.list_resources(query)
+
+
+# socket of the climate chamber that records the traffic, the device is known once connected
+class RecordingSocket:
+
+    def __init__(self, recorder, *args):
+        self.recorder = recorder
+        self.socket = socket.socket(*args)
+        self.device = None
+
+    def settimeout(self, timeout):
+        self.socket.settimeout(timeout)
+
+    def connect(self, address):
+        self.device = f'{address[0]}:{address[1]}'
+        return self.recorder.call(self.device, 'connect', None, lambda: self.socket.connect(address))
+
+    def send(self, data):
+        return self.recorder.call(self.device, 'send', data, lambda: self.socket.send(data))
+
+    def recv(self, size):
+        return self.recorder.call(self.device, 'recv', None, lambda: self.socket.recv(size))
+
+    def close(self):
+        self.recorder.record(self.device, 'close')
+        self.socket.close()
+
+
+### REPLAY
+# recorded operations of all devices, answers operations of the drivers in recorded order
+class Player:
+
+    # pace: 0 answers at full speed, 1 at the recorded pace (duration of every operation), other factors scale it
+    def __init__(self, filename, pace=0):
+        self.filename = filename
+        self.pace = pace
+        self.lock = threading.Lock()
+        self.entries = {}       # device: entries in recorded order
+        self.used = {}          # device: consumed entries
+        self.last = {}          # device: index of the last consumed entry, reads continue from there
+        self.queues = {}        # (device, op, command): indices of the matching entries, with the position of the next one to answer
+        self.repeated = 0       # operations answered by repeating the last matching entry
+
+        self.header, entries = load(filename)
+        for entry in entries:
+            device_entries = self.entries.setdefault(entry['dev'], [])
+            key = (entry['dev'], entry['op'], _decode(entry.get('cmd')))
+            self.queues.setdefault(key, [[], 0])[0].append(len(device_entries))
+            device_entries.append(entry)
+        for device, device_entries in self.entries.items():
+            self.used[device] = np.zeros(len(device_entries), dtype=bool)
+            self.last[device] = -1
+        tags.log('Cassette', f'Replaying {len(entries)} operations of {len(self.entries)} devices from {filename}.')
+
+    # recorded entry answering an operation. operations with a command take the next entry with the same command, so that heartbeats and
+    # live polls that happened at different times during recording are skipped; reads take the next one after the last consumed entry.
+    # a polling loop that runs longer than recorded (e.g. a max hold within its minimum time) gets the last matching entry again
+    def take(self, device, op, command=None):
+        with self.lock:
+            queue = self.queues.get((device, op, command))
+            if queue is None:
+                raise CassetteError(f'{device}: {op} {command!r} not recorded in cassette {self.filename}')
+            indices, position = queue
+            if command is None:
+                position = max(position, bisect.bisect_right(indices, self.last[device]))
+            if position < len(indices):
+                index = indices[position]
+                queue[1] = position + 1
+                self.used[device][index] = True
+                self.last[device] = index
+            else:
+                index = indices[-1]
+                self.repeated += 1
+            entry = self.entries[device][index]
+
+        if self.pace and entry.get('dur'):
+            time.sleep(entry['dur'] * self.pace)
+        if 'err' in entry:
+            raise _decode_error(entry['err'])
+        return _decode(entry.get('resp'))
+
+    # operations recorded but not requested by the replay, e.g. polls of a converged max hold
+    def remaining(self):
+        return {device: int((~used).sum()) for device, used in self.used.items() if not used.all()}
+
+
+# VISA session answered from the cassette
+class ReplayResource:
+
+    def __init__(self, player, address):
+        self.player = player
+        self.address = address
+        self.timeout = 2000
+        self.write_termination = '\n'
+        self.read_termination = '\n'
+
+    def write(self, command):
+        return self.player.take(self.address, 'write', command)
+
+    def read(self):
+        return self.player.take(self.address, 'read')
+
+    def query(self, command):
+        return self.player.take(self.address, 'query', command)
+
+    def query_binary_values(self, command, container=list, **kwargs):
+        values = self.player.take(self.address, 'binary', command)
+        return values if container is np.array else container(values)
+
+    def close(self):
+        pass
+
+
+class ReplayResourceManager:
+
+    def __init__(self, player):
+        self.player = player
+
+    def open_resource(self, address, **kwargs):
+        self.player.take(address, 'open')
+        return ReplayResource(self.player, address)
+
+    def list_resources(self, query='?*::INSTR'):
+        return tuple(device for device in self.player.entries if '::' in device)
+
+
+# socket of the climate chamber answered from the cassette
+class ReplaySocket:
+
+    def __init__(self, player, *args):
+        self.player = player
+        self.device = None
+
+    def settimeout(self, timeout):
+        pass
+
+    def connect(self, address):
+        self.device = f'{address[0]}:{address[1]}'
+        self.player.take(self.device, 'connect')
+
+    def send(self, data):
+        return self.player.take(self.device, 'send', data)
+
+    def recv(self, size):
+        return self.player.take(self.device, 'recv')
+
+    def close(self):
+        pass
+
+
+### INSTALLATION
+# header and operations of a cassette, a file cut off by a crash is read up to the last complete line
+def load(filename):
+    lines = []
+    try:
+        with gzip.open(filename, 'rt', encoding='utf-8') as file:
+            for line in file:
+                lines.append(line)
+    except EOFError:
+        pass
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            break
+    if not entries or entries[0].get('version') != CASSETTE_VERSION:
+        raise CassetteError(f'{filename} is not a cassette of version {CASSETTE_VERSION}')
+    return entries[0], entries[1:]
+
+
+# record all instruments created from now on, returns the recorder to be closed at the end of the session
+def record(filename, note=''):
+    recorder = Recorder(filename, note)
+    instrument.resource_manager_factory = lambda: RecordingResourceManager(recorder)
+    wkl.socket_factory = lambda *args: RecordingSocket(recorder, *args)
+    tags.log('Cassette', f'Recording instrument traffic to {filename}.')
+    return recorder
+
+
+# answer all instruments created from now on from a cassette, returns the player
+def replay(filename, pace=0):
+    player = Player(filename, pace)
+    instrument.resource_manager_factory = lambda: ReplayResourceManager(player)
+    wkl.socket_factory = lambda *args: ReplaySocket(player, *args)
+    return player
+
+
+# back to the real instruments
+def uninstall():
+    instrument.resource_manager_factory = pyvisa.ResourceManager
+    wkl.socket_factory = socket.socket
@@ -0,0 +1,43 @@
+"""
+file: checks of instruments and resources with go/no-go verdict, shared by the pre-flight check and the shutdown into a safe state
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import time
+
+# result of a single check of an instrument or resource
+class Check:
+
+    def __init__(self, device, ok, detail, duration=0.0):
+        self.device = device
+        self.ok = ok
+        self.detail = detail
+        self.duration = duration
+
+    def __str__(self):
+        return f'[{"GO" if self.ok else "NO-GO"}] {self.device}: {self.detail} ({self.duration*1000:.0f} ms)'
+
+
+# collection of all checks with overall go/no-go verdict
+class CheckReport:
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    @property
+    def go(self):
+        return all(check.ok for check in self.checks)
+
+    def summary(self):
+        return '\n'.join(str(check) for check in self.checks)
+
+
+# run a single probe or step and wrap its outcome into a check
+def run_check(device, probe, *args):
+    start = time.monotonic()
+    try:
+        detail = probe(*args)
+        return Check(device, True, detail, time.monotonic() - start)
+    except Exception as e:
+        return Check(device, False, f'{type(e).__name__}: {e}', time.monotonic() - start)
@@ -0,0 +1,129 @@
+"""
+file: connection watchdog with heartbeat and automatic reconnect for all instruments during a measurement
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+import socket
+import threading
+import time
+import pyvisa
+import tags
+
+HEARTBEAT_INTERVAL = 2      # in seconds, links with traffic more recent than this are not probed
+HEARTBEAT_TIMEOUT = 1500    # in ms
+RECONNECT_DELAYS = [0, 1, 2, 4, 8, 16]     # backoff in seconds between reconnect attempts before the link is given up
+
+# exceptions that indicate a lost connection rather than a logical error, other OS errors (e.g. a full disk when saving a screenshot) are not link losses
+LINK_ERRORS = (pyvisa.errors.VisaIOError, pyvisa.errors.InvalidSession, socket.timeout, socket.gaierror, ConnectionError)
+
+
+# watchdog state of a single instrument link
+class Link:
+
+    def __init__(self, name, device):
+        self.name = name
+        self.device = device
+        self.state = 'up'           # up, down (reconnecting) or failed (given up)
+        self.diagnosis = ''
+        self.attempt = 0
+        self.next_attempt = 0.0
+        self.recovered = threading.Event()
+        self.recovered.set()
+
+
+# background thread probing all links and reconnecting lost ones with backoff
+class ConnectionWatchdog(threading.Thread):
+
+    def __init__(self, devices, on_failure=None):
+        super().__init__(daemon=True)
+        self.links = {name: Link(name, device) for name, device in devices.items() if device is not None}
+        self.on_failure = on_failure
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        tags.log('Watchdog', f'Watching connections to {", ".join(self.links)}.')
+        while not self.stop_event.wait(0.5):
+            for link in self.links.values():
+                if link.state == 'up':
+                    self._check(link)
+                elif link.state == 'down' and time.monotonic() >= link.next_attempt:
+                    self._recover(link)
+
+    def stop(self):
+        self.stop_event.set()
+
+    # heartbeat for links without recent traffic, a busy link counts as alive
+    def _check(self, link):
+        if time.monotonic() - link.device.last_activity < HEARTBEAT_INTERVAL:
+            return
+        try:
+            link.device.heartbeat(HEARTBEAT_TIMEOUT)
+        except LINK_ERRORS as e:
+            self.report_failure(link.name, e)
+
+    # single reconnect attempt, replay of the cached state once the link is back
+    def _recover(self, link):
+        try:
+            link.device.reconnect()
+            link.device.restore_state()
+        except LINK_ERRORS as e:
+            with self.lock:
+                link.attempt += 1
+                if link.attempt >= len(RECONNECT_DELAYS):
+                    link.state = 'failed'
+                    link.diagnosis = f'{link.name}: connection lost ({link.diagnosis}), {link.attempt} reconnect attempts failed, last error: {type(e).__name__}: {e}'
+                else:
+                    link.next_attempt = time.monotonic() + RECONNECT_DELAYS[link.attempt]
+                    return
+            tags.log('Watchdog', link.diagnosis, tags.ERROR, instrument=link.name)
+            link.recovered.set()        # wake up waiting measurement so it can fail fast
+            if self.on_failure:
+                self.on_failure(link.diagnosis)
+            return
+
+        tags.log('Watchdog', f'{link.name}: connection re-established after {link.attempt + 1} attempt(s), state restored.', tags.WARNING, instrument=link.name)
+        with self.lock:
+            link.state = 'up'
+            link.attempt = 0
+        link.recovered.set()
+
+    # mark a link as lost, called by the heartbeat or by the measurement when an operation failed
+    def report_failure(self, name, error):
+        link = self.links[name]
+        with self.lock:
+            if link.state != 'up':
+                return
+            link.state = 'down'
+            link.diagnosis = f'{type(error).__name__}: {error}'
+            link.attempt = 0
+            link.next_attempt = time.monotonic()
+            link.recovered.clear()
+        tags.log('Watchdog', f'{name}: connection lost ({link.diagnosis}). Reconnecting.', tags.WARNING, instrument=name)
+
+    # block until the link is up again, returns False if it was given up or the timeout expired
+    def wait_recovered(self, name, timeout=None):
+        link = self.links[name]
+        link.recovered.wait(timeout)
+        return link.state == 'up'
+
+    # probe all links immediately after an operation failed and wait until lost ones are recovered. returns False if no link was lost or recovery failed
+    def recover_all(self, timeout=60):
+        lost = []
+        for link in self.links.values():
+            if link.state == 'up':
+                try:
+                    link.device.heartbeat(HEARTBEAT_TIMEOUT)
+                    continue
+                except LINK_ERRORS as e:
+                    self.report_failure(link.name, e)
+            lost.append(link.name)
+
+        if not lost:
+            return False
+        return all(self.wait_recovered(name, timeout) for name in lost)
+
+    # description of all links that are not up
+    def diagnosis(self):
+        return '\n'.join(link.diagnosis for link in self.links.values() if link.state == 'failed')
@@ -0,0 +1,66 @@
+"""
+file: convergence detector for max-hold acquisitions, ends the acquisition once the envelope stops growing
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import time
+import numpy as np
+
+GROWTH_THRESHOLD = 0.05     # in dB, growth of the envelope power between two sweeps that still counts as stable
+STABLE_SWEEPS = 5           # consecutive stable sweeps until the envelope is considered converged
+MIN_TIME = 1                # in seconds, minimum acquisition time (e.g. for EUTs with long burst periods)
+MAX_TIME = 30               # in seconds, the acquisition ends without convergence after this time
+
+
+# tracks the max-hold envelope of successive sweeps in buffers that are allocated once per trace length
+class MaxHoldMonitor:
+
+    def __init__(self, points):
+        self.allocate(points)
+        self.reset()
+
+    def allocate(self, points):
+        self.envelope = np.empty(points, dtype=np.float64)     # in dBm
+        self.linear = np.empty(points, dtype=np.float64)       # envelope in mW, for the power sum
+        self.points = points
+
+    # start a new acquisition with its stop criteria, the buffers are reused unless the trace length changed
+    def reset(self, points=None, threshold=GROWTH_THRESHOLD, stable_sweeps=STABLE_SWEEPS, min_time=MIN_TIME, max_time=MAX_TIME):
+        if points is not None and points != self.points:
+            self.allocate(points)
+        self.threshold = threshold
+        self.stable_sweeps = stable_sweeps
+        self.min_time = min_time
+        self.max_time = max_time
+        self.envelope.fill(-np.inf)
+        self.power = 0.0
+        self.sweeps = 0
+        self.stable = 0
+        self.growth = np.inf
+        self.started = time.monotonic()
+
+    # add a trace to the envelope and return the growth of the envelope power in dB. the growth of single bins is not used, as the envelope of noise keeps growing by small steps
+    def update(self, levels):
+        np.maximum(self.envelope, levels, out=self.envelope)
+        np.divide(self.envelope, 10, out=self.linear)
+        np.power(10, self.linear, out=self.linear)
+        power = float(self.linear.sum())
+
+        self.growth = 10*np.log10(power/self.power) if self.power > 0 else np.inf
+        self.power = power
+        self.sweeps += 1
+        self.stable = self.stable + 1 if self.growth < self.threshold else 0
+        return self.growth
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def converged(self):
+        return self.stable >= self.stable_sweeps and self.elapsed() >= self.min_time
+
+    def expired(self):
+        return self.elapsed() >= self.max_time
+
+    def done(self):
+        return self.converged() or self.expired()
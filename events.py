@@ -0,0 +1,67 @@
+"""
+file: typed events and thread-safe channel for reporting progress from the measurement thread to the GUI
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+import queue
+import time
+
+FRAME_INTERVAL = 100        # in ms, interval in which the GUI applies received events
+
+
+# status message describing the current step of the measurement
+class ProgressEvent:
+
+    def __init__(self, message):
+        self.message = message
+
+
+# results of a complete measurement as expected by the results section of the GUI
+class ResultEvent:
+
+    def __init__(self, results):
+        self.results = results
+
+
+# latest chamber temperature and supply voltage, None if not available
+class TelemetryEvent:
+
+    def __init__(self, chamber_temp, sps_voltage):
+        self.chamber_temp = chamber_temp
+        self.sps_voltage = sps_voltage
+        self.timestamp = time.time()
+
+
+# problem that needs the attention of the operator
+class WarningEvent:
+
+    def __init__(self, title, message):
+        self.title = title
+        self.message = message
+
+
+# events only the latest of which is of interest, older ones are dropped when the GUI catches up
+COALESCED = (ProgressEvent, TelemetryEvent)
+
+
+# queue between measurement thread and GUI, posting never blocks the measurement thread
+class EventChannel:
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+
+    def post(self, event):
+        self.queue.put(event)
+
+    # all events received since the last call, superseded progress and telemetry events removed
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        latest = {type(event): i for i, event in enumerate(events) if isinstance(event, COALESCED)}
+        return [event for i, event in enumerate(events) if not isinstance(event, COALESCED) or latest[type(event)] == i]
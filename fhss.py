@@ -0,0 +1,109 @@
+"""
+file: hop coverage of FHSS devices: spectrogram ring buffer of single sweeps and per-channel hit counts against the hop set
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import numpy as np
+
+HIT_THRESHOLD = 10          # in dB above the noise floor (median of the sweep), level at which a bin counts as occupied
+HITS_PER_CHANNEL = 3        # separate hops every channel has to be seen in until the capture is complete
+RING_DEPTH = 512            # sweeps kept in the spectrogram
+
+# spectrogram levels are stored as one byte per bin
+LEVEL_FLOOR = -107.5        # in dBm, lowest level (code 0), below the noise floor of the FSV at RBW 1 kHz
+LEVEL_STEP = 0.5            # in dB, 255 steps up to +20 dBm
+
+
+# the last RING_DEPTH sweeps in a fixed block of memory, oldest sweeps are overwritten
+class SpectrogramRing:
+
+    def __init__(self, points, depth=RING_DEPTH):
+        self.rows = np.zeros((depth, points), dtype=np.uint8)
+        self.timestamps = np.zeros(depth, dtype=np.float64)
+        self.count = 0      # sweeps appended in total
+
+    def append(self, levels, timestamp):
+        row = self.count % len(self.rows)
+        codes = np.round((np.asarray(levels) - LEVEL_FLOOR) / LEVEL_STEP)
+        np.clip(codes, 0, 255, out=codes)
+        self.rows[row] = codes
+        self.timestamps[row] = timestamp
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, len(self.rows))
+
+    # stored sweeps oldest first as (timestamps, levels in dBm)
+    def spectrogram(self):
+        order = (np.arange(len(self)) + self.count - len(self)) % len(self.rows)
+        return self.timestamps[order], LEVEL_FLOOR + self.rows[order].astype(np.float32) * np.float32(LEVEL_STEP)
+
+    def save(self, filepath, freqs, **arrays):
+        timestamps, levels = self.spectrogram()
+        np.savez_compressed(filepath, freqs=freqs, timestamps=timestamps, levels=levels, **arrays)
+
+
+# max hold, occupancy and hits per hop channel of a stream of sweeps over the whole hop set
+class HopCoverage:
+
+    def __init__(self, freqs, channels, ocw, hits_required=HITS_PER_CHANNEL, threshold=HIT_THRESHOLD):
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.channels = np.asarray(channels, dtype=np.float64)
+        self.hits_required = hits_required
+        self.threshold = threshold
+
+        # bins of every channel as index ranges of the frequency axis
+        self.starts = np.searchsorted(self.freqs, self.channels - ocw/2, side='left')
+        self.ends = np.searchsorted(self.freqs, self.channels + ocw/2, side='right')
+
+        self.envelope = np.full(len(self.freqs), -np.inf, dtype=np.float32)
+        self.occupied_sweeps = np.zeros(len(self.freqs), dtype=np.uint32)
+        self.cumulative = np.zeros(len(self.freqs) + 1, dtype=np.int64)
+        self.hits = np.zeros(len(self.channels), dtype=np.int64)
+        self.active = np.zeros(len(self.channels), dtype=bool)      # channel occupied in the previous sweep
+        self.sweeps = 0
+
+        # max hold per channel of only the sweeps in which that channel was the only occupied one
+        self.solo_envelopes = np.full((len(self.channels), len(self.freqs)), -np.inf, dtype=np.float32)
+        self.solo_sweeps = np.zeros(len(self.channels), dtype=np.int64)
+
+    # add a sweep, a hop is counted when a channel becomes occupied so that a long dwell over several sweeps counts once
+    def update(self, levels):
+        levels = np.asarray(levels, dtype=np.float32)
+        np.maximum(self.envelope, levels, out=self.envelope)
+        occupied = levels > np.median(levels) + self.threshold
+        self.occupied_sweeps += occupied
+        np.cumsum(occupied, out=self.cumulative[1:])
+
+        active = self.cumulative[self.ends] > self.cumulative[self.starts]
+        self.hits += active & ~self.active
+        self.active = active
+        self.sweeps += 1
+
+        solo = np.flatnonzero(active)
+        if len(solo) == 1:
+            np.maximum(self.solo_envelopes[solo[0]], levels, out=self.solo_envelopes[solo[0]])
+            self.solo_sweeps[solo[0]] += 1
+
+    def complete(self):
+        return bool(np.all(self.hits >= self.hits_required))
+
+    # share of the sweeps in which each bin was occupied
+    def occupancy(self):
+        return self.occupied_sweeps / max(self.sweeps, 1)
+
+    # max hold of the sweeps in which only channel i was occupied, so that neighbouring hops don't count as emissions of the channel while its own
+    # emissions on other hop channels are kept. max hold of all sweeps (worst case) if the channel was never seen alone
+    def channel_envelope(self, i):
+        if self.isolated(i):
+            return self.solo_envelopes[i].copy()
+        return self.envelope.copy()
+
+    # channel seen alone in at least one sweep, i.e. its envelope is not the worst case of all channels
+    def isolated(self, i):
+        return bool(self.solo_sweeps[i] > 0)
+
+    # hop channels seen less often than required
+    def missing(self):
+        return self.channels[self.hits < self.hits_required]
@@ -1,7 +1,7 @@
 """
 file: class for interfacing with R&S FSV spectrum analyzer
 author: rueck.joshua@gmail.com
-last updated: 27/08/2024
+last updated: 19/10/2026
 """
 
 import instrument
@@ -10,49 +10,126 @@ from time import sleep
 from PIL import Image
 import io
 import os
+import numpy as np
+import time
+import convergence
+import fhss
+import setups
+import limit_lines
+
+MIN_POLL_INTERVAL = 0.05     # in seconds, shortest interval between two trace reads of the max-hold convergence detection
+MIN_HOLD_SWEEPS = 10         # sweeps every max hold takes at least before the convergence detection may end it
+
+
+# read a trace as float32 binary block together with its frequency axis on the given session, returns (freqs, levels)
+def read_trace(session, trace_nr=1):
+    session.write('FORM REAL,32')       # only affects trace data transfer, all other queries stay ASCII
+    start = float(session.query('FREQ:STAR?'))
+    stop = float(session.query('FREQ:STOP?'))
+    levels = read_levels(session, trace_nr)
+    return np.linspace(start, stop, len(levels)), levels
+
+# read only the levels of a trace, the data format has to be set to REAL,32 before
+def read_levels(session, trace_nr=1):
+    return session.query_binary_values(f'TRAC:DATA? TRACE{trace_nr}', datatype='f', is_big_endian=False, container=np.array)
 
 class FSV(instrument.BaseInstrument):
 
+    error_query = 'SYST:ERR?'
+    heartbeat_query = '*STB?'
+
     def __init__(self, visa_address):
         super().__init__(visa_address)
-        self.stop_flag = False
+        self.ref_level_offset = None    # e.r.p. offset determined in adjust_erp, replayed after a lost connection
+        self.trace_sink = None          # called with (freqs, levels, label, settings) for every trace captured by a measurement
+        self.sweep_time = None          # in seconds, of the last applied optimized sweep settings
+        self.maxhold_monitor = None     # convergence detector, buffers reused between acquisitions
+        self.setups = setups.SetupCache()   # setups of the test phases stored on the instrument
+        self.limits = limit_lines.LimitLibrary()    # limit lines of the masks uploaded to the instrument
         if self.connect('FSV'):
-            self.instrument.write('SYST:DISP:UPD ON')   # turn on update of display during remote operation
+            self.write('SYST:DISP:UPD ON')   # turn on update of display during remote operation
             self.disconnect()
 
     ### INSTRUMENT HANDLING
-    # set stop flag for interruption of measurement
-    def stop_operation(self):
-        self.stop_flag = True
-
-    # check if stop flag has been set
-    def check_stop(self):
-        if self.stop_flag:
-            raise InterruptedError('Measurement was stopped.')
-        
+    # re-apply display update and e.r.p. offset after the connection was lost, on the session reopened by reconnect() or a short-lived one
+    def restore_state(self):
+        def restore(session):
+            session.write('SYST:DISP:UPD ON')
+            if self.ref_level_offset is not None:
+                session.write(f'DISP:TRAC:Y:RLEV:OFFS {self.ref_level_offset}')
+        self.run_with(restore)
+        tags.log('FSV', 'Instrument state restored after reconnect.')
+
     # reset instrument to default preset
     def reset(self):
         if self.connect():
-            self.instrument.write('*RST')
+            self.write('*RST')
+            self.ref_level_offset = None
             sleep(1)
             self.disconnect()
 
 
+    # reset instrument and wait for completion of the preset instead of a fixed delay, raises if the instrument doesn't confirm
+    def safe_reset(self):
+        if not self.connect('FSV'):
+            raise ConnectionError('FSV not reachable')
+        try:
+            self.write('*RST')
+            self.ref_level_offset = None
+            complete = self.query('*OPC?').strip()
+        finally:
+            self.disconnect()
+
+        if complete != '1':
+            raise RuntimeError(f'Preset not confirmed, *OPC? returned {complete}')
+        return 'preset confirmed'
+
+
+    ### SETUP RECALL
+    # bring the analyzer into the setup of a phase: recall the state stored on the instrument if it is still valid, otherwise apply the
+    # settings with configure() and store the resulting state for the next time. only the settings that differ per channel are written afterwards
+    def load_setup_connected(self, phase, parameters, configure):
+        key = self.setups.key(phase, parameters, ref_level_offset=self.ref_level_offset)
+        setup = self.setups.lookup(phase, key)
+        if setup is not None:
+            self.write('*CLS')
+            self.write(f"MMEM:LOAD:STAT 1,'{setup.filename}'")
+            self.query('*OPC?')
+            error = self.query('SYST:ERR?').strip()
+            if error.startswith('0') or error.startswith('+0'):
+                self.shadow = dict(setup.shadow)
+                self.sweep_time = setup.sweep_time
+                tags.log('FSV', f'Setup {phase} recalled.')
+                return True
+            tags.log('FSV', f'Setup {phase} could not be recalled ({error}), applying the settings again.', tags.WARNING)
+            self.setups.invalidate(phase)
+            self.invalidate()
+
+        configure()
+        if not self.setups.directory_created:
+            self.write(f"MMEM:MKD '{self.setups.directory}'")
+            self.write('*CLS')      # the directory may already exist
+            self.setups.directory_created = True
+        setup = self.setups.store(phase, key, self.shadow, self.sweep_time)
+        self.write(f"MMEM:STOR:STAT 1,'{setup.filename}'")
+        self.query('*OPC?')
+        return False
+
     ### SET GENERAL PARAMETERS
     # set center frequency within limits specified by manual (up to 30 GHz)
     def set_center_freq(self, freq):
         if (freq > 0 and freq < 30000000000):
             if self.connect():
-                self.instrument.write(f'SENS:FREQ:CENT {freq}')
+                self.write_setting(f'SENS:FREQ:CENT {freq}')
                 self.disconnect()
                 tags.log('FSV', f'Center frequency set to {self.format_freq(freq)}')
         else:
             tags.log('FSV', 'Invalid frequency, not in range of FSV.')
 
+    # returns True if the value has been written, False if it was unchanged or invalid
     def set_center_freq_connected(self, freq):
         if (freq > 0 and freq < 30000000000):
-            self.instrument.write(f'SENS:FREQ:CENT {freq}')
-            return True
+            return self.write_setting(f'SENS:FREQ:CENT {freq}')
         else:
             return False
 
@@ -60,7 +137,7 @@ class FSV(instrument.BaseInstrument):
     def set_span(self, freq):
         if (freq > 0 and freq < 30000000000):
             if self.connect():
-                self.instrument.write(f'SENS:FREQ:SPAN {freq}')
+                self.write_setting(f'SENS:FREQ:SPAN {freq}')
                 self.disconnect()
                 tags.log('FSV', f'Span set to {self.format_freq(freq)}')
         else:
@@ -68,86 +145,25 @@ class FSV(instrument.BaseInstrument):
 
     def set_span_connected(self, freq):
         if (freq > 0 and freq < 30000000000):
-            self.instrument.write(f'SENS:FREQ:SPAN {freq}')
-            return True
+            return self.write_setting(f'SENS:FREQ:SPAN {freq}')
         else:
             return False
 
+    # set start and stop frequency, which changes center frequency and span as well
+    def set_start_stop_connected(self, start, stop):
+        self.invalidate('SENS:FREQ:CENT', 'SENS:FREQ:SPAN')
+        self.write(f'SENS:FREQ:STAR {start}')
+        self.write(f'SENS:FREQ:STOP {stop}')
+
     # adjust offset to reflect reference max e.r.p. as measured in SAC
     def adjust_erp(self, ref_value, centre_frequency, ocw, rbw):
-        offset = 0
-
-        ref_value = float(ref_value)
-
         tags.log('FSV', 'Adjusting max. e.r.p to reflect conditions in SAC. Please wait a moment.')
+        if self.connect():
+            try:
+                self.adjust_erp_connected(ref_value, centre_frequency, ocw, rbw)
+            finally:
+                self.disconnect()
 
-        try:
-
-            if self.connect():
-                self.set_center_freq_connected(centre_frequency)
-                sleep(0.5)
-                self.set_span_connected(6*ocw)
-                sleep(0.5)
-                self.set_rbw_connected(rbw)
-                sleep(0.5)
-
-                self.check_stop()
-
-                self.instrument.write('DISP:TRAC:MODE MAXH')
-                sleep(5)
-                self.instrument.write('CALC:MARK1:STAT ON')
-                self.instrument.write('CALC:MARK:MAX')
-                sleep(1)
-                level = float(self.instrument.query('CALC:MARK:Y?'))
-
-                self.check_stop()
-
-                if level < ref_value:
-                    offset = abs(ref_value - level)
-                    self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                    sleep(5)
-                    self.check_stop()
-                    self.instrument.write('CALC:MARK:MAX')
-                    sleep(1)
-                    level = float(self.instrument.query('CALC:MARK:Y?'))
-
-                    while level <= ref_value:
-                        offset = offset+0.3
-                        self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                        sleep(5)
-                        self.check_stop()
-                        self.instrument.write('CALC:MARK:MAX')
-                        sleep(1)
-                        level = float(self.instrument.query('CALC:MARK:Y?'))
-
-                else:
-                    offset = abs(level - ref_value)
-                    self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                    sleep(5)
-                    self.check_stop()
-                    self.instrument.write('CALC:MARK:MAX')
-                    sleep(1)
-                    level = float(self.instrument.query('CALC:MARK:Y?'))
-
-                    while level >= ref_value:
-                        offset = offset-0.3
-                        self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                        sleep(5)
-                        self.check_stop()
-                        self.instrument.write('CALC:MARK:MAX')
-                        sleep(1)
-                        level = float(self.instrument.query('CALC:MARK:Y?'))
-
-                self.instrument.write(f'DISP:TRAC:Y:RLEV {offset}dBm')
-            
-            tags.log('FSV', f"Reference level offset set to {offset:.2f} dB, measured max. e.r.p with this offset: {level:.2f} dBm")
-            self.disconnect()
-
-        except InterruptedError:
-            self.disconnect()
-            tags.log('FSV', 'Measurement interrupted.')
-            return None
-    
     def adjust_erp_connected(self, ref_value, centre_frequency, ocw, rbw):
         offset = 0
 
@@ -155,61 +171,62 @@ class FSV(instrument.BaseInstrument):
 
         try:
 
-            self.set_center_freq_connected(centre_frequency)
-            sleep(0.5)
-            self.set_span_connected(6*ocw)
-            sleep(0.5)
-            self.set_rbw_connected(rbw)
-            sleep(0.5)
+            if self.set_center_freq_connected(centre_frequency):
+                self.wait(0.5)
+            if self.set_span_connected(6*ocw):
+                self.wait(0.5)
+            if self.set_rbw_connected(rbw):
+                self.wait(0.5)
 
             self.check_stop()
 
-            self.instrument.write('DISP:TRAC:MODE MAXH')
-            sleep(5)
-            self.instrument.write('CALC:MARK1:STAT ON')
-            self.instrument.write('CALC:MARK:MAX')
-            sleep(1)
-            level = float(self.instrument.query('CALC:MARK:Y?'))
+            self.write_trace_mode(1, 'maxhold')
+            self.wait_maxhold_connected()
+            self.write('CALC:MARK1:STAT ON')
+            self.write('CALC:MARK:MAX')
+            self.wait(1)
+            level = float(self.query('CALC:MARK:Y?'))
 
             self.check_stop()
 
             if level < ref_value:
                 offset = abs(ref_value - level)
-                self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                sleep(5)
+                self.set_ref_level_offset_connected(offset)
+                self.wait_maxhold_connected()
                 self.check_stop()
-                self.instrument.write('CALC:MARK:MAX')
-                sleep(1)
-                level = float(self.instrument.query('CALC:MARK:Y?'))
+                self.write('CALC:MARK:MAX')
+                self.wait(1)
+                level = float(self.query('CALC:MARK:Y?'))
 
                 while level <= ref_value:
                     offset = offset+0.3
-                    self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                    sleep(5)
+                    self.set_ref_level_offset_connected(offset)
+                    self.wait_maxhold_connected()
                     self.check_stop()
-                    self.instrument.write('CALC:MARK:MAX')
-                    sleep(1)
-                    level = float(self.instrument.query('CALC:MARK:Y?'))
+                    self.write('CALC:MARK:MAX')
+                    self.wait(1)
+                    level = float(self.query('CALC:MARK:Y?'))
 
             else:
                 offset = abs(level - ref_value)
-                self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                sleep(5)
+                self.set_ref_level_offset_connected(offset)
+                self.wait_maxhold_connected()
                 self.check_stop()
-                self.instrument.write('CALC:MARK:MAX')
-                sleep(1)
-                level = float(self.instrument.query('CALC:MARK:Y?'))
+                self.write('CALC:MARK:MAX')
+                self.wait(1)
+                level = float(self.query('CALC:MARK:Y?'))
 
                 while level >= ref_value:
                     offset = offset-0.3
-                    self.instrument.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
-                    sleep(5)
+                    self.set_ref_level_offset_connected(offset)
+                    self.wait_maxhold_connected()
                     self.check_stop()
-                    self.instrument.write('CALC:MARK:MAX')
-                    sleep(1)
-                    level = float(self.instrument.query('CALC:MARK:Y?'))
+                    self.write('CALC:MARK:MAX')
+                    self.wait(1)
+                    level = float(self.query('CALC:MARK:Y?'))
 
-            self.instrument.write(f'DISP:TRAC:Y:RLEV {offset}dBm')
+            self.write_setting(f'DISP:TRAC:Y:RLEV {offset}dBm')
+            self.ref_level_offset = offset
         
             tags.log('FSV', f"Reference level offset set to {offset:.2f} dB, measured max. e.r.p with this offset: {level:.2f} dBm")
 
@@ -217,25 +234,30 @@ class FSV(instrument.BaseInstrument):
             tags.log('FSV', 'Measurement interrupted.')
             return None
 
+    # set reference level offset, which shifts the reference level as well
+    def set_ref_level_offset_connected(self, offset):
+        self.invalidate('DISP:TRAC:Y:RLEV')
+        self.write(f'DISP:TRAC:Y:RLEV:OFFS {offset}')
+
     # set FSV resolution bandwidth
     def set_rbw(self, rbw):
         if self.connect():
-            self.instrument.write(f'SENS:BAND:RES {rbw}')
+            self.write_setting(f'SENS:BAND:RES {rbw}')
             self.disconnect()
             tags.log('FSV', f'RBW set to {self.format_freq(rbw)}.')
 
     def set_rbw_connected(self, rbw):
-        self.instrument.write(f'SENS:BAND:RES {rbw}')
+        return self.write_setting(f'SENS:BAND:RES {rbw}')
 
     # set FSV video bandwidth
     def set_vbw_ratio(self, ratio):
         if self.connect():
-            self.instrument.write(f'SENS:BAND:VID:RAT {ratio}')
+            self.write_setting(f'SENS:BAND:VID:RAT {ratio}')
             self.disconnect()
             tags.log('FSV', f'VBW set to {ratio}x RBW.')
 
     def set_vbw_ratio_connected(self, ratio):
-        self.instrument.write(f'SENS:BAND:VID:RAT {ratio}')
+        return self.write_setting(f'SENS:BAND:VID:RAT {ratio}')
 
     # set trace mode of specific trace
     def set_trace_mode(self, trace_nr, trace_mode):
@@ -244,7 +266,7 @@ class FSV(instrument.BaseInstrument):
             raise ValueError(f'Invalid value for trace_mode. Expected one of {valid_modes}, got {trace_mode}')
 
         if self.connect():
-            self.instrument.write(f'DISP:TRAC{trace_nr}:MODE {trace_mode}')
+            self.write_trace_mode(trace_nr, trace_mode)
             self.disconnect()
             tags.log('FSV', f'TRACE {trace_nr} set to mode {trace_mode}.')
 
@@ -253,7 +275,16 @@ class FSV(instrument.BaseInstrument):
         if trace_mode not in valid_modes:
             raise ValueError(f'Invalid value for trace_mode. Expected one of {valid_modes}, got {trace_mode}')
 
-        self.instrument.write(f'DISP:TRAC{trace_nr}:MODE {trace_mode}')
+        return self.write_trace_mode(trace_nr, trace_mode)
+
+    # accumulating modes restart the trace when written, so they are always sent and never suppressed by the cache
+    def write_trace_mode(self, trace_nr, trace_mode):
+        command = f'DISP:TRAC{trace_nr}:MODE {trace_mode}'
+        if trace_mode in ['maxhold', 'minhold', 'average']:
+            self.write(command)
+            self.shadow[command.split(' ')[0]] = command
+            return True
+        return self.write_setting(command)
 
     # set detector mode to specific values
     def set_det_mode(self, det_mode):
@@ -262,7 +293,7 @@ class FSV(instrument.BaseInstrument):
             raise ValueError(f'Invalid value for det_mode. Expected one of {valid_modes}, got {det_mode}')
         
         if self.connect():
-            self.instrument.write(f'SENS:WIND:DET {det_mode}')
+            self.write_setting(f'SENS:WIND:DET {det_mode}')
             self.disconnect()
             tags.log('FSV', f'Detector mode set to {det_mode}.')
 
@@ -271,16 +302,80 @@ class FSV(instrument.BaseInstrument):
         if det_mode not in valid_modes:
             raise ValueError(f'Invalid value for det_mode. Expected one of {valid_modes}, got {det_mode}')
         
-        self.instrument.write(f'SENS:WIND:DET {det_mode}')
+        return self.write_setting(f'SENS:WIND:DET {det_mode}')
+
+    # set number of sweep points (trace resolution)
+    def set_sweep_points_connected(self, points):
+        return self.write_setting(f'SWE:POIN {int(points)}')
+
+    # set sweep time in seconds, None for auto sweep time. the coupled sweep time of the current RBW/VBW/span is queried before it is overridden,
+    # a shorter sweep time would leave the measurement uncalibrated (UNCAL) so the coupled one is kept instead
+    def set_sweep_time_connected(self, sweep_time):
+        if sweep_time is None:
+            return self.write_setting('SWE:TIME:AUTO ON', key='SWE:TIME')
+        command = f'SWE:TIME {sweep_time:.6f}s'
+        if self.shadow.get('SWE:TIME') == command:
+            return False
+
+        self.write_setting('SWE:TIME:AUTO ON', key='SWE:TIME')
+        coupled = self.probe_sweep_time_connected()
+        if coupled > sweep_time:
+            tags.log('FSV', f'Sweep time {sweep_time*1e3:.1f} ms below coupled sweep time {coupled*1e3:.1f} ms, coupled sweep time kept.', tags.WARNING)
+            return True
+        self.write_setting(command, key='SWE:TIME')
+        return True
+
+    # sweep time in seconds as set on the analyzer (after coupling and rounding)
+    def probe_sweep_time_connected(self):
+        return float(self.query('SWE:TIME?'))
+
+    # apply points and sweep time of optimized sweep parameters, returns the sweep time of the analyzer or None if the parameters contain no sweep settings
+    def set_sweep_connected(self, parameters):
+        if parameters is None or 'points' not in parameters:
+            return None
+        changed = self.set_sweep_points_connected(parameters['points'])
+        changed = self.set_sweep_time_connected(parameters['sweep_time']) or changed
+        if changed:
+            self.wait(0.5)
+        self.sweep_time = self.probe_sweep_time_connected()
+        tags.log('FSV', f"Sweep with {parameters['points']} points: {self.sweep_time*1e3:.1f} ms (predicted {parameters['predicted_time']*1e3:.1f} ms).")
+        return self.sweep_time
+
+    # wait until the max-hold envelope of a trace has converged, polling the trace once per sweep. returns True if converged, False if the maximum time was reached
+    def wait_maxhold_connected(self, trace_nr=1, **settings):
+        with self.io_lock:
+            self.write('FORM REAL,32')
+            interval = max(self.probe_sweep_time_connected(), MIN_POLL_INTERVAL)
+            levels = read_levels(self.instrument, trace_nr)
+
+        if self.maxhold_monitor is None:
+            self.maxhold_monitor = convergence.MaxHoldMonitor(len(levels))
+        monitor = self.maxhold_monitor
+        settings.setdefault('min_time', max(convergence.MIN_TIME, MIN_HOLD_SWEEPS*interval))
+        monitor.reset(len(levels), **settings)      # threshold, stable_sweeps, min_time, max_time
+        monitor.update(levels)
+
+        while not monitor.done():
+            self.wait(interval)
+            with self.io_lock:
+                levels = read_levels(self.instrument, trace_nr)
+                self.last_activity = time.monotonic()
+            if len(levels) != monitor.points:       # sweep points changed during the acquisition
+                monitor.reset(len(levels), **settings)
+            monitor.update(levels)
+
+        converged = monitor.converged()
+        tags.log('FSV', f"Max hold {'converged' if converged else 'not converged'} after {monitor.sweeps} sweeps ({monitor.elapsed():.1f} s), last growth {monitor.growth:.3f} dB.", duration=round(monitor.elapsed(), 3), sweeps=monitor.sweeps)
+        return converged
 
     # show marker table true/false
     def show_mtable(self, visible):
         if self.connect():
             if visible:
-                self.instrument.write("DISP:MTAB ON")
+                self.write("DISP:MTAB ON")
                 tags.log('FSV', "Marker table turned on.")
             else:
-                self.instrument.write("DISP:MTAB OFF")
+                self.write("DISP:MTAB OFF")
                 tags.log('FSV', "Marker table turned off.")
             self.disconnect()
 
@@ -289,14 +384,14 @@ class FSV(instrument.BaseInstrument):
         fsv_path = 'C:\\Documents and Settings\\instrument\\My Documents\\My Pictures\\screenshot.jpg'
 
         if self.connect():
-            self.instrument.write('HCOP:DEV:LANG JPG')
-            self.instrument.write('HCOP:DEST "MMEM"')
-            self.instrument.write(f'MMEM:NAME "{fsv_path}"')
-            self.instrument.write('HCOP')
+            self.write('HCOP:DEV:LANG JPG')
+            self.write('HCOP:DEST "MMEM"')
+            self.write(f'MMEM:NAME "{fsv_path}"')
+            self.write('HCOP')
 
-            sleep(5)
+            self.wait(5)
 
-            out = self.instrument.query_binary_values(f"MMEM:DATA? '{fsv_path}'", datatype='B')
+            out = self.query_binary_values(f"MMEM:DATA? '{fsv_path}'", datatype='B')
             outData = bytearray(out)
             image = Image.open(io.BytesIO(outData))
             image.save(os.path.join(path.replace('/', '\\'), filename.replace(':', '-')))
@@ -311,14 +406,14 @@ class FSV(instrument.BaseInstrument):
     def take_screenshot_connected(self, filename, path):
         fsv_path = 'C:\\Documents and Settings\\instrument\\My Documents\\My Pictures\\screenshot.jpg'
 
-        self.instrument.write('HCOP:DEV:LANG JPG')
-        self.instrument.write('HCOP:DEST "MMEM"')
-        self.instrument.write(f'MMEM:NAME "{fsv_path}"')
-        self.instrument.write('HCOP')
+        self.write('HCOP:DEV:LANG JPG')
+        self.write('HCOP:DEST "MMEM"')
+        self.write(f'MMEM:NAME "{fsv_path}"')
+        self.write('HCOP')
 
-        sleep(5)
+        self.wait(5)
 
-        out = self.instrument.query_binary_values(f"MMEM:DATA? '{fsv_path}'", datatype='B')
+        out = self.query_binary_values(f"MMEM:DATA? '{fsv_path}'", datatype='B')
         outData = bytearray(out)
         image = Image.open(io.BytesIO(outData))
         image.save(os.path.join(path.replace('/', '\\'), filename.replace(':', '-')))
@@ -336,35 +431,22 @@ class FSV(instrument.BaseInstrument):
 
                 # prepare parameters
                 tags.log('FSV', 'Setting FSV parameters for OBW measurement.')
-                self.set_center_freq_connected(center_frequency)
-                sleep(0.5)
-                self.set_span_connected(obw_parameters['span'])
-                sleep(0.5)
-                self.set_rbw_connected(obw_parameters['rbw'])
-                sleep(0.5)
-
-                self.check_stop()
-
-                self.set_vbw_ratio_connected(obw_parameters['vbw_ratio'])
-                sleep(0.5)
-                self.set_trace_mode_connected(1, 'maxhold')
-                sleep(1)
-                self.set_trace_mode_connected(2, 'write')
-                sleep(1)
-                self.set_det_mode_connected(obw_parameters['det_mode'])      # BUG: for some reason trace 2 isn't affected by the detector mode change
-                sleep(0.5)
+                self.load_setup_connected('obw', obw_parameters, lambda: self.configure_obw_connected(obw_parameters))
+                if self.set_center_freq_connected(center_frequency):
+                    self.wait(0.5)
 
                 self.check_stop()
 
                 # perform automated measurement
-                self.instrument.write('CALC:MARK:FUNC:POW:SEL OBW')
-                sleep(10)
+                self.set_trace_mode_connected(1, 'maxhold')     # restarts the max hold with the final settings
+                self.wait_maxhold_connected()
                 self.check_stop()
-                self.instrument.write('CALC:MARK:MAX')
-                obw = self.instrument.query('CALC:MARK:FUNC:POW:RES? OBW')
+                self.write('CALC:MARK:MAX')
+                obw = self.query('CALC:MARK:FUNC:POW:RES? OBW')
                 tags.log('FSV', f'OBW measurement executed: {self.format_freq(str.strip(obw))}. Screenshot being saved.')
+                self.archive_trace_connected('obw')
                 self.take_screenshot_connected(filename, path)
-                sleep(3)
+                self.wait(3)
                 self.disconnect()
                 return obw
             else:
@@ -375,32 +457,168 @@ class FSV(instrument.BaseInstrument):
             tags.log('FSV', 'Measurement interrupted.')
             return None
         
-    # setup instrument for OOB measurement
-    def prep_oob_parameters(self, centre_freq, oob_parameters, dm2):
+    # span, bandwidths, trace modes, detector, sweep and measurement function of the OBW measurement
+    def configure_obw_connected(self, obw_parameters):
+        if self.set_span_connected(obw_parameters['span']):
+            self.wait(0.5)
+        if self.set_rbw_connected(obw_parameters['rbw']):
+            self.wait(0.5)
+
+        self.check_stop()
+
+        if self.set_vbw_ratio_connected(obw_parameters['vbw_ratio']):
+            self.wait(0.5)
+        if self.set_trace_mode_connected(1, 'maxhold'):
+            self.wait(1)
+        if self.set_trace_mode_connected(2, 'write'):
+            self.wait(1)
+        if self.set_det_mode_connected(obw_parameters['det_mode']):      # BUG: for some reason trace 2 isn't affected by the detector mode change
+            self.wait(0.5)
+        self.set_sweep_connected(obw_parameters)
+        self.write('CALC:MARK:FUNC:POW:SEL OBW')
+
+    # capture one max-hold trace with settings valid for several tests, which are then evaluated on the host. dwell is the maximum hold time in seconds. returns (freqs, levels) or None if stopped
+    def capture_trace(self, label, centre_freq, parameters, dwell, filename, path, limit_points=None):
         try:
             if self.connect():
-                # prepare parameters
-                self.set_center_freq_connected(centre_freq)
-                sleep(0.5)
-                self.set_span_connected(oob_parameters['span'])
-                sleep(0.5)
-                self.set_rbw_connected(oob_parameters['rbw'])
-                sleep(0.5)
+                tags.log('FSV', 'Setting FSV parameters for single capture.')
+                self.load_setup_connected('capture', parameters, lambda: self.configure_capture_connected(parameters))
+                if self.set_center_freq_connected(centre_freq):
+                    self.wait(0.5)
+
                 self.check_stop()
-                if dm2:
-                    self.set_trace_mode_connected(1, 'average')
+
+                # limit line only for the screenshot, compliance is evaluated on the host
+                self.write('CALC:MARK:AOFF')
+                if limit_points is not None:
+                    self.activate_limit_connected(limit_points)
+                    self.write_setting('DISP:TRAC:Y:RLEV 20dBm')
                 else:
-                    self.set_trace_mode_connected(1, 'maxhold')
-                    sleep(0.5)
+                    self.deactivate_limit_connected()
+
+                # max hold started last so that it only contains sweeps with the final settings
                 self.set_trace_mode_connected(2, 'write')
-                sleep(0.5)
-                self.set_det_mode_connected(oob_parameters['det_mode'])
+                self.set_trace_mode_connected(1, 'maxhold')
+                self.wait_maxhold_connected(max_time=dwell)
+                self.check_stop()
+
+                trace = self.read_trace_connected()
+                tags.log('FSV', f'Single capture of {len(trace[1])} points executed. Screenshot being saved.')
+                self.archive_trace_connected(label, trace)
+                self.take_screenshot_connected(filename, path)
+                self.wait(3)
+                self.disconnect()
+                return trace
+            else:
+                return None
+
+        except InterruptedError:
+            self.disconnect()
+            tags.log('FSV', 'Measurement interrupted.')
+            return None
+
+    # span, bandwidths, detector and sweep of a capture evaluated on the host (single capture, hop capture)
+    def configure_capture_connected(self, parameters):
+        if self.set_span_connected(parameters['span']):
+            self.wait(0.5)
+        if self.set_rbw_connected(parameters['rbw']):
+            self.wait(0.5)
+        if self.set_vbw_ratio_connected(parameters['vbw_ratio']):
+            self.wait(0.5)
+        if self.set_det_mode_connected(parameters['det_mode']):
+            self.wait(0.5)
+        self.set_sweep_connected(parameters)
+
+    # stream single sweeps over the hop set of an FHSS device until every hop channel was seen often enough or max_time (in seconds) has passed
+    # returns (freqs, coverage, ring) with the host-side max hold and hit counts in coverage and the spectrogram in ring, or None if stopped
+    def capture_hops(self, centre_freq, parameters, channels, ocw, max_time, filename, path):
+        try:
+            if self.connect():
+                tags.log('FSV', f'Setting FSV parameters for hop capture of {len(channels)} channels.')
+                self.load_setup_connected('hops', parameters, lambda: self.configure_capture_connected(parameters))
+                if self.set_center_freq_connected(centre_freq):
+                    self.wait(0.5)
+                self.check_stop()
 
+                # every sweep is read exactly once in single sweep mode, trace 2 holds the maximum for the screenshot
+                self.deactivate_limit_connected()
+                self.write('CALC:MARK:AOFF')
+                self.set_trace_mode_connected(1, 'write')
+                self.set_trace_mode_connected(2, 'maxhold')
+                self.write('INIT:CONT OFF')
+                timeout = self.instrument.timeout
+                self.instrument.timeout = max(timeout, 2000*(self.sweep_time or 1) + 5000)     # *OPC? returns at the end of the sweep
+                try:
+                    self.query('INIT:IMM;*OPC?')
+                    freqs, levels = self.read_trace_connected()
+                    coverage = fhss.HopCoverage(freqs, channels, ocw)
+                    ring = fhss.SpectrogramRing(len(freqs))
+                    started = time.monotonic()
+
+                    while True:
+                        coverage.update(levels)
+                        ring.append(levels, time.time())
+                        if coverage.complete() or time.monotonic() - started >= max_time:
+                            break
+                        self.check_stop()
+                        self.query('INIT:IMM;*OPC?')
+                        with self.io_lock:
+                            levels = read_levels(self.instrument)
+                            self.last_activity = time.monotonic()
+                finally:
+                    self.instrument.timeout = timeout
+                    self.write('INIT:CONT ON')
+
+                if coverage.complete():
+                    tags.log('FSV', f'Hop capture complete after {coverage.sweeps} sweeps, every channel seen at least {coverage.hits_required} times.')
+                else:
+                    tags.log('FSV', f'Hop capture ended after {coverage.sweeps} sweeps, channels not seen often enough: {", ".join(self.format_freq(freq) for freq in coverage.missing())}.')
+                self.take_screenshot_connected(filename, path)
+                self.wait(3)
                 self.disconnect()
+                return freqs, coverage, ring
+            else:
+                return None
+
         except InterruptedError:
             self.disconnect()
             tags.log('FSV', 'Measurement interrupted.')
             return None
+
+    # setup instrument for OOB measurement
+    def prep_oob_parameters(self, centre_freq, oob_parameters, dm2):
+        try:
+            if self.connect():
+                # prepare parameters
+                self.load_setup_connected('oob_dm2' if dm2 else 'oob', oob_parameters, lambda: self.configure_oob_connected(oob_parameters, dm2))
+                if self.set_center_freq_connected(centre_freq):
+                    self.wait(0.5)
+                self.set_trace_mode_connected(1, 'average' if dm2 else 'maxhold')       # restarts the accumulation with the final settings
+
+                self.disconnect()
+        except InterruptedError:
+            self.disconnect()
+            tags.log('FSV', 'Measurement interrupted.')
+            return None
+
+    # span, bandwidths, trace modes, detector and sweep of the OOB measurements
+    def configure_oob_connected(self, oob_parameters, dm2):
+        if self.set_span_connected(oob_parameters['span']):
+            self.wait(0.5)
+        if self.set_rbw_connected(oob_parameters['rbw']):
+            self.wait(0.5)
+        if 'vbw_ratio' in oob_parameters and self.set_vbw_ratio_connected(oob_parameters['vbw_ratio']):       # only coupled by the optimized sweep parameters
+            self.wait(0.5)
+        self.check_stop()
+        if dm2:
+            self.set_trace_mode_connected(1, 'average')
+        else:
+            if self.set_trace_mode_connected(1, 'maxhold'):
+                self.wait(0.5)
+        if self.set_trace_mode_connected(2, 'write'):
+            self.wait(0.5)
+        self.set_det_mode_connected(oob_parameters['det_mode'])
+        self.set_sweep_connected(oob_parameters)
     
     # measure out-of-band emissions for operating channel
     def measure_oob_oc(self, limit_points, filename, path):
@@ -408,69 +626,52 @@ class FSV(instrument.BaseInstrument):
             if self.connect():
                 tags.log('FSV', 'Calculating out-of-band emissions for operating channel.')
 
-                # clear lines and then define a new limit line
-                self.instrument.write('CALC:LIM1:DEL')
-                self.instrument.write('CALC:MARK:AOFF')
-                self.instrument.write('CALC:LIM1:NAME "LIMIT"')
-                self.instrument.write('CALC:LIM1:COMM "Upper Limit OOB"')
-                self.instrument.write('CALC:LIM1:TRAC 1')
-                self.instrument.write('CALC:LIM1:UNIT DBM')
+                # clear markers and turn on the limit line of the mask, uploaded only at the first condition of the EUT
+                self.write('CALC:MARK:AOFF')
+                self.activate_limit_connected(limit_points)
 
-                self.check_stop()
-                sleep(1)
-
-                # create the SCPI commands for populating the limit line with datapoints with the given list of points
-                freq_cmd, dbm_cmd = self.create_limit_scpi_commands(limit_points)
-                self.instrument.write(freq_cmd)
-                self.instrument.write(dbm_cmd)
+                # adjust the offset in order to display limit line correctly
+                self.write_setting('DISP:TRAC:Y:RLEV 20dBm')
 
                 self.check_stop()
-                sleep(1)
-
-                # adjust the offset in order to display limit line correctly and turn on the limit line
-                self.instrument.write('DISP:TRAC:Y:RLEV 20dBm')
-                self.instrument.write('CALC:LIM1:UPP:STAT ON')
-                self.instrument.write('CALC:LIM1:STAT ON')
-
-                self.check_stop()
-                sleep(1)
+                self.wait(1)
 
                 # adjust span to display the total limit line in all cases
-                self.instrument.write(f'SENS:FREQ:STAR {limit_points[0][0]}')
-                self.instrument.write(f'SENS:FREQ:STOP {limit_points[5][0]}')
+                self.set_start_stop_connected(limit_points[0][0], limit_points[5][0])
 
                 # deploy markers to peaks surrounding operating channel, three to either side of operating channel
                 left_oc_border = limit_points[1][0]
                 right_oc_border = limit_points[4][0]
 
                 for nr in range(1, 4):
-                    self.instrument.write(f'CALC:MARK{nr} ON')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:X {left_oc_border if nr == 1 else self.instrument.query(f"CALC:MARK{nr-1}:X?")}')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:MAX:LEFT')
-                    sleep(0.5)
+                    self.write(f'CALC:MARK{nr} ON')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:X {left_oc_border if nr == 1 else self.query(f"CALC:MARK{nr-1}:X?")}')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:MAX:LEFT')
+                    self.wait(0.5)
                     self.check_stop()
 
                 for nr in range (4, 7):
-                    self.instrument.write(f'CALC:MARK{nr} ON')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:X {right_oc_border if nr == 4 else self.instrument.query(f"CALC:MARK{nr-1}:X?")}')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:MAX:RIGHT')
-                    sleep(0.5)
+                    self.write(f'CALC:MARK{nr} ON')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:X {right_oc_border if nr == 4 else self.query(f"CALC:MARK{nr-1}:X?")}')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:MAX:RIGHT')
+                    self.wait(0.5)
                     self.check_stop()
 
-                self.instrument.write('DISP:MTAB ON')
+                self.write('DISP:MTAB ON')
 
-                sleep(1)
+                self.wait(1)
                 self.check_stop()
 
                 # query limit check and then take a screenshot
-                oc_fail = self.instrument.query('CALC:LIM1:FAIL?')
+                oc_fail = self.query('CALC:LIM1:FAIL?')
                 tags.log('FSV', f'Operating Channel OOB Test: {"PASS" if "0" in oc_fail else "FAIL"}. Screenshot being saved.')
+                self.archive_trace_connected('oob_oc')
                 self.take_screenshot_connected(filename, path)
-                sleep(3)
+                self.wait(3)
 
                 # disconnect from device
                 self.disconnect()
@@ -483,7 +684,8 @@ class FSV(instrument.BaseInstrument):
             return None
         
     # measure out-of-band emissions for operational frequency band
-    def measure_oob_ofb(self, limit_points, filename, path):
+    # sweeps: optimized sweep parameters per domain (center, left, right), otherwise the sweep time is coupled to the span automatically
+    def measure_oob_ofb(self, limit_points, filename, path, sweeps=None):
         try:
             if self.connect():
                 tags.log('FSV', 'Calculating out-of-band emissions for operational frequency band.')
@@ -494,136 +696,117 @@ class FSV(instrument.BaseInstrument):
                 # set span to adjust for limit lines
                 self.set_span_connected(limit_points[-1][0]-limit_points[0][0])
 
-                # cleanup and then define a new limit line
-                self.instrument.write('CALC:LIM1:DEL')
-                self.instrument.write('CALC:MARK:AOFF')
-                self.instrument.write('CALC:LIM1:NAME "LIMIT"')
-                self.instrument.write('CALC:LIM1:COMM "Upper Limit OOB"')
-                self.instrument.write('CALC:LIM1:TRAC 1')
-                self.instrument.write('CALC:LIM1:UNIT DBM')
+                # clear markers
+                self.write('CALC:MARK:AOFF')
 
                 self.check_stop()
-                sleep(1)
-
-                # create the SCPI commands for populating the limit line with datapoints with the given list of points
-                freq_cmd, dbm_cmd = self.create_limit_scpi_commands(limit_points)
-                self.instrument.write(freq_cmd)
-                self.instrument.write(dbm_cmd)
-
-                self.check_stop()
-                sleep(1)
 
                 # set span to fit limit line
-                self.instrument.write(f'SENS:FREQ:STAR {limit_points[0][0]}')
-                self.instrument.write(f'SENS:FREQ:STOP {limit_points[7][0]}')
+                self.set_start_stop_connected(limit_points[0][0], limit_points[7][0])
+                if sweeps is None:
+                    self.set_sweep_time_connected(None)
+                else:
+                    self.set_sweep_connected(sweeps['center'])
 
-                # adjust the offset in order to display limit line correctly and turn on the limit line
-                self.instrument.write('DISP:TRAC:Y:RLEV 20dBm')
-                self.instrument.write('CALC:LIM1:UPP:STAT ON')  # turns on limit line
-                self.instrument.write('CALC:LIM1:STAT ON')  # turns on limit check
+                # adjust the offset in order to display limit line correctly and turn on the limit line of the mask, uploaded only at the first condition of the EUT
+                self.write_setting('DISP:TRAC:Y:RLEV 20dBm')
+                self.activate_limit_connected(limit_points)
 
                 self.check_stop()
-                sleep(1)
+                self.wait(1)
 
                 # deploy markers to peaks surrounding operational frequency band, three to either side of frequency band
                 left_ofb_border = limit_points[2][0]
                 right_ofb_border = limit_points[4][0]
 
                 for nr in range(1, 4):
-                    self.instrument.write(f'CALC:MARK{nr} ON')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:X {left_ofb_border if nr == 1 else self.instrument.query(f"CALC:MARK{nr-1}:X?")}')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK:MAX{nr}:LEFT')
-                    sleep(0.5)
+                    self.write(f'CALC:MARK{nr} ON')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:X {left_ofb_border if nr == 1 else self.query(f"CALC:MARK{nr-1}:X?")}')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK:MAX{nr}:LEFT')
+                    self.wait(0.5)
                     self.check_stop()
 
                 for nr in range (4, 7):
-                    self.instrument.write(f'CALC:MARK{nr} ON')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:X {right_ofb_border if nr == 4 else self.instrument.query(f"CALC:MARK{nr-1}:X?")}')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK:MAX{nr}:RIGHT')
-                    sleep(0.5)
+                    self.write(f'CALC:MARK{nr} ON')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:X {right_ofb_border if nr == 4 else self.query(f"CALC:MARK{nr-1}:X?")}')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK:MAX{nr}:RIGHT')
+                    self.wait(0.5)
                     self.check_stop()
 
                 # turn on marker table
-                self.instrument.write('DISP:MTAB ON')
+                self.write('DISP:MTAB ON')
 
                 # limit check and save result for operational frequency band
                 tags.log('FSV', 'Measurement for central domain concluded. Screenshot being saved.')
-                ofb_fail.append(self.instrument.query('CALC:LIM1:FAIL?'))
+                ofb_fail.append(self.query('CALC:LIM1:FAIL?'))
 
-                sleep(1)
+                self.wait(1)
                 self.check_stop()
+                self.archive_trace_connected('oob_ofb_center')
                 self.take_screenshot_connected(filename, path)
                 self.check_stop()
-                sleep(3)
+                self.wait(3)
 
                 # execute measurements for lower and upper edge cases with different RBW
-                # clear limit lines, set RBW and add threshold line according to standard
-                self.instrument.write('CALC:LIM1:DEL')
-                self.instrument.write('CALC:MARK:AOFF')
-                self.instrument.write('SENS:BAND:RES 10000')
-
-                self.instrument.write('CALC:LIM1:NAME "LIMIT: -36dB"')
-                self.instrument.write('CALC:LIM1:COMM "Upper Limit OOB"')
-                self.instrument.write('CALC:LIM1:TRAC 1')
-                self.instrument.write('CALC:LIM1:UNIT DBM')
+                # set RBW and switch to the threshold line according to standard
+                self.write('CALC:MARK:AOFF')
+                self.set_rbw_connected(10000)
+                self.activate_limit_connected([(left_ofb_border-4000000, -36), (right_ofb_border+4000000, -36)], 'Spurious domain -36 dBm')
 
                 self.check_stop()
-                sleep(1)
-
-                freq_cmd, dbm_cmd = self.create_limit_scpi_commands([(left_ofb_border-4000000, -36), (right_ofb_border+4000000, -36)])
-                self.instrument.write(freq_cmd)
-                self.instrument.write(dbm_cmd)
-                self.instrument.write('CALC:LIM1:UPP:STAT ON')  # turns on limit line
-                self.instrument.write('CALC:LIM1:STAT ON')  # turns on limit check
 
                 # move displayed spectrum to lower edge case, add markers and take a screenshot
-                self.instrument.write(f'SENS:FREQ:STAR {left_ofb_border-4000000}')  # 4 MHz down from left border
-                self.instrument.write(f'SENS:FREQ:STOP {left_ofb_border}')
+                self.set_start_stop_connected(left_ofb_border-4000000, left_ofb_border)  # 4 MHz down from left border
+                if sweeps is not None:
+                    self.set_sweep_connected(sweeps['left'])
 
                 for nr in range(1, 4):
-                    self.instrument.write(f'CALC:MARK{nr} ON')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:MAX:NEXT')
-                    sleep(0.5)
+                    self.write(f'CALC:MARK{nr} ON')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:MAX:NEXT')
+                    self.wait(0.5)
                     self.check_stop()
 
                 tags.log('FSV', 'Measurement for lower spurious domain concluded. Screenshot being saved.')
-                ofb_fail.append(self.instrument.query('CALC:LIM1:FAIL?'))
+                ofb_fail.append(self.query('CALC:LIM1:FAIL?'))
 
-                sleep(1)
+                self.wait(1)
                 self.check_stop()
+                self.archive_trace_connected('oob_ofb_left')
                 self.take_screenshot_connected(filename.replace('center', 'left'), path)
                 self.check_stop()
-                sleep(3)
+                self.wait(3)
 
                 # move displayed spectrum to upper edge case, add markers and take a screenshot
-                self.instrument.write(f'SENS:FREQ:STAR {right_ofb_border}')  # 4 MHz up from right border
-                self.instrument.write(f'SENS:FREQ:STOP {right_ofb_border+4000000}')
-                self.instrument.write('CALC:MARK:AOFF')
+                self.set_start_stop_connected(right_ofb_border, right_ofb_border+4000000)  # 4 MHz up from right border
+                if sweeps is not None:
+                    self.set_sweep_connected(sweeps['right'])
+                self.write('CALC:MARK:AOFF')
 
                 for nr in range(1, 4):
-                    self.instrument.write(f'CALC:MARK{nr} ON')
-                    sleep(0.5)
-                    self.instrument.write(f'CALC:MARK{nr}:MAX:NEXT')
-                    sleep(0.5)
+                    self.write(f'CALC:MARK{nr} ON')
+                    self.wait(0.5)
+                    self.write(f'CALC:MARK{nr}:MAX:NEXT')
+                    self.wait(0.5)
                     self.check_stop()
 
                 tags.log('FSV', 'Measurement for upper spurious domain concluded. Screenshot being saved.')
-                ofb_fail.append(self.instrument.query('CALC:LIM1:FAIL?'))
+                ofb_fail.append(self.query('CALC:LIM1:FAIL?'))
 
-                sleep(1)
+                self.wait(1)
                 self.check_stop()
+                self.archive_trace_connected('oob_ofb_right')
                 self.take_screenshot_connected(filename.replace('center', 'right'), path)
                 self.check_stop()
-                sleep(3)
+                self.wait(3)
 
-                # cleanup
-                self.instrument.write('CALC:LIM1:DEL')
-                self.instrument.write('CALC:MARK:AOFF')
+                # cleanup, the limit lines stay in the library of the instrument
+                self.deactivate_limit_connected()
+                self.write('CALC:MARK:AOFF')
 
                 # disconnect from device
                 self.disconnect()
@@ -641,6 +824,63 @@ class FSV(instrument.BaseInstrument):
             return None
 
 
+    ### LIMIT LINES
+    # turn on the limit line of a mask in LIM1 with one command, the line is uploaded first if it wasn't used for the current EUT yet
+    def activate_limit_connected(self, points, comment='Upper Limit OOB'):
+        name = self.limits.name(points)
+        for stale in self.limits.take_stale():      # lines of previous EUTs
+            self.write(f'CALC:LIM1:NAME "{stale}"')
+            self.write('CALC:LIM1:DEL')
+
+        if name not in self.limits.uploaded:
+            self.write(f'CALC:LIM1:NAME "{name}"')
+            self.write(f'CALC:LIM1:COMM "{comment}"')
+            self.write('CALC:LIM1:TRAC 1')
+            self.write('CALC:LIM1:UNIT DBM')
+
+            # create the SCPI commands for populating the limit line with datapoints with the given list of points
+            freq_cmd, dbm_cmd = self.create_limit_scpi_commands(points)
+            self.write(freq_cmd)
+            self.write(dbm_cmd)
+            self.limits.uploaded.add(name)
+            tags.log('FSV', f'Limit line {name} uploaded ({len(points)} points).')
+
+            self.check_stop()
+            self.wait(1)
+
+        self.write(f'CALC:LIM1:NAME "{name}";:CALC:LIM1:UPP:STAT ON;:CALC:LIM1:STAT ON')      # select line, turn on limit line and limit check
+        return name
+
+    # turn off limit line and limit check of LIM1 without deleting the line
+    def deactivate_limit_connected(self):
+        self.write('CALC:LIM1:UPP:STAT OFF;:CALC:LIM1:STAT OFF')
+
+    ### LIVE VIEW
+    # fetch a trace without waiting for a running operation. returns (freqs, levels) or None if the session is busy
+    def fetch_trace(self, trace_nr=1, timeout=1000):
+        return self.sample_with(lambda session: read_trace(session, trace_nr), timeout)
+
+    # read trace 1 on the open session, returns (freqs, levels)
+    def read_trace_connected(self):
+        with self.io_lock:
+            trace = read_trace(self.instrument)
+            self.last_activity = time.monotonic()
+            return trace
+
+    # hand trace 1 with its settings to the trace sink (e.g. the trace archive of the running measurement) before the display is captured
+    def archive_trace_connected(self, label, trace=None):
+        if self.trace_sink is None:
+            return
+        with self.io_lock:
+            freqs, levels = trace if trace is not None else self.read_trace_connected()
+            settings = {
+                'rbw': float(self.query('BAND?')),
+                'vbw': float(self.query('BAND:VID?')),
+                'detector': self.query('DET?').strip()
+            }
+        self.trace_sink(freqs, levels, label, settings)
+
+
     ### HELPER FUNCTIONS
     # format frequency, takes a frequency number and returns a string with appropriate unit (kHz, MHz, GHz)
     def format_freq(self, freq):
@@ -1,37 +1,201 @@
 """
 file: base instrument class from which specific instrument classes are derived
 author: rueck.joshua@gmail.com
-last updated: 02/07/2024
+last updated: 19/10/2026
 """
 
 import pyvisa
 import tags
+import cancellation
+import time
+from threading import RLock
+
+# factory of the VISA resource manager of every instrument, replaced by cassette.py to record or replay sessions
+resource_manager_factory = pyvisa.ResourceManager
 
 class BaseInstrument:
 
+    # query used to read one entry of the instrument error queue, None if the instrument has no SCPI error queue
+    error_query = None
+    # cheap query used by the connection watchdog to check if the link is still alive
+    heartbeat_query = '*IDN?'
+    # commands that bring the instrument back to its defaults and thereby invalidate the shadow cache
+    reset_commands = ('*RST',)
+
     def __init__(self, visa_address):
-        self.rm = pyvisa.ResourceManager()
+        self.rm = resource_manager_factory()
         self.visa_address = visa_address
         self.instrument = None
+        self.io_lock = RLock()          # serializes all traffic on the session between measurement and watchdog
+        self.connected = False
+        self.last_activity = 0.0        # monotonic timestamp of last successful communication
+        self.cancel_token = cancellation.CancelToken()      # replaced by the token of each new measurement
+        self.shadow = {}                # last confirmed setting command per setting, used to suppress redundant writes
 
     def connect(self, name = ""): 
         try:
-            self.instrument = self.rm.open_resource(self.visa_address)
-            self.instrument.write_termination = '\n'
-            self.instrument.read_termination = '\n'
+            with self.io_lock:
+                self.instrument = self.rm.open_resource(self.visa_address)
+                self.instrument.write_termination = '\n'
+                self.instrument.read_termination = '\n'
+                self.connected = True
             return True
         except:
-            tags.log('Instrument', f'Connection: Error connecting to instrument {name}')
+            tags.log('Instrument', f'Connection: Error connecting to instrument {name}', tags.ERROR, instrument=self.visa_address)
             return False
 
     def initialize(self, name = ""):
         if self.connect(name):
-            id = self.instrument.query('*IDN?')
+            id = self.query('*IDN?')
             tags.log('Instrument', f"Succesfully connected to instrument {id.strip()}")
-            self.instrument.write('*RST')
+            self.write('*RST')
             self.disconnect()
         else:
-            tags.log('Instrument', f'Initialization: Unable to connect to instrument {name}')
+            tags.log('Instrument', f'Initialization: Unable to connect to instrument {name}', tags.ERROR, instrument=self.visa_address)
 
     def disconnect(self):
-        self.instrument.close()
\ No newline at end of file
+        with self.io_lock:
+            self.connected = False
+            self.instrument.close()
+
+    ### INTERRUPTION
+    # stop any ongoing operation of this instrument
+    def stop_operation(self):
+        self.cancel_token.cancel()
+
+    # check if the operation has been stopped
+    def check_stop(self):
+        self.cancel_token.check()
+
+    # interruptible replacement for sleep within operations that may be stopped
+    def wait(self, seconds):
+        self.cancel_token.sleep(seconds)
+
+    ### SESSION I/O
+    # write a command on the open session
+    def write(self, command):
+        with self.io_lock:
+            if command in self.reset_commands:
+                self.shadow.clear()
+            self.instrument.write(command)
+            self.last_activity = time.monotonic()
+
+    # write a setting only if it differs from the last confirmed one, the key defaults to the command header. returns True if written
+    def write_setting(self, command, key=None):
+        key = key or command.split(' ')[0]
+        if self.shadow.get(key) == command:
+            return False
+        self.write(command)
+        self.shadow[key] = command
+        return True
+
+    # forget the cached state of the given settings or of all settings if none are given, e.g. after changes on the front panel
+    def invalidate(self, *keys):
+        if not keys:
+            self.shadow.clear()
+        for key in keys:
+            self.shadow.pop(key, None)
+
+    # query the instrument on the open session
+    def query(self, command):
+        with self.io_lock:
+            response = self.instrument.query(command)
+            self.last_activity = time.monotonic()
+            return response
+
+    # query binary block data on the open session
+    def query_binary_values(self, command, **kwargs):
+        with self.io_lock:
+            values = self.instrument.query_binary_values(command, **kwargs)
+            self.last_activity = time.monotonic()
+            return values
+
+    # query without disturbing a running operation: uses the open session or a short-lived one, returns None if the session is busy
+    def sample(self, command, timeout=1000):
+        return self.sample_with(lambda session: session.query(command), timeout)
+
+    # run an operation on the open session or a short-lived one without waiting for a running operation, returns None if the session is busy
+    def sample_with(self, operation, timeout=1000):
+        if not self.io_lock.acquire(blocking=False):
+            return None
+        try:
+            return self._run_on_session(operation, timeout)
+        finally:
+            self.io_lock.release()
+
+    # run an operation on the open session or a short-lived one once the session is free, e.g. from the watchdog thread. never opens or closes the shared session
+    def run_with(self, operation, timeout=1500):
+        with self.io_lock:
+            return self._run_on_session(operation, timeout)
+
+    def _run_on_session(self, operation, timeout):
+        if self.connected:
+            result = operation(self.instrument)
+            self.last_activity = time.monotonic()
+            return result
+
+        resource = self.rm.open_resource(self.visa_address, open_timeout=timeout)
+        try:
+            resource.timeout = timeout
+            resource.write_termination = '\n'
+            resource.read_termination = '\n'
+            result = operation(resource)
+            self.last_activity = time.monotonic()
+            return result
+        finally:
+            resource.close()
+
+    # open a separate short-lived session with strict timeouts (ms) and return identification and pending errors, raises on any failure
+    def probe(self, timeout=1500):
+        resource = self.rm.open_resource(self.visa_address, open_timeout=timeout)
+        try:
+            resource.timeout = timeout
+            resource.write_termination = '\n'
+            resource.read_termination = '\n'
+            idn = resource.query('*IDN?').strip()
+
+            errors = []
+            if self.error_query:
+                for _ in range(10):     # bounded, a faulty instrument must not keep the probe busy
+                    error = resource.query(self.error_query).strip()
+                    if error.startswith('0') or error.startswith('+0'):
+                        break
+                    errors.append(error)
+
+            self.last_activity = time.monotonic()
+            return idn, errors
+        finally:
+            resource.close()
+
+    ### CONNECTION WATCHDOG
+    # check if the link is alive, uses the open session if there is one and a plain *IDN? on a short-lived session otherwise. returns False if the session is busy
+    def heartbeat(self, timeout=1500):
+        if not self.io_lock.acquire(timeout=timeout/1000):
+            return False
+        try:
+            if self.connected:
+                self.query(self.heartbeat_query)
+            else:
+                self._run_on_session(lambda session: session.query('*IDN?'), timeout)      # error queue left to the measurement
+            return True
+        finally:
+            self.io_lock.release()
+
+    # replace a dead session by a new one, only the session of a running operation needs to be reopened
+    def reconnect(self):
+        with self.io_lock:
+            self.shadow.clear()         # instrument may have been power cycled, nothing can be assumed
+            if self.connected:
+                try:
+                    self.instrument.close()
+                except:
+                    pass
+                self.instrument = self.rm.open_resource(self.visa_address)
+                self.instrument.write_termination = '\n'
+                self.instrument.read_termination = '\n'
+            self.probe()
+
+    # re-apply state that must survive a lost connection, implemented by derived instruments. called by the watchdog thread after reconnect(),
+    # so it must only use run_with() and never connect() / disconnect() the session of the measurement thread
+    def restore_state(self):
+        pass
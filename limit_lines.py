@@ -0,0 +1,40 @@
+"""
+file: library of the limit lines uploaded to the FSV, every mask is stored once under a name derived from its vertices and re-activated by name
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import hashlib
+
+NAME_LENGTH = 8         # limit line names on the FSV, 'M' followed by the start of the hash of the vertices
+
+
+# limit lines on the instrument for the current EUT, masks of the EUT don't change between temperature and voltage conditions
+class LimitLibrary:
+
+    def __init__(self):
+        self.uploaded = set()       # names of the lines uploaded for the current EUT
+        self.stale = set()          # names of lines of previous EUTs, deleted on the instrument with the next activation
+        self.eut = None
+
+    # name of the limit line of a mask, identical masks share one line. frequencies are rounded to 1 Hz and levels to 0.01 dB
+    @staticmethod
+    def name(points):
+        vertices = ';'.join(f'{round(float(freq))},{round(float(level), 2)}' for freq, level in points)
+        return 'M' + hashlib.sha1(vertices.encode()).hexdigest()[:NAME_LENGTH - 1].upper()
+
+    # a different EUT makes all uploaded lines stale, they are not needed on the instrument anymore
+    def select_eut(self, eut):
+        if eut != self.eut:
+            self.stale |= self.uploaded
+            self.uploaded = set()
+            self.eut = eut
+
+    # stale lines to be deleted now, each returned once
+    def take_stale(self):
+        stale, self.stale = self.stale, set()
+        return sorted(stale)
+
+    # forget all uploaded lines, e.g. if the limit line database of the instrument was changed on the front panel
+    def invalidate(self):
+        self.uploaded.clear()
@@ -0,0 +1,203 @@
+"""
+file: non-blocking structured logging: records are queued by the calling thread and written as JSON lines by a background writer with rotation and a ring buffer for the GUI
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import atexit
+import collections
+import contextlib
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+# levels
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'LOG', WARNING: 'WARNING', ERROR: 'ERROR'}      # INFO keeps the console format of the former print logging
+
+RING_SIZE = 2000                    # latest records kept in memory for the GUI
+MAX_BYTES = 10*1024*1024            # size of the log file before it is rotated
+BACKUPS = 5                         # rotated log files kept (log.1 newest ... log.5 oldest)
+FLUSH_INTERVAL = 0.5                # in seconds, the writer flushes the file at least this often while records arrive
+
+_queue = queue.SimpleQueue()
+_context = threading.local()        # fields of the calling thread added to every record, e.g. condition and phase of a measurement
+_start_lock = threading.Lock()
+_writer = None
+_STOP = object()
+
+threshold = INFO                    # records below this level are dropped by the calling thread
+log_file = None                     # JSON lines file, None for console and ring buffer only
+console = True
+
+
+### CALLING THREAD
+# queue a record, the only work done by the calling thread is a level check and a put
+def emit(level, tag, message, fields=None):
+    if level < threshold:
+        return
+    if _writer is None:
+        _start()
+    _queue.put((time.time(), level, tag, message, threading.current_thread().name, getattr(_context, 'fields', None), fields))
+
+
+# fields added to all records of the calling thread within the block
+@contextlib.contextmanager
+def context(**fields):
+    previous = getattr(_context, 'fields', None)
+    _context.fields = {**previous, **fields} if previous else fields
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+# fields added to all further records of the calling thread, None removes a field
+def set_context(**fields):
+    current = {**(getattr(_context, 'fields', None) or {}), **fields}
+    _context.fields = {key: value for key, value in current.items() if value is not None} or None
+
+
+# log file, level and console output, applies to records queued from now on
+def configure(filename=None, level=INFO, to_console=True):
+    global log_file, threshold, console
+    log_file = filename
+    threshold = level
+    console = to_console
+
+
+### WRITER THREAD
+class LogWriter(threading.Thread):
+
+    def __init__(self):
+        super().__init__(name='Log writer', daemon=True)
+        self.ring = collections.deque(maxlen=RING_SIZE)
+        self.ring_lock = threading.Lock()
+        self.sequence = 0
+        self.file = None
+        self.filename = None
+
+    def run(self):
+        while True:
+            try:
+                item = _queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            # write everything queued in one go, flush once per batch
+            while True:
+                if item is _STOP:
+                    self.close()
+                    return
+                if isinstance(item, threading.Event):       # flush request
+                    self.flush()
+                    item.set()
+                else:
+                    self.write(item)
+                try:
+                    item = _queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.flush()
+
+    def write(self, item):
+        timestamp, level, tag, message, thread, context_fields, fields = item
+        time_text = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        record = {'time': time_text, 'level': LEVEL_NAMES.get(level, str(level)), 'tag': tag, 'message': str(message), 'thread': thread}
+        if context_fields:
+            record.update(context_fields)
+        if fields:
+            record.update(fields)
+
+        self.sequence += 1
+        with self.ring_lock:
+            self.ring.append((self.sequence, record))
+        if console:
+            print(f'{time_text} -- {record["level"]} -- [{tag}] {message}')
+        if log_file:
+            self.write_file(json.dumps(record, default=str, ensure_ascii=False))
+
+    def write_file(self, line):
+        try:
+            if self.file is None or self.filename != log_file:
+                self.open()
+            if self.file.tell() + len(line) + 1 > MAX_BYTES:
+                self.rotate()
+            self.file.write(line + '\n')
+        except OSError as e:
+            print(f'Log file {log_file} not writable: {e}')
+            self.file = None
+
+    def open(self):
+        if self.file is not None:
+            self.file.close()
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(log_file, 'a', encoding='utf-8')
+        self.filename = log_file
+
+    # log -> log.1 -> ... -> log.BACKUPS, the oldest file is dropped
+    def rotate(self):
+        self.file.close()
+        for i in range(BACKUPS - 1, 0, -1):
+            if os.path.exists(f'{log_file}.{i}'):
+                os.replace(f'{log_file}.{i}', f'{log_file}.{i + 1}')
+        os.replace(log_file, f'{log_file}.1')
+        self.file = open(log_file, 'a', encoding='utf-8')
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # records with a sequence number above since, oldest first, as (sequence, record)
+    def tail(self, since=0):
+        with self.ring_lock:
+            if not self.ring or self.ring[-1][0] <= since:
+                return []
+            return [entry for entry in self.ring if entry[0] > since]
+
+
+def _start():
+    global _writer
+    with _start_lock:
+        if _writer is None:
+            writer = LogWriter()
+            writer.start()
+            _writer = writer
+            atexit.register(shutdown)
+
+
+### READERS
+# records logged since the given sequence number as (sequence, record), for the log view of the GUI
+def tail(since=0):
+    return _writer.tail(since) if _writer is not None else []
+
+
+# wait until everything queued so far has been written
+def flush(timeout=5):
+    if _writer is None:
+        return
+    done = threading.Event()
+    _queue.put(done)
+    done.wait(timeout)
+
+
+# write the remaining records and stop the writer, registered to run at exit
+def shutdown(timeout=5):
+    global _writer
+    with _start_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        _queue.put(_STOP)
+        writer.join(timeout)
@@ -1,50 +1,193 @@
 """
 file: main file for OBW and OOB measurement automation in the context of EN 300 220-1
 author: rueck.joshua@gmail.com
-last updated: 27/08/2024
+last updated: 19/10/2026
 """
 
 import sys
-import csv
+import os
+import time
 import datetime
-from time import sleep
 import fsv
 import sps
 import wkl
 import tags
 import EN_300_220_1
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, QLineEdit, QComboBox, QPushButton, QFileDialog, QStatusBar, QMessageBox, QCheckBox, QRadioButton)
-from PyQt5.QtCore import Qt, QTime, QTimer, QLocale, QThread, pyqtSignal
-from PyQt5.QtGui import QDoubleValidator, QFont, QIcon
+import preflight
+import connection_watchdog
+import cancellation
+import shutdown
+import telemetry
+import spectrum_view
+import events
+import results_db
+import trace_archive
+import bands
+import report
+import stations
+import service
+import cassette
+import logbook
+import atexit
+import sqlite3
+import json
+import numpy as np
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, QLineEdit, QComboBox, QPushButton, QFileDialog, QStatusBar, QMessageBox, QCheckBox, QRadioButton, QPlainTextEdit)
+from PyQt5.QtCore import Qt, QTime, QTimer, QLocale, QThread, QRegExp
+from PyQt5.QtGui import QDoubleValidator, QRegExpValidator, QFont, QIcon
 import ctypes
 
 WKL_TIME_TO_SET = 30 # in Minuten
+FHSS_MAX_TIME = 300 # in seconds, the hop capture ends after this time even if not every hop channel was seen often enough
+SINGLE_CAPTURE_DWELL = 30 # in seconds, maximum max hold time of the single capture if the envelope does not converge earlier
+LOG_VIEW_LINES = 500 # log records kept in the log view of the GUI
+MAX_FREQ = 30e9 # in Hz, highest operating frequency and channel width
+MAX_VOLTAGE = 270 # in V, highest output voltage of the SPS (range 3), limit of the extreme voltages
+MAX_NOMINAL_VOLTAGE = 230 # in V, highest nominal operating voltage, leaves room for the extreme voltages above it
 
 # Class handling the measurement operation in a background thread once the measurement button is clicked
 class MeasurementThread(QThread):
 
-    measurement_complete = pyqtSignal(dict)
-
-    def __init__(self, parent, fsv, sps, chamber, standard, inputs):
+    def __init__(self, fsv, sps, chamber, standard, inputs, cancel_token, channel):
         super().__init__()
-        self.parent = parent
         self.fsv = fsv
         self.sps = sps
         self.chamber = chamber
         self.standard = standard
         self.inputs = inputs            
-
-    # main function of MeasurementThread class containing the general logical structure of measurement
+        self.cancel_token = cancel_token    # shared with the instruments, wakes up every wait as soon as the measurement is stopped
+        self.channel = channel              # only way of reporting to the GUI, widgets must not be touched from this thread
+        self.watchdog = None
+        self.error = None
+        self.shutdown_report = None
+        self.completed = False
+        self.abort_reason = None        # why the measurement ended without results although it was neither stopped nor failed
+        self.store = None
+        self.run_id = None
+        self.archive = None
+        self.condition = 'nominal'
+        self.centre_freq = inputs['channels'][0]     # channel currently measured
+        self.masks = {}                 # masks of the current channel per measurement step, for evaluating the captured traces
+        self.margins = {}               # margin to the mask per (step, channel) at the current plateau
+        self.report = None
+        self.observer = None            # called with every captured trace as well, e.g. by the engine service publishing traces to its clients
+
+    @property
+    def stop_flag(self):
+        return self.cancel_token.cancelled
+
+    # thread entry point, watches all instrument connections and records telemetry for the duration of the measurement
     def run(self):
+        self.watchdog = connection_watchdog.ConnectionWatchdog({'FSV': self.fsv, 'SPS': self.sps, 'WKL': self.chamber}, on_failure=self.on_link_failure)
+        self.sampler = telemetry.TelemetrySampler(self.chamber, self.sps, listener=lambda temp, voltage: self.channel.post(events.TelemetryEvent(temp, voltage)))
+        self.last_export = time.time()
+        self.sampler.start()
+        self.watchdog.start()
+        self.open_store()
+        self.open_archive()
+        self.open_report()
+        self.fsv.trace_sink = self.on_trace
+        try:
+            self.run_measurement()
+        finally:
+            self.watchdog.stop()
+            self.sampler.stop()
+            self.close_report()
+            self.close_store()
+            self.fsv.trace_sink = None
+
+    # register the run in the results database, the measurement runs without database if it can't be opened
+    def open_store(self):
         try:
-            results = {}
+            self.store = results_db.ResultsStore()
+            self.run_id = self.store.start_run(self.inputs['project'], self.inputs['channels'], self.inputs['ocw'], self.inputs['ofb_ranges'], self.inputs['eut'], self.inputs['path'])
+        except sqlite3.Error as e:
+            tags.log('Background Thread', f'Results database not available: {e}')
+            self.store = None
+
+    # archive every trace captured by the analyzer, the measurement runs without archive if it can't be created
+    def open_archive(self):
+        try:
+            self.archive = trace_archive.TraceArchive(trace_archive.run_directory(os.path.join(self.inputs['path'], self.inputs['filename_traces'])))
+        except OSError as e:
+            tags.log('Background Thread', f'Trace archive not available: {e}')
+
+    # called by the analyzer for every captured trace: evaluate the margin to the mask of the step and archive the trace
+    def on_trace(self, freqs, levels, label, settings):
+        mask = self.masks.get(label)
+        if mask is not None:
+            self.margins[(label, self.centre_freq)] = float(self.standard.mask_margin(freqs, levels, mask)[0])
+        if self.observer is not None:
+            self.observer(freqs, levels, label, settings)
+        if self.archive is None:
+            return
+        try:
+            self.archive.append(freqs, levels, label, self.condition, self.centre_freq, settings, lossless=mask is not None)
+        except OSError as e:
+            tags.log('Background Thread', f'Trace {label} not archived: {e}')
 
+    # plots of every plateau are rendered in worker processes while the measurement continues
+    def open_report(self):
+        if self.archive is None:
+            return
+        parameters = {
+            'Project': self.inputs['project'],
+            'EUT': self.inputs['eut'] or '',
+            'Operating frequencies': ', '.join(f'{freq/1e6:.3f} MHz' for freq in self.inputs['channels']),
+            'Operating channel width': f"{self.inputs['ocw']/1e3:.3f} kHz",
+            'Nominal voltage': f"{self.inputs['voltage']} V"
+        }
+        self.report = report.ReportBuilder(os.path.join(self.inputs['path'], self.inputs['filename_report']), 'EN 300 220-1 OBW/OOB Test Report', parameters, self.archive.directory)
+
+    def close_report(self):
+        if self.report is None:
+            return
+        try:
+            self.report.finish(self.status())
+        except OSError as e:
+            tags.log('Background Thread', f'Report not written: {e}')
+
+    # masks the traces of the measurement steps of a channel are evaluated against
+    def step_masks(self, i):
+        masks = {'oob_oc': self.limits_oc[i]}
+        if i in self.limits_ofb:
+            masks['oob_ofb_center'] = self.limits_ofb[i]
+        return masks
+
+    # limit lines drawn into the report plots of every measurement step of a channel
+    def report_masks(self, i):
+        masks = {label: [mask.tolist()] for label, mask in self.step_masks(i).items()}
+        if i in self.limits_ofb:
+            f_low, f_high = self.inputs['ofb_ranges'][i]
+            masks['oob_ofb_left'] = masks['oob_ofb_right'] = [[(f_low - 4000000, -36), (f_high + 4000000, -36)]]
+        return masks
+
+    # masks of all channels at once, the operational frequency band masks only for channels within a band
+    def prepare_limits(self):
+        channels, ranges = self.inputs['channels'], self.inputs['ofb_ranges']
+        self.limits_oc = self.standard.calc_limits_oc(channels, self.inputs['ocw'])
+        in_band = [i for i, band in enumerate(ranges) if band]
+        limits = self.standard.calc_limits_ofb([ranges[i][0] for i in in_band], [ranges[i][1] for i in in_band])
+        self.limits_ofb = dict(zip(in_band, limits))
+
+    def status(self):
+        return 'error' if self.error else 'interrupted' if self.stop_flag else 'complete' if self.completed else 'aborted'
+
+    def close_store(self):
+        if self.store is None:
+            return
+        try:
+            self.store.finish_run(self.run_id, self.status())
+        except sqlite3.Error as e:
+            tags.log('Background Thread', f'Results database not updated: {e}')
+        self.store.close()
+
+    # main function of MeasurementThread class containing the general logical structure of measurement
+    def run_measurement(self):
+        tags.set_log_context(condition=None, phase=None)       # the thread may have run a previous job
+        try:
             # prepare all parameters that were transmitted from main thread
-            path = self.inputs['path']
-            filename_obw = self.inputs['filename_obw']
-            filename_oob_oc = self.inputs['filename_oob_oc']
-            filename_oob_ofb = self.inputs['filename_oob_ofb']
-            centre_freq = self.inputs['centre_freq']
+            channels = self.inputs['channels']
             ocw = self.inputs['ocw']
             voltage = self.inputs['voltage']
             temp_min = self.inputs['temp_min']
@@ -55,455 +198,467 @@ class MeasurementThread(QThread):
             measure_oob = self.inputs['measure_oob']
             measure_ex = self.inputs['measure_ex']
             adjust_erp = self.inputs['adjust_erp']
-            dm2 = False
-            self.stop_flag = False
 
-            if self.parent.checkbox_dm2.isChecked():
-                dm2 = True
+            # setups and limit lines stored on the analyzer by a previous run are only reused for the same EUT configuration
+            self.fsv.setups.select_eut((self.inputs['project'], self.inputs['eut'], ocw, self.inputs['dm2']))
+            self.fsv.limits.select_eut((self.inputs['project'], self.inputs['eut'], ocw))
 
-            # ERP adjustment
+            # structures for results of all conditions
+            self.bandwidths = []
+            self.oc_passes = []
+            self.ofb_passes = []
+            self.prepare_limits()
+
+            # ERP adjustment, the offset applies to all channels
             if adjust_erp:
-                self.fsv.adjust_erp(adjust_erp, centre_freq, ocw, 100000)   # 100 kHz RBW weil das wohl standardmäßig so eingestellt wird bei dieser Messung
+                self.fsv.adjust_erp(adjust_erp, channels[0], ocw, 100000)   # 100 kHz RBW weil das wohl standardmäßig so eingestellt wird bei dieser Messung
 
             if self.stop_flag:
                 self.cleanup()
                 return
 
-            ### IF BOTH TESTS (OBW + OOB) should be performed
-            if measure_obw and measure_oob:
-
-                # IF EXTREME CONDITIONS should be performed for both tests
-                if measure_ex:
-
-                    # prepare structures for results
-                    bandwidths = []
-                    oc_passes = []
-                    ofb_passes = []
-
-                    ## 1) EXECUTE TESTS UNDER NORMAL CONDITIONS
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename_obw)
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oob_oc, filename_oob_ofb, dm2)
-
-                    bandwidths.append(float(measured_bandwidth))
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-
-                    ## 2) EXECUTE TESTS UNDER EXTREME VOLTAGE AT MAXIMUM TEMP
-                    if not self.set_temperature_and_wait(temp_max):
-                        return
-
-                    # set voltage to min volt
-                    if not self.set_ex_voltage(volt_min):
-                        return
-
-                    # execute both tests with appropriate filenames
-                    filename = filename_obw[:-4] + "_maxtemp_minvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    filename_oc = filename_oob_oc[:-4] + "_maxtemp_minvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_maxtemp_minvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb, dm2)
-
-                    bandwidths.append(float(measured_bandwidth))
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-
-                    # set voltage to max volt
-                    if not self.set_ex_voltage(volt_max):
-                        return
-                    
-                    # execute both tests with appropriate filenames
-                    filename = filename_obw[:-4] + "_maxtemp_maxvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    filename_oc = filename_oob_oc[:-4] + "_maxtemp_maxvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_maxtemp_maxvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb, dm2)
-
-                    bandwidths.append(float(measured_bandwidth))
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-                    
-                    self.chamber.stop()
-                    sleep(2)
-
-                    self.set_ex_voltage(voltage)
-
-                    ## 3) EXECUTE TESTS UNDER EXTREME VOLTAGE AT MINIMUM TEMP
-                    if not self.set_temperature_and_wait(temp_min):
-                        return
-
-                    # set voltage to min volt
-                    if not self.set_ex_voltage(volt_min):
-                        return
-
-                    # execute both tests with appropriate filenames
-                    filename = filename_obw[:-4] + "_mintemp_minvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    filename_oc = filename_oob_oc[:-4] + "_mintemp_minvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_mintemp_minvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb, dm2)
-
-                    bandwidths.append(float(measured_bandwidth))
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
+            ## 1) EXECUTE TESTS UNDER NORMAL CONDITIONS
+            if not self.measure_condition('', None, voltage):
+                self.cleanup()
+                return
 
-                    if self.stop_flag:
-                        self.cleanup()
+            ## 2) + 3) EXECUTE TESTS UNDER EXTREME VOLTAGES AT MAXIMUM AND MINIMUM TEMP
+            if measure_ex:
+                for temperature, temp_label in ((temp_max, 'maxtemp'), (temp_min, 'mintemp')):
+                    if not self.set_temperature_and_wait(temperature):
                         return
 
-                    # set voltage to max volt
-                    if not self.set_ex_voltage(volt_max):
-                        return
-                    
-                    # execute both tests with appropriate filenames
-                    filename = filename_obw[:-4] + "_mintemp_maxvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    filename_oc = filename_oob_oc[:-4] + "_mintemp_maxvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_mintemp_maxvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb, dm2)
-
-                    bandwidths.append(float(measured_bandwidth))
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
-
-                    ## prepare results
-                    results = {
-                        'measure_ex': True,
-                        'obw': bandwidths,
-                        'oc_passes': oc_passes,
-                        'ofb_passes': ofb_passes,
-                        'obw_measured': True,
-                        'oob_measured': True
-                    }
-
-                # IF ONLY NORMAL CONDITIONS for BOTH tests
-                else:
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename_obw)
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oob_oc, filename_oob_ofb, dm2)
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-                    
-                    results = {
-                        'measure_ex': False,
-                        'obw': measured_bandwidth,
-                        'oc_pass': oc_pass,
-                        'ofb_pass': ofb_pass,
-                        'obw_measured': True,
-                        'oob_measured': True
-                    }
-
-            ### IF ONLY OBW TEST should be performed
+                    for ex_voltage, volt_label in ((volt_min, 'minvolt'), (volt_max, 'maxvolt')):
+                        if not self.set_ex_voltage(ex_voltage):
+                            return
+                        if not self.measure_condition(f'_{temp_label}_{volt_label}', temperature, ex_voltage):
+                            self.cleanup()
+                            return
+
+                    # back to nominal voltage with chamber off before the next temperature
+                    if temp_label == 'maxtemp':
+                        self.chamber.stop()
+                        self.cancel_token.wait(2)
+                        self.set_ex_voltage(voltage)
+
+            ## prepare results
+            results = {
+                'report': self.report.filepath if self.report is not None else None,
+                'measure_ex': measure_ex,
+                'channels': len(channels),
+                'obw_measured': measure_obw,
+                'oob_measured': measure_oob
+            }
+            if measure_ex or len(channels) > 1:
+                results.update({'obw': self.bandwidths, 'oc_passes': self.oc_passes, 'ofb_passes': self.ofb_passes})
+            elif measure_obw and measure_oob:
+                results.update({'obw': self.bandwidths[0], 'oc_pass': self.oc_passes[0], 'ofb_pass': self.ofb_passes[0]})
             elif measure_obw:
+                results.update({'obw': self.bandwidths[0]})
+            else:
+                results.update({'oc_pass': self.oc_passes[0], 'ofb_pass': self.ofb_passes[0]})
+            
+            tags.log('Background Thread', 'Measurement complete. Turning all instruments off. Await the results in the GUI.')
 
-                # IF EXTREME CONDITIONS for obw test
-                if measure_ex:
-
-                    # prepare structures for results
-                    bandwidths = []
-
-                    ## 1) EXECUTE OBW TEST UNDER NORMAL CONDITIONS
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename_obw)
-                    bandwidths.append(float(measured_bandwidth))
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-
-                    ## 2) EXECUTE OBW TEST UNDER EXTREME VOLTAGE AT MAXIMUM TEMP
-                    if not self.set_temperature_and_wait(temp_max):
-                        return
-
-                    # set voltage to min volt
-                    if not self.set_ex_voltage(volt_min):
-                        return
-
-                    # execute test with appropriate filename
-                    filename = filename_obw[:-4] + "_maxtemp_minvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    bandwidths.append(float(measured_bandwidth))
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-
-                    # set voltage to max volt
-                    if not self.set_ex_voltage(volt_max):
-                        return
-                    
-                    # execute test with appropriate filename
-                    filename = filename_obw[:-4] + "_maxtemp_maxvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    bandwidths.append(float(measured_bandwidth))
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-                    
-                    self.chamber.stop()
-                    sleep(2)
-
-                    self.set_ex_voltage(voltage)
-
-                    ## 3) EXECUTE OBW TEST UNDER EXTREME VOLTAGE AT MINIMUM TEMP
-                    if not self.set_temperature_and_wait(temp_min):
-                        return
-
-                    # set voltage to min volt
-                    if not self.set_ex_voltage(volt_min):
-                        return
-
-                    # execute test with appropriate filename
-                    filename = filename_obw[:-4] + "_mintemp_minvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    bandwidths.append(float(measured_bandwidth))
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-
-                    # set voltage to max volt
-                    if not self.set_ex_voltage(volt_max):
-                        return
-
-                    # execute test with appropriate filename
-                    filename = filename_obw[:-4] + "_mintemp_maxvolt" + ".jpg"
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename)
-
-                    bandwidths.append(float(measured_bandwidth))
-
-                    ## prepare results
-                    results = {
-                        'measure_ex': True,
-                        'obw': bandwidths,
-                        'obw_measured': True,
-                        'oob_measured': False
-                    }
-
-                # IF ONLY NORMAL CONDITIONS for obw test
-                else:
-                    measured_bandwidth = self.parent.execute_obw_measurement(ocw, centre_freq, path, filename_obw)
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-                    results = {
-                        'measure_ex': False,
-                        'obw': measured_bandwidth,
-                        'obw_measured': True,
-                        'oob_measured': False
-                    }
-
-            ### IF ONLY OOB TEST should be performed
-            elif measure_oob:
-
-                # IF EXTREME CONDITIONS for oob test
-                if measure_ex:
-
-                    # prepare structures for results
-                    oc_passes = []
-                    ofb_passes = []
-
-                    ## 1) EXECUTE TEST UNDER NORMAL CONDITIONS
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oob_oc, filename_oob_ofb, dm2)
-
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
-
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-
-                    ## 2) EXECUTE TEST UNDER EXTREME VOLTAGE AT MAXIMUM TEMP
-                    if not self.set_temperature_and_wait(temp_max):
-                        return
-
-                    # set voltage to min volt
-                    if not self.set_ex_voltage(volt_min):
-                        return
-
-                    # execute test with appropriate filenames
-                    filename_oc = filename_oob_oc[:-4] + "_maxtemp_minvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_maxtemp_minvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb), dm2
-
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
+            # turn off equipment after test is complete
+            self.cleanup()
+            
+            if not self.stop_flag:
+                self.completed = True
+                self.channel.post(events.ResultEvent(results))
 
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
+        except InterruptedError:
+            tags.log('Background Thread', 'Measurement interrupted.')
+            self.cleanup()
 
-                    # set voltage to max volt
-                    if not self.set_ex_voltage(volt_max):
-                        return
-                    
-                    # execute test with appropriate filenames
-                    filename_oc = filename_oob_oc[:-4] + "_maxtemp_maxvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_maxtemp_maxvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb, dm2)
+        except Exception as e:
+            tags.log('Background Thread', f'Exception {e}', tags.ERROR, error=type(e).__name__)
+            if not self.stop_flag:      # errors as consequence of an interrupted operation are not reported
+                self.error = e
+            self.stop()
+            self.cleanup()
 
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
+    # OBW in Hz as float (the FSV returns it as query string), None if the step failed after a lost connection
+    def add_bandwidth(self, obw):
+        self.bandwidths.append(float(obw) if obw is not None else None)
+
+    # execute the selected tests for all channels at the current plateau, suffix marks the condition in all filenames. returns False if measurement was stopped
+    def measure_condition(self, suffix, temperature, voltage):
+        path = self.inputs['path']
+        channels = self.inputs['channels']
+        ocw = self.inputs['ocw']
+        dm2 = self.inputs['dm2']
+        measurements = []
+        artifacts = []
+        self.condition = suffix.strip('_') or 'nominal'
+        self.margins = {}
+        tags.set_log_context(condition=self.condition)
+
+        # FHSS: OBW and operating channel OOB of all hop channels from one hop capture over the whole hop set
+        hop_capture = self.hop_capture_parameters()
+        if hop_capture is not None:
+            filename_hops = self.inputs['filename_oob_oc'][:-4] + '_Hops' + suffix
+            channel_results = self.guarded(self.measure_hops, ocw, hop_capture, path, filename_hops, suffix) or [(None, None, None, None)]*len(channels)
+            if self.stop_flag:
+                return False
+            artifacts.extend([('fhss_screenshot', os.path.join(path, filename_hops + '.jpg')), ('fhss_spectrogram', os.path.join(path, filename_hops + '.npz'))])
+            for centre_freq, (obw, oc_pass, ofb_pass, filename_ofb) in zip(channels, channel_results):
+                if self.inputs['measure_obw']:
+                    self.add_bandwidth(obw)
+                    measurements.append(('obw', centre_freq, self.bandwidths[-1], None, None))
+                if self.inputs['measure_oob']:
+                    self.oc_passes.append(oc_pass)
+                    self.ofb_passes.append(ofb_pass)
+                    measurements.extend([('oob_oc', centre_freq, None, oc_pass, self.margins.get(('oob_oc', centre_freq))),
+                                         ('oob_ofb', centre_freq, None, ofb_pass, self.margins.get(('oob_ofb_center', centre_freq)))])
+                    if filename_ofb is not None:
+                        artifacts.extend((f'oob_ofb_{part}_screenshot', os.path.join(path, filename_ofb.replace('center', part))) for part in ('center', 'left', 'right'))
+
+        # OBW and operating channel OOB of all channels from one capture each, the operational frequency band still needs its own sweeps
+        single_capture = self.single_capture_parameters() if hop_capture is None else None
+        if single_capture is not None:
+            for i, centre_freq in enumerate(channels):
+                self.centre_freq = centre_freq
+                self.masks = self.step_masks(i)
+                filename_oc = self.channel_filename('filename_oob_oc', i, suffix, '.jpg')
+                filename_ofb = self.channel_filename('filename_oob_ofb', i, suffix, '.jpg')
+                obw, oc_pass, ofb_pass = self.guarded(self.measure_single_capture, ocw, centre_freq, single_capture, self.limits_oc[i], self.limits_ofb[i], path, filename_oc, filename_ofb)
+                self.add_bandwidth(obw)
+                self.oc_passes.append(oc_pass)
+                self.ofb_passes.append(ofb_pass)
+                if self.stop_flag:
+                    return False
+                margin = self.margins.get(('oob_oc', centre_freq))
+                measurements.extend([('obw', centre_freq, self.bandwidths[-1], None, None),
+                                     ('oob_oc', centre_freq, None, oc_pass, margin),
+                                     ('oob_ofb', centre_freq, None, ofb_pass, self.margins.get(('oob_ofb_center', centre_freq)))])
+                artifacts.append(('single_capture_screenshot', os.path.join(path, filename_oc)))
+                artifacts.extend((f'oob_ofb_{part}_screenshot', os.path.join(path, filename_ofb.replace('center', part))) for part in ('center', 'left', 'right'))
+
+        # all channels back to back per measurement type, so that only the centre frequency changes between channels
+        if self.inputs['measure_obw'] and single_capture is None and hop_capture is None:
+            for i, centre_freq in enumerate(channels):
+                self.centre_freq = centre_freq
+                filename = self.channel_filename('filename_obw', i, suffix, '.jpg')
+                obw = self.guarded(self.measure_obw, ocw, centre_freq, path, filename)
+                self.add_bandwidth(obw)
+                if self.stop_flag:
+                    return False
+                measurements.append(('obw', centre_freq, self.bandwidths[-1], None, None))
+                artifacts.append(('obw_screenshot', os.path.join(path, filename)))
+
+        if self.inputs['measure_oob'] and single_capture is None and hop_capture is None:
+            for i, centre_freq in enumerate(channels):
+                self.centre_freq = centre_freq
+                self.masks = self.step_masks(i)
+                filename_oc = self.channel_filename('filename_oob_oc', i, suffix, '.jpg')
+                filename_ofb = self.channel_filename('filename_oob_ofb', i, suffix, '.jpg')
+                oc_pass, ofb_pass = self.guarded(self.measure_oob, ocw, centre_freq, self.limits_oc[i], self.limits_ofb[i], path, filename_oc, filename_ofb, dm2)
+                self.oc_passes.append(oc_pass)
+                self.ofb_passes.append(ofb_pass)
+                if self.stop_flag:
+                    return False
+                measurements.extend([('oob_oc', centre_freq, None, oc_pass, self.margins.get(('oob_oc', centre_freq))),
+                                     ('oob_ofb', centre_freq, None, ofb_pass, self.margins.get(('oob_ofb_center', centre_freq)))])
+                artifacts.append(('oob_oc_screenshot', os.path.join(path, filename_oc)))
+                artifacts.extend((f'oob_ofb_{part}_screenshot', os.path.join(path, filename_ofb.replace('center', part))) for part in ('center', 'left', 'right'))
 
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-                    
-                    self.chamber.stop()
-                    sleep(2)
+        # supply voltage and chamber temperature since the last plateau as proof of the test conditions
+        filename = self.inputs['filename_telemetry'][:-4] + suffix + ".csv"
+        try:
+            self.sampler.export_csv(os.path.join(path, filename), self.last_export)
+        except OSError as e:
+            tags.log('Background Thread', f'Telemetry export failed: {e}')
+        artifacts.append(('telemetry_csv', os.path.join(path, filename)))
+
+        if self.archive is not None:
+            artifacts.append(('trace_archive', self.archive.directory))
+
+        self.record_condition(self.condition, temperature, voltage, measurements, artifacts)
+        if self.report is not None:
+            for i, centre_freq in enumerate(channels):
+                kinds = {kind: (value, passed) for kind, freq, value, passed, _ in measurements if freq == centre_freq}
+                row = {
+                    'condition': self.condition,
+                    'channel': centre_freq,
+                    'temperature': temperature,
+                    'voltage': voltage,
+                    'obw': kinds.get('obw', (None, None))[0],
+                    'oc_pass': kinds.get('oob_oc', (None, None))[1],
+                    'ofb_pass': kinds.get('oob_ofb', (None, None))[1]
+                }
+                self.report.add_condition(row, self.report_masks(i))
+        self.last_export = time.time()
 
-                    self.set_ex_voltage(voltage)
+        return True
 
-                    ## 3) EXECUTE TEST UNDER EXTREME VOLTAGE AT MINIMUM TEMP
-                    if not self.set_temperature_and_wait(temp_min):
-                        return
+    # settings of the hop capture for FHSS devices, None if the ordinary measurements are used
+    def hop_capture_parameters(self):
+        if not self.inputs['fhss'] or not (self.inputs['measure_obw'] or self.inputs['measure_oob']):
+            return None
+        if self.inputs['dm2']:
+            tags.log('Background Thread', 'D-M2 signal needs an averaged trace, FHSS device measured without hop capture.')
+            return None
+        parameters = self.standard.calc_fhss_sweep(self.inputs['channels'], self.inputs['ocw'])
+        if parameters is None:
+            tags.log('Background Thread', 'Hop set too wide for a single sweep, FHSS device measured without hop capture.')
+        return parameters
+
+    # settings of the single capture if it was selected and can replace the separate OBW and operating channel measurements, otherwise None
+    def single_capture_parameters(self):
+        if not (self.inputs['single_capture'] and self.inputs['measure_obw'] and self.inputs['measure_oob']):
+            return None
+        parameters = self.standard.calc_single_capture_parameters(self.inputs['ocw'], self.inputs['dm2'])
+        if parameters is None:
+            tags.log('Background Thread', 'No common analyzer settings for OBW and OOB (D-M2 signal or OBW RBW constraint violated), measuring separately.')
+        return parameters
+
+    # filename of a screenshot for a channel and condition, the channel is only marked if there are several
+    def channel_filename(self, key, i, suffix, extension):
+        channels = self.inputs['channels']
+        channel_tag = f'_{channels[i]/1e6:.3f}MHz' if len(channels) > 1 else ''
+        return self.inputs[key][:-len(extension)] + channel_tag + suffix + extension
+
+    # store all results of a plateau in the results database in one transaction
+    def record_condition(self, label, temperature, voltage, measurements, artifacts):
+        if self.store is None:
+            return
+        try:
+            self.store.add_condition(self.run_id, label, None if temperature is None else float(temperature), float(voltage), measurements, self.sampler.summary(self.last_export), artifacts)
+        except sqlite3.Error as e:
+            tags.log('Background Thread', f'Results of condition {label} not stored: {e}')
+
+    # execute a measurement step, if it fails due to a lost connection wait for the watchdog to reconnect and repeat the step once
+    def guarded(self, step, *args):
+        with tags.log_context(phase=step.__name__):
+            started = time.perf_counter()
+            try:
+                result = step(*args)
+            except InterruptedError:
+                raise
+            except connection_watchdog.LINK_ERRORS as e:
+                tags.log('Background Thread', f'Step {step.__name__} failed with {type(e).__name__}: {e}. Checking connections.', tags.WARNING, error=type(e).__name__)
+                for instrument in (self.fsv, self.sps):
+                    if instrument.connected:     # session of the aborted operation is dead, drop it
+                        try:
+                            instrument.disconnect()
+                        except:
+                            pass
+                if not self.watchdog.recover_all():
+                    raise
+                if not self.sps.restore_output():
+                    raise RuntimeError(f'EUT supply could not be restored after reconnect: {self.sps.diagnosis}')
+                tags.log('Background Thread', f'Connections recovered, repeating step {step.__name__}.', tags.WARNING)
+                result = step(*args)
+            tags.log('Background Thread', f'Step {step.__name__} finished.', tags.DEBUG, duration=round(time.perf_counter() - started, 3))
+            return result
+
+    # report the current step to the GUI
+    def progress(self, message):
+        self.channel.post(events.ProgressEvent(message))
+
+    # occupied bandwidth measurement with the parameters defined by the standard
+    def measure_obw(self, ocw, centre_freq, path, filename_obw):
+        self.progress('Measuring occupied bandwidth...')
+        tags.log('Background Thread', 'Starting OBW measurement.')
+
+        # fastest sweep within the constraints of the standard, the fixed parameters if no such sweep exists
+        obw_parameters = self.standard.calc_obw_sweep(ocw) or self.standard.calc_obw_parameters(ocw)
 
-                    # set voltage to min volt
-                    if not self.set_ex_voltage(volt_min):
-                        return
+        return self.fsv.measure_obw(filename_obw, path, centre_freq, obw_parameters)
 
-                    # execute test with appropriate filenames
-                    filename_oc = filename_oob_oc[:-4] + "_mintemp_minvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_mintemp_minvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb, dm2)
+    # out-of-band emissions measurement for operating channel and operational frequency band with the precalculated masks of the channel
+    def measure_oob(self, ocw, centre_freq, limit_points_oc, limit_points_ofb, path, filename_oob_oc, filename_oob_ofb, dm2):
 
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
+        # get test parameters as per definition in standard and then set them on spectrum analyzer
+        oob_parameters = self.standard.calc_oob_sweep(ocw) or self.standard.calc_oob_parameters(ocw)
+        self.fsv.prep_oob_parameters(centre_freq, oob_parameters, dm2)
 
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
+        # 1) OOB testing for operating channel
+        self.progress('Measuring out-of-band emissions for the operating channel...')
+        tags.log('Background Thread', 'Starting OOB operating channel measurement.')
 
-                    # set voltage to max volt
-                    if not self.set_ex_voltage(volt_max):
-                        return
+        oc_pass = self.fsv.measure_oob_oc(limit_points_oc, filename_oob_oc, path)
 
-                    # execute test with appropriate filenames
-                    filename_oc = filename_oob_oc[:-4] + "_mintemp_maxvolt" + ".jpg"
-                    filename_ofb = filename_oob_ofb[:-4] + "_mintemp_maxvolt" + ".jpg"
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oc, filename_ofb, dm2)
+        # 2) OOB testing for operational frequency band
+        self.progress('Measuring out-of-band emissions for the operational frequency band...')
+        tags.log('Background Thread', 'Starting OOB operational frequency band measurement.')
 
-                    oc_passes.append(oc_pass)
-                    ofb_passes.append(ofb_pass)
+        ofb_pass = self.fsv.measure_oob_ofb(limit_points_ofb, filename_oob_ofb, path, self.standard.calc_ofb_sweeps(limit_points_ofb))
+        self.fsv.prep_oob_parameters(centre_freq, oob_parameters, dm2)
 
-                    ## prepare results
-                    results = {
-                        'measure_ex': True,
-                        'oc_passes': oc_passes,
-                        'ofb_passes': ofb_passes,
-                        'obw_measured': False,
-                        'oob_measured': True
-                    }
+        return oc_pass, ofb_pass
 
-                # IF ONLY NORMAL CONDITIONS for oob test
-                else:
-                    oc_pass, ofb_pass = self.parent.execute_oob_measurement(ocw, centre_freq, path, filename_oob_oc, filename_oob_ofb, dm2)
-                    if self.stop_flag:
-                        self.cleanup()
-                        return
-                    results = {
-                        'measure_ex': False,
-                        'oc_pass': oc_pass,
-                        'ofb_pass': ofb_pass,
-                        'obw_measured': False,
-                        'oob_measured': True
-                    }
-            
-            tags.log('Background Thread', 'Measurement complete. Turning all instruments off. Await the results in the GUI.')
+    # OBW and operating channel OOB evaluated on the host from one max-hold trace, followed by the operational frequency band measurement
+    def measure_single_capture(self, ocw, centre_freq, parameters, limit_points_oc, limit_points_ofb, path, filename_oob_oc, filename_oob_ofb):
+        self.progress('Capturing spectrum for occupied bandwidth and operating channel...')
+        tags.log('Background Thread', f'Starting single capture ({parameters["points"]} points, RBW {parameters["rbw"]} Hz).')
+
+        trace = self.fsv.capture_trace('oob_oc', centre_freq, parameters, SINGLE_CAPTURE_DWELL, filename_oob_oc, path, limit_points_oc)
+        if trace is None:
+            return None, None, None
+        freqs, levels = trace
+
+        # evaluation within the OBW span of the separate measurement, the wider OOB span would add noise power to the OBW
+        obw_span = self.standard.calc_obw_parameters(ocw)['span']
+        inside = np.abs(freqs - centre_freq) <= obw_span/2
+        obw = float(self.standard.calc_obw(freqs[inside], levels[inside]))
+        margin = float(self.standard.mask_margin(freqs, levels, limit_points_oc)[0])
+        self.margins[('oob_oc', centre_freq)] = margin
+        oc_pass = bool(margin >= 0)
+        tags.log('Background Thread', f'Single capture evaluated: OBW {self.fsv.format_freq(obw)}, operating channel margin {margin:.2f} dB.')
+
+        self.progress('Measuring out-of-band emissions for the operational frequency band...')
+        tags.log('Background Thread', 'Starting OOB operational frequency band measurement.')
+
+        ofb_pass = self.fsv.measure_oob_ofb(limit_points_ofb, filename_oob_ofb, path, self.standard.calc_ofb_sweeps(limit_points_ofb))
+        self.fsv.prep_oob_parameters(centre_freq, parameters, False)
+
+        return obw, oc_pass, ofb_pass
+
+    # hop capture over all hop channels, then OBW and operating channel OOB of every channel from the max hold of the capture and the operational frequency band per band
+    # returns (obw, oc_pass, ofb_pass, filename_ofb) per channel, None for tests that were not selected, or None if the capture failed
+    def measure_hops(self, ocw, parameters, path, filename, suffix):
+        channels = self.inputs['channels']
+        self.progress('Capturing hops of all channels...')
+        tags.log('Background Thread', f'Starting hop capture of {len(channels)} channels.')
+
+        capture = self.fsv.capture_hops(parameters['centre'], parameters, channels, ocw, FHSS_MAX_TIME, filename + '.jpg', path)
+        if capture is None:
+            return None
+        freqs, coverage, ring = capture
+        try:
+            ring.save(os.path.join(path, filename + '.npz'), freqs, envelope=coverage.envelope, occupancy=coverage.occupancy(), channels=coverage.channels, hits=coverage.hits, solo_sweeps=coverage.solo_sweeps)
+        except OSError as e:
+            tags.log('Background Thread', f'Spectrogram not saved: {e}')
+
+        settings = {'rbw': parameters['rbw'], 'vbw': parameters['rbw']*parameters['vbw_ratio'], 'detector': parameters['det_mode'].upper()}
+        obw_span = self.standard.calc_obw_parameters(ocw)['span']
+        ofb_results = {}
+        results = []
+        for i, centre_freq in enumerate(channels):
+            self.cancel_token.check()
+            self.centre_freq = centre_freq
+            self.masks = self.step_masks(i)
+            levels = coverage.channel_envelope(i)
+            if not coverage.isolated(i):
+                tags.log('Background Thread', f'Hop channel {self.fsv.format_freq(centre_freq)} never seen alone in a sweep, evaluated on the max hold of all channels (worst case).', tags.WARNING)
+            self.on_trace(freqs, levels, 'oob_oc', settings)        # archived per channel, margin of the operating channel mask
+
+            obw = oc_pass = ofb_pass = filename_ofb = None
+            if self.inputs['measure_obw']:
+                inside = np.abs(freqs - centre_freq) <= obw_span/2
+                obw = float(self.standard.calc_obw(freqs[inside], levels[inside]))
+            if self.inputs['measure_oob']:
+                oc_pass = bool(self.margins[('oob_oc', centre_freq)] >= 0)
+
+                # hop channels in the same band share the operational frequency band measurement
+                band = self.inputs['ofb_ranges'][i]
+                if band not in ofb_results:
+                    self.progress('Measuring out-of-band emissions for the operational frequency band...')
+                    filename_ofb = self.channel_filename('filename_oob_ofb', i, suffix, '.jpg')
+                    self.fsv.prep_oob_parameters(centre_freq, self.standard.calc_oob_sweep(ocw) or self.standard.calc_oob_parameters(ocw), False)
+                    ofb_results[band] = (self.fsv.measure_oob_ofb(self.limits_ofb[i], filename_ofb, path, self.standard.calc_ofb_sweeps(self.limits_ofb[i])), self.margins.get(('oob_ofb_center', centre_freq)))
+                ofb_pass, self.margins[('oob_ofb_center', centre_freq)] = ofb_results[band]
+            tags.log('Background Thread', f'Hop channel {self.fsv.format_freq(centre_freq)}: {coverage.hits[i]} hops, OBW {self.fsv.format_freq(obw) if obw is not None else "-"}, operating channel margin {self.margins.get(("oob_oc", centre_freq), float("nan")):.2f} dB.')
+            results.append((obw, oc_pass, ofb_pass, filename_ofb))
+
+        return results
+
+    # apply an extreme voltage, the voltage is verified by readback so no further delay is needed. returns False if stopped or not settled
+    def apply_voltage(self, voltage):
+        voltage = float(voltage)
 
-            # turn off equipment after test is complete
-            self.cleanup()
-            
-            if not self.stop_flag:
-                self.measurement_complete.emit(results)
+        if self.inputs['ac']:
+            return self.sps.change_voltage_ac(voltage)
+        return self.sps.change_voltage_dc(voltage)
 
-        except Exception as e:
-            tags.log('Background Thread', f'Exception {e}')
-            self.stop()
-            self.parent.show_warning('Error in background thread', 'Undefined error in background thread during measurement, check logs.')
+    # called by the watchdog once a connection is given up
+    def on_link_failure(self, diagnosis):
+        tags.log('Background Thread', f'Stopping measurement: {diagnosis}')
+        self.stop()
 
     # set the chamber to a certain temperature and wait for a specific amount of time defined by global variable. check if temperature is reached, if not wait 5 mins longer
     def set_temperature_and_wait(self, temperature):
-        if not self.chamber.set_temp(float(temperature)):
+        if not self.guarded(self.chamber.set_temp, float(temperature)):
             tags.log('Background Thread WKL', 'Error setting temperature.')
-            self.cleanup()
+            self.abort(f'Climate chamber could not be set to {temperature} °C.')
             return False
         
-        self.chamber.start()
-        self.parent.status_bar.showMessage(f'Chamber set to {temperature} °C and started.')
+        self.guarded(self.chamber.start)
+        self.progress(f'Chamber set to {temperature} °C and started.')
         
         i = 0
         for _ in range(WKL_TIME_TO_SET):  # 1 iteration = 1 minute
             i = i+1
-            sleep(60)
-            tags.log('Background Thread WKL', f'Chamber currently at {float(self.chamber.current_temp):.2f} °C. {i} out of {WKL_TIME_TO_SET} minutes elapsed.')
-            self.parent.status_bar.showMessage(f'Chamber running, {float(self.chamber.current_temp):.2f} / {temperature} °C, {i} / {WKL_TIME_TO_SET} mins elapsed')
+            if self.cancel_token.wait(60):
+                self.cleanup()
+                return False
+            current_temp = self.guarded(self.chamber_temp)
+            tags.log('Background Thread WKL', f'Chamber currently at {current_temp:.2f} °C. {i} out of {WKL_TIME_TO_SET} minutes elapsed.')
+            self.progress(f'Chamber running, {current_temp:.2f} / {temperature} °C, {i} / {WKL_TIME_TO_SET} mins elapsed')
             if self.stop_flag:
                 self.cleanup()
                 return False
             
         # if temperature has been reached within 1 °C
-        if float(temperature)-1 < self.chamber.current_temp < float(temperature)+1:
+        if float(temperature)-1 < self.guarded(self.chamber_temp) < float(temperature)+1:
             tags.log('Background Thread WKL', 'Temperature reached, starting with measurements.')
-            self.parent.status_bar.showMessage(f'Temperature reached, starting with measurements at {temperature} °C')
+            self.progress(f'Temperature reached, starting with measurements at {temperature} °C')
             return True
         # if temperature has not been reached yet
         else:
             tags.log('Background Thread WKL', 'Temperature not yet reached. Waiting another 5 minutes.')
             for _ in range(5):  # 5 iterations for 5 minutes
-                sleep(60)
-                tags.log('Background Thread WKL', f'Chamber currently at {self.chamber.current_temp:.2f} °C')
+                if self.cancel_token.wait(60):
+                    self.cleanup()
+                    return False
+                tags.log('Background Thread WKL', f'Chamber currently at {self.guarded(self.chamber_temp):.2f} °C')
                 if self.stop_flag:
                     self.cleanup()
                     return False
-            if float(temperature)-1 < self.chamber.current_temp < float(temperature)+1:
+            if float(temperature)-1 < self.guarded(self.chamber_temp) < float(temperature)+1:
                 return True
             else:
                 tags.log('Background Thread WKL', 'Temperature not reached. Error in setting temperature. Process being terminated.')
-                self.cleanup()
+                self.abort(f'Climate chamber did not reach {temperature} °C within {WKL_TIME_TO_SET + 5} minutes.')
                 return False
     
+    # current chamber temperature, taken from telemetry if recent. separate function so that it can be guarded against connection loss
+    def chamber_temp(self):
+        temp = self.sampler.recent('chamber_temp', 2*telemetry.CHAMBER_INTERVAL)
+        if temp is not None:
+            return float(temp)
+        return float(self.chamber.current_temp)
+
     def set_ex_voltage(self, voltage):
-        if not self.parent.apply_ex_voltage(voltage):
-            self.parent.show_warning('Error applying voltage', 'Check connection to power supply.')
+        if not self.guarded(self.apply_voltage, voltage):
+            if self.stop_flag:
+                self.cleanup()
+                return False
             tags.log('Background Thread SPS', 'Error applying voltage.')
-            self.cleanup()
+            self.abort(f'Voltage {voltage} V could not be applied, check connection to power supply. {self.sps.diagnosis}')
             return False
         return True
 
     def stop(self):
-        self.stop_flag = True
-        self.sps.stop_operation()
-        self.fsv.stop_operation()
+        self.cancel_token.cancel()
+
+    # end the measurement without results for the given reason, reported by the GUI once the instruments are safe
+    def abort(self, reason):
+        self.abort_reason = reason
+        tags.log('Background Thread', f'Measurement aborted: {reason}', tags.ERROR)
+        self.cleanup()
 
+    # bring all instruments to a verified safe state in parallel, runs only once per measurement
     def cleanup(self):
-        self.sps.set_amp_off()
-        self.fsv.reset()
-        self.sps.reset()
-        if self.chamber.is_running:
-            self.chamber.stop()
-        tags.log('Background Thread', 'Instruments turned off and/or reset to defaults.')
+        if self.shutdown_report is not None:
+            return
+        self.shutdown_report = shutdown.safe_state(self.fsv, self.sps, self.chamber)
+        if self.shutdown_report.go:
+            tags.log('Background Thread', 'Instruments turned off and/or reset to defaults.')
+        else:
+            tags.log('Background Thread', 'Safe state of at least one instrument could not be verified, check instruments manually.')
 
 
 
@@ -536,6 +691,7 @@ class OutOfBandMeasurementAutomation(QWidget):
             self.chamber = wkl.WKL(tags.wkl_ip)
             tags.log('main', f'Succesfully connected to instrument {self.chamber.idn}')
         except:
+            self.chamber = None
             tags.log('main', 'Error initializing climate chamber.')         
 
         self.initUI()
@@ -545,7 +701,7 @@ class OutOfBandMeasurementAutomation(QWidget):
         self.setWindowTitle('EN 300 220-1 Test Automation')
         QApplication.setStyle('Fusion')
         self.setWindowIcon(QIcon('robot.ico'))
-        self.setMinimumSize(500, 730)
+        self.setMinimumSize(500, 930)
         
         # Main layout
         main_layout = QVBoxLayout()
@@ -564,12 +720,20 @@ class OutOfBandMeasurementAutomation(QWidget):
         project_layout.addWidget(self.proj_input)
         project_layout.addWidget(project_hint)
 
+        # Optional designation of the EUT, used to find the results of this EUT in the results database
+        eut_layout = QHBoxLayout()
+        eut_label = QLabel('(Optional) EUT designation:')
+        self.eut_input = QLineEdit()
+        eut_layout.addWidget(eut_label)
+        eut_layout.addWidget(self.eut_input)
+
         ### Manufacturer info group
         man_info_group = QGroupBox('Manufacturer Info')
         man_info_layout = QVBoxLayout()
 
         # Frequency inputs for Operating Frequency and Operating Channel Width
-        self.op_freq_input = self.create_frequency_input('Operating Frequency')
+        self.op_freq_input = self.create_frequency_input('Operating Frequencies', multiple=True)
+        self.op_freq_input.input_field.setToolTip('Several operating channels of a multi-channel EUT are separated by semicolons, e.g. 868.1; 868.3; 868.5')
         self.op_channel_width_input = self.create_frequency_input('Operating Channel Width')
 
         # Input for entering nominal operating voltage
@@ -709,6 +873,8 @@ class OutOfBandMeasurementAutomation(QWidget):
         self.checkbox_ex = QCheckBox('Test under extreme conditions')
         self.checkbox_dm2 = QCheckBox('EUT generates test signal of type D-M2')
         self.checkbox_fhss = QCheckBox('Device operates with FHSS')
+        self.checkbox_single = QCheckBox('Derive OBW and operating channel OOB from a single capture')
+        self.checkbox_single.setToolTip('One max-hold trace per channel evaluated on the host. Falls back to separate measurements if the RBW constraint of the OBW measurement is not met.')
         
         # Start measurement button
         bold_font = QFont()
@@ -722,18 +888,27 @@ class OutOfBandMeasurementAutomation(QWidget):
         self.stop_button.clicked.connect(self.stop_measurement)
         self.stop_button.setEnabled(False)
 
+        # Resync button for when instrument settings have been changed manually on the front panel
+        self.resync_button = QPushButton('Resync Instrument State')
+        self.resync_button.setToolTip('Forget cached instrument settings so that all settings are sent again.')
+        self.resync_button.clicked.connect(self.resync_instruments)
+
         exec_layout.addWidget(self.checkbox_obw)
         exec_layout.addWidget(self.checkbox_oob)
         exec_layout.addWidget(self.checkbox_ex)
         exec_layout.addWidget(self.checkbox_dm2)
         exec_layout.addWidget(self.checkbox_fhss)
+        exec_layout.addWidget(self.checkbox_single)
         exec_layout.addWidget(self.start_button)
         exec_layout.addWidget(self.stop_button)
+        exec_layout.addWidget(self.resync_button)
 
         exec_group.setLayout(exec_layout)
 
-        # Status bar
+        # Status bar with latest telemetry of the running measurement
         self.status_bar = QStatusBar()
+        self.telemetry_label = QLabel()
+        self.status_bar.addPermanentWidget(self.telemetry_label)
         
         # Results section
         results_group = QGroupBox('Results')
@@ -752,18 +927,39 @@ class OutOfBandMeasurementAutomation(QWidget):
         
         results_group.setLayout(results_layout)
 
+        # Latest log records, tailed from the ring buffer of the log writer
+        log_group = QGroupBox('Log')
+        log_layout = QVBoxLayout()
+        self.log_view = QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(LOG_VIEW_LINES)
+        self.log_view.setFixedHeight(120)
+        self.log_position = 0
+        log_layout.addWidget(self.log_view)
+        log_group.setLayout(log_layout)
+
+        # Live spectrum of the analyzer while a measurement is running
+        spectrum_group = QGroupBox('Live Spectrum')
+        spectrum_layout = QVBoxLayout()
+        self.spectrum_view = spectrum_view.SpectrumView()
+        spectrum_layout.addWidget(self.spectrum_view)
+        spectrum_group.setLayout(spectrum_layout)
+
         # Add widgets to main layout
         main_layout.addLayout(project_layout)
+        main_layout.addLayout(eut_layout)
         main_layout.addWidget(man_info_group)
         main_layout.addWidget(parameters_group)
         main_layout.addWidget(exec_group)
         main_layout.addWidget(self.status_bar)
         main_layout.addWidget(results_group)
+        main_layout.addWidget(log_group)
+        main_layout.addWidget(spectrum_group)
 
         self.setLayout(main_layout)
 
-    # template for creation of frequency input incl. unit kHz/MHz/GHz
-    def create_frequency_input(self, label_text):
+    # template for creation of frequency input incl. unit kHz/MHz/GHz, optionally accepting a list of frequencies separated by semicolons
+    def create_frequency_input(self, label_text, multiple=False):
         widget = QWidget()
         layout = QHBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -780,6 +976,8 @@ class OutOfBandMeasurementAutomation(QWidget):
         self.freq_validator = QDoubleValidator(0.0, 1000, 3, notation=QDoubleValidator.StandardNotation)
         self.freq_validator.setLocale(QLocale(QLocale.English))
         input_field.setValidator(self.freq_validator)
+        if multiple:
+            input_field.setValidator(QRegExpValidator(QRegExp(r'\d{1,4}(\.\d{0,3})?(\s*;\s*\d{1,4}(\.\d{0,3})?)*\s*;?'), input_field))
         
         # Ensure the label, input field, and unit selector are aligned correctly
         layout.addWidget(label)
@@ -816,62 +1014,49 @@ class OutOfBandMeasurementAutomation(QWidget):
             self.show_warning('Input Error', 'Please enter the project number.')
             return False
         
-        # check if operating frequency was input and if it is valid (<30 GHz)
-        if self.op_freq_input.input_field.text():
-            if self.op_freq_input.unit_selector.currentIndex() == 2:    # if unit selected is GHz
-                if float(self.op_freq_input.input_field.text()) > 30.0:
-                    self.show_warning('Input Error', 'Please enter a valid operating frequency. Maximum: 30 GHz')
-                    return False
-        else:
-            self.show_warning('Input Error', 'Please enter the operating frequency.')
-            return False
-        
-        # check if operating channel width was input and if it is valid (<30 GHz)
-        if self.op_channel_width_input.input_field.text():
-            if self.op_channel_width_input.unit_selector.currentIndex() == 2:    # if unit selected is GHz
-                if float(self.op_channel_width_input.input_field.text()) > 30.0:
-                    self.show_warning('Input Error', 'Please enter a valid operating channel width. Maximum: 30 GHz')
-                    return False
-        else:
+        # check if operating channel width was input, its value is checked with the other inputs
+        if not self.op_channel_width_input.input_field.text():
             self.show_warning('Input Error', 'Please enter the operating channel width.')
             return False
-        
-        # check if nominal voltage was input and if it is valid (<230 V)
-        if self.nom_volt_input.text():
-            if float(self.nom_volt_input.text()) > 230.0:
-                self.show_warning('Input Error', 'Please enter a valid nominal operating voltage. Maximum: 230 V')
-                return False
-        else:
-            self.show_warning('Input Error', 'Please enter the nominal operating voltage.')
-            return False
 
         # check if e.r.p reference value was input and if it is valid (-35 dBm < e.r.p reference < 14 dBm)
         if self.erp_input.text():
             if not -35 < float(self.erp_input.text()) < 14:
                 self.show_warning('Input Error', 'Please enter a valid e.r.p reference value between -20 and 14 dBm.')
 
-        # if testing under extreme conditions check temp and voltage inputs as well
-        if self.checkbox_ex.isChecked():
-            if not self.min_temp_input.text() or not self.max_temp_input.text() or not self.min_volt_input.text() or not self.max_volt_input.text():
-                self.show_warning('Input Error', 'Please enter the ranges for extreme conditions.')
-                return False
-            else:
-                if float(self.min_temp_input.text()) < self.chamber.temperature_min or float(self.max_temp_input.text()) > self.chamber.temperature_max:
-                    self.show_warning('Input Error', f'Temperature must be between {self.chamber.temperature_min} and {self.chamber.temperature_max} °C')
-                    return False
+        # testing under extreme conditions needs the climate chamber
+        if self.checkbox_ex.isChecked() and self.chamber is None:
+            self.show_warning('Input Error', 'Climate chamber is not connected, testing under extreme conditions not possible.')
+            return False
 
         # check if path for screenshots has been selected
         if not self.selected_path_label.text():
             self.show_warning('Input Error', 'Please select a path for saving screenshots.')
             return False
 
-        # make sure that at least one measurement is supposed to be executed (OBW/OOB)
-        if self.checkbox_obw.isChecked() or self.checkbox_oob.isChecked():
-            return True
-        else:
-            self.show_warning('Input Error', 'Please select at least one of both OBW/OOB measurements to be executed.')
+        # checks shared with the jobs of the station pool: frequencies, voltages, temperatures, bands and selected measurements
+        error = input_error({
+            'channels': [self.convert_freq(freq, self.op_freq_input.unit_selector.currentText()) for freq in self.channel_inputs()],
+            'ocw': self.convert_freq(float(self.op_channel_width_input.input_field.text()), self.op_channel_width_input.unit_selector.currentText()),
+            'voltage': self.nom_volt_input.text(),
+            'temp_min': self.min_temp_input.text(),
+            'temp_max': self.max_temp_input.text(),
+            'volt_min': self.min_volt_input.text(),
+            'volt_max': self.max_volt_input.text(),
+            'measure_obw': self.checkbox_obw.isChecked(),
+            'measure_oob': self.checkbox_oob.isChecked(),
+            'measure_ex': self.checkbox_ex.isChecked(),
+            'fhss': self.checkbox_fhss.isChecked()
+        }, (self.chamber.temperature_min, self.chamber.temperature_max) if self.chamber is not None else None)
+        if error:
+            self.show_warning('Input Error', error)
             return False
+        return True
     
+    # operating frequencies as entered, in the selected unit
+    def channel_inputs(self):
+        return [float(freq) for freq in self.op_freq_input.input_field.text().split(';') if freq.strip()]
+
     # display a message box warning
     def show_warning(self, title, msg):
         QMessageBox.warning(self, title, msg)
@@ -889,6 +1074,16 @@ class OutOfBandMeasurementAutomation(QWidget):
     def execute_measurement(self):
 
         if self.validate_inputs():
+
+            ## Pre-flight check of all instruments before anything is applied to the EUT
+            self.status_bar.showMessage('Running pre-flight check of all instruments...')
+            QApplication.processEvents()
+
+            report = preflight.run_preflight(self.fsv, self.sps, self.chamber, self.selected_path_label.text(), self.checkbox_ex.isChecked())
+            if not report.go:
+                self.status_bar.showMessage('Pre-flight check failed, measurement not started.')
+                self.show_warning('Pre-flight check failed', report.summary())
+                return
             
             ## Preparation and extraction of relevant input from GUI
             self.status_bar.showMessage('Setting EUT supply voltage. Please wait a moment.')
@@ -897,9 +1092,16 @@ class OutOfBandMeasurementAutomation(QWidget):
             self.start_button.setEnabled(False)
             self.stop_button.setEnabled(True)
 
+            # New cancellation token for this measurement, shared by all instruments so that the stop button interrupts every wait
+            self.cancel_token = cancellation.CancelToken()
+            self.fsv.cancel_token = self.cancel_token
+            self.sps.cancel_token = self.cancel_token
+
             # Apply nominal voltage to EUT with SPS power supply
             tags.log('main', 'Setting nominal voltage at EUT.')
-            self.apply_nom_voltage(self.nom_volt_input.text())
+            if not self.apply_nom_voltage(self.nom_volt_input.text()):
+                self.status_bar.showMessage('EUT supply voltage could not be applied, measurement not started.')
+                return
 
             # Display window and pause execution to give user time to set up the EUT, re-commence operation of program once user clicks "continue"
             msg_box = QMessageBox(self)
@@ -920,23 +1122,31 @@ class OutOfBandMeasurementAutomation(QWidget):
             # Extract project number
             project_nr = self.proj_input.text().replace(" ", "-").replace("/", "-")
 
-            # Extract centre frequency
+            # Extract centre frequencies of all channels
             freq_unit = self.op_freq_input.unit_selector.currentText()
-            centre_freq_raw = self.op_freq_input.input_field.text()
-            centre_freq = self.convert_freq(float(centre_freq_raw), freq_unit)
+            channels = [self.convert_freq(freq, freq_unit) for freq in self.channel_inputs()]
 
             # Extract span
             freq_unit = self.op_channel_width_input.unit_selector.currentText()
             ocw_raw = self.op_channel_width_input.input_field.text()
             ocw = self.convert_freq(float(ocw_raw), freq_unit)
 
+            # Extract operational frequency band of every channel
+            fhss = self.checkbox_fhss.isChecked()
+            ofb_ranges = bands.band_ranges(channels, fhss)
+
             ## Prepare inputs to execute measurements in asynchronous thread
             inputs = {
                 'path': self.selected_path_label.text(),
+                'project': self.proj_input.text(),
+                'eut': self.eut_input.text() or None,
                 'filename_obw': f"{datetime.datetime.now().strftime('%Y-%m-%d_')}" + project_nr + "_" + "OccupiedBandwidth.jpg",
                 'filename_oob_oc': f"{datetime.datetime.now().strftime('%Y-%m-%d_')}" + project_nr + "_" + "OOB-OC.jpg",
                 'filename_oob_ofb': f"{datetime.datetime.now().strftime('%Y-%m-%d_')}" + project_nr + "_" + "OOB-OFB-center.jpg",
-                'centre_freq': centre_freq,
+                'filename_telemetry': f"{datetime.datetime.now().strftime('%Y-%m-%d_')}" + project_nr + "_" + "Telemetry.csv",
+                'filename_traces': f"{datetime.datetime.now().strftime('%Y-%m-%d_')}" + project_nr + "_" + "Traces",
+                'filename_report': f"{datetime.datetime.now().strftime('%Y-%m-%d_')}" + project_nr + "_" + "Report.html",
+                'channels': channels,
                 'ocw': ocw,
                 'voltage': self.nom_volt_input.text(),
                 'temp_min': self.min_temp_input.text(),
@@ -946,104 +1156,127 @@ class OutOfBandMeasurementAutomation(QWidget):
                 'measure_obw': self.checkbox_obw.isChecked(),
                 'measure_oob': self.checkbox_oob.isChecked(),
                 'measure_ex': self.checkbox_ex.isChecked(),
-                'adjust_erp': self.erp_input.text()
+                'adjust_erp': self.erp_input.text(),
+                'dm2': self.checkbox_dm2.isChecked(),
+                'single_capture': self.checkbox_single.isChecked(),
+                'fhss': fhss,
+                'ofb_ranges': ofb_ranges,
+                'ac': self.ac_radio.isChecked()
             }
 
+            # Events of the measurement thread are applied to the GUI at a fixed frame rate
+            self.channel = events.EventChannel()
+            self.event_timer = QTimer()
+            self.event_timer.timeout.connect(self.process_events)
+            self.event_timer.start(events.FRAME_INTERVAL)
+
             # Initialize new thread and start the measurement logic on that thread
-            self.measurement_thread = MeasurementThread(self, self.fsv, self.sps, self.chamber, self.standard, inputs)
-            self.measurement_thread.measurement_complete.connect(self.display_results)
+            self.measurement_thread = MeasurementThread(self.fsv, self.sps, self.chamber, self.standard, inputs, self.cancel_token, self.channel)
+            self.measurement_thread.finished.connect(self.measurement_finished)
             self.measurement_thread.start()
             tags.log('main', 'Asynchronous thread initialized and measurement started.')
 
+            # Poll traces for the live view, overlaid with the masks of both OOB measurements
+            in_band = [band for band in ofb_ranges if band]
+            masks = list(self.standard.calc_limits_oc(channels, ocw))
+            if in_band:
+                masks.extend(self.standard.calc_limits_ofb(*zip(*set(in_band))))
+            self.spectrum_view.set_masks([mask.tolist() for mask in masks])
+            self.trace_poller = spectrum_view.TracePoller(self.fsv)
+            self.spectrum_view.attach(self.trace_poller)
+            self.trace_poller.start()
+
     # stops currently ongoing measurement (connected to 'Interrupt Automated Measurement' button)
     def stop_measurement(self):
-        if hasattr(self, 'measurement_thread'):
+        if hasattr(self, 'measurement_thread') and self.measurement_thread.isRunning():
             tags.log('main', 'Stop measurement button clicked. Please wait a moment while everything shuts down.')
-            self.measurement_thread.stop()
-            self.measurement_thread.wait()
+            self.measurement_thread.stop()      # returns immediately, the thread makes the instruments safe and then finishes
+            self.stop_button.setEnabled(False)
+            self.status_bar.showMessage('Stopping measurement, bringing instruments to a safe state...')
+
+    # called in GUI thread once the measurement thread has finished, reports an interruption after the instruments are safe
+    def measurement_finished(self):
+        self.trace_poller.stop()
+        self.trace_poller.wait()
+        self.event_timer.stop()
+        self.process_events()       # apply everything the thread reported before it finished
+
+        report = self.measurement_thread.shutdown_report
+        if report is not None and not report.go:
+            self.show_warning('Safe state not verified', f'Check the instruments manually:\n{report.summary()}')
+
+        # every outcome but a completed measurement (reset by display_results) resets the controls here
+        status = self.measurement_thread.status()
+        if status != 'complete':
             self.timer.stop()
-            sleep(2)
-            self.status_bar.showMessage('Measurement interrupted. Please restart program.')
             self.start_button.setEnabled(True)
             self.stop_button.setEnabled(False)
-            self.show_warning('Measurement interrupted', 'Testing has been stopped and equipment turned off. Please restart program in order to properly continue any testing.')
-    
-    # function containing all GUI and instrument logic for occupied bandwidth measurement
-    def execute_obw_measurement(self, ocw, centre_freq, path, filename_obw):
-        self.status_bar.showMessage('Measuring occupied bandwidth...')
-        tags.log('main', 'Starting OBW measurement.')
-        QApplication.processEvents()
-
-        obw_parameters = self.standard.calc_obw_parameters(ocw)
-
-        return self.fsv.measure_obw(filename_obw, path, centre_freq, obw_parameters)
-
-    # function containing all GUI and instrurment logic for out-of-band emissions measurement
-    def execute_oob_measurement(self, ocw, centre_freq, path, filename_oob_oc, filename_oob_ofb, dm2):
-
-        # get test parameters as per definition in standard and then set them on spectrum analyzer
-        oob_parameters = self.standard.calc_oob_parameters(ocw)
-        self.fsv.prep_oob_parameters(centre_freq, oob_parameters, dm2)
-
-        # 1) OOB testing for operating channel
-        self.status_bar.showMessage('Measuring out-of-band emissions for the operating channel...')
-        tags.log('main', 'Starting OOB operating channel measurement.')
-        QApplication.processEvents()
-
-        limit_points_oc = self.standard.calc_limit_oc(centre_freq, ocw)
-        oc_pass = self.fsv.measure_oob_oc(limit_points_oc, filename_oob_oc, path)
-
-        # 2) OOB testing for operational frequency band    
-        self.status_bar.showMessage('Measuring out-of-band emissions for the operational frequency band...')
-        tags.log('main', 'Starting OOB operational frequency band measurement.')
-        QApplication.processEvents()
 
-        f_low, f_high = self.determine_freq_range(centre_freq, self.checkbox_fhss.isChecked())
-
-        limit_points_ofb = self.standard.calc_limit_ofb(f_low, f_high)
-        ofb_pass = self.fsv.measure_oob_ofb(limit_points_ofb, filename_oob_ofb, path)
-        self.fsv.prep_oob_parameters(centre_freq, oob_parameters, dm2)
-
-        return oc_pass, ofb_pass
+        if status == 'aborted':
+            self.status_bar.showMessage('Measurement aborted.')
+            self.show_warning('Measurement aborted', self.measurement_thread.abort_reason or 'Measurement ended without results, check logs.')
+        elif self.measurement_thread.stop_flag:
+            self.status_bar.showMessage('Measurement interrupted.')
+            diagnosis = self.measurement_thread.watchdog.diagnosis()
+            if diagnosis:
+                self.show_warning('Connection lost', f'Measurement stopped, connection could not be re-established:\n{diagnosis}')
+            elif self.measurement_thread.error:
+                self.show_warning('Error in background thread', 'Undefined error in background thread during measurement, check logs.')
+            else:
+                self.show_warning('Measurement interrupted', 'Testing has been stopped and equipment turned off.')
     
-    # function containing logic for applying nominal voltage with GUI input
+    # apply the events received from the measurement thread, called by the event timer in GUI thread
+    def process_events(self):
+        self.tail_log()
+        for event in self.channel.drain():
+            if isinstance(event, events.ProgressEvent):
+                self.status_bar.showMessage(event.message)
+            elif isinstance(event, events.TelemetryEvent):
+                temp = f'{event.chamber_temp:.2f} °C' if event.chamber_temp is not None else 'n/a'
+                voltage = f'{event.sps_voltage:.2f} V' if event.sps_voltage is not None else 'n/a'
+                self.telemetry_label.setText(f'Chamber: {temp}   Supply: {voltage}')
+            elif isinstance(event, events.WarningEvent):
+                self.show_warning(event.title, event.message)
+            elif isinstance(event, events.ResultEvent):
+                self.display_results(event.results)
+
+    # append the records logged since the last call to the log view
+    def tail_log(self):
+        for self.log_position, record in logbook.tail(self.log_position):
+            if record['level'] != 'DEBUG':
+                self.log_view.appendPlainText(f'{record["time"][11:]} [{record["tag"]}] {record["message"]}')
+
+    # clear the shadow cache of all instruments (connected to 'Resync Instrument State' button)
+    def resync_instruments(self):
+        self.fsv.invalidate()
+        self.fsv.setups.invalidate()
+        self.fsv.limits.invalidate()
+        self.sps.invalidate()
+        tags.log('main', 'Instrument state cache cleared, all settings will be sent again.')
+        self.status_bar.showMessage('Instrument state cache cleared, all settings will be sent again.')
+
+    # function containing logic for applying nominal voltage with GUI input, returns False if the voltage was not applied
     def apply_nom_voltage(self, voltage):
         voltage = float(voltage)
 
         if voltage > 270.0 or voltage <= 0.0:
             QMessageBox.warning(self, 'Input Error', 'Please enter a valid voltage.')
-            return
+            return False
         
         if self.dc_radio.isChecked():
             result = self.sps.set_voltage_dc(voltage)
         else:
             ac_freq = self.frequency_input.text()
-            if not ac_freq or int(ac_freq) > 100:
+            if not ac_freq or float(ac_freq) > 100:
                 ac_freq = 50
                 self.frequency_input.setText('50')
 
             result = self.sps.set_voltage_ac(voltage, ac_freq)
 
-        # check if stop flag was set
+        # output is switched off again by the driver if the voltage didn't settle
         if not result:
-            return
-
-    # function for setting voltage in cases of min/max voltage extreme conditions
-    def apply_ex_voltage(self, voltage):
-        voltage = float(voltage)
-        
-        if self.dc_radio.isChecked():
-            result = self.sps.change_voltage_dc(voltage)
-        else:
-            result = self.sps.change_voltage_ac(voltage)
-
-        # check if stop flag was set
-        if not result:
-            return False
-
-        sleep(10)
-
-        return True
+            self.show_warning('Error applying voltage', f'Check connection to power supply. {self.sps.diagnosis}')
+        return result
 
     # display results in bottom of GUI
     def display_results(self, results):
@@ -1060,27 +1293,34 @@ class OutOfBandMeasurementAutomation(QWidget):
         obw_measured = results.get('obw_measured', False)
         oob_measured = results.get('oob_measured', False)
         ex_measured = results.get('measure_ex', False)
+        multiple = ex_measured or results.get('channels', 1) > 1       # results of several conditions and/or channels as lists
+        scope = 'extreme conditions' if ex_measured else 'all channels'
         
         if obw_measured:
 
-            if ex_measured:
-                obw_min = min(results['obw'])
-                obw_max = max(results['obw'])
-                self.obw_result_label.setText(f'Measured Occupied Bandwidth (extreme conditions): min: <b>{self.fsv.format_freq(obw_min)}</b> max: <b>{self.fsv.format_freq(obw_max)}</b>')
+            # bandwidths of steps that failed after a lost connection are None
+            if multiple:
+                bandwidths = [obw for obw in results['obw'] if obw is not None]
+                if bandwidths:
+                    missing = len(results['obw']) - len(bandwidths)
+                    self.obw_result_label.setText(f'Measured Occupied Bandwidth ({scope}): min: <b>{self.fsv.format_freq(min(bandwidths))}</b> max: <b>{self.fsv.format_freq(max(bandwidths))}</b>'
+                                                  + (f' ({missing} not measured)' if missing else ''))
+                else:
+                    self.obw_result_label.setText(f'Measured Occupied Bandwidth ({scope}): <b>not measured</b>')
             else:
                 obw = results['obw']
-                self.obw_result_label.setText(f'Measured Occupied Bandwidth: <b>{self.fsv.format_freq(str.strip(obw))}</b>')
+                self.obw_result_label.setText(f'Measured Occupied Bandwidth: <b>{self.fsv.format_freq(obw) if obw is not None else "not measured"}</b>')
         
         if oob_measured:
 
-            if ex_measured:
+            if multiple:
                 oc_pass = all(results['oc_passes'])
                 ofb_pass = all(results['ofb_passes'])
 
-                oc_status = "OOB Operating Channel Test (throughout extreme conditions): <b><font color='green'>PASS</font></b>" if oc_pass else "Operating Channel: <b><font color='red'>FAIL</font></b>"
+                oc_status = f"OOB Operating Channel Test (throughout {scope}): <b><font color='green'>PASS</font></b>" if oc_pass else "Operating Channel: <b><font color='red'>FAIL</font></b>"
                 self.op_channel_result_label.setText(oc_status)
 
-                ofb_status = "OOB Operational Frequency Band Test (throughout extreme conditions): <b><font color='green'>PASS</font></b>" if ofb_pass else "Operational Frequency Band: <b><font color='red'>FAIL</font></b>"
+                ofb_status = f"OOB Operational Frequency Band Test (throughout {scope}): <b><font color='green'>PASS</font></b>" if ofb_pass else "Operational Frequency Band: <b><font color='red'>FAIL</font></b>"
                 self.op_band_result_label.setText(ofb_status)
 
             else:
@@ -1093,34 +1333,184 @@ class OutOfBandMeasurementAutomation(QWidget):
                 self.op_band_result_label.setText(ofb_status)
 
         self.screenshots_path_label.setText(f'Screenshots saved at: <a href="{self.selected_path_label.text()}">{self.selected_path_label.text()}</a>')
-
-    # determine frequency range with given operating frequency. returns lower and upper limits
-    def determine_freq_range(self, freq, fhss: bool = False, filename="ERC-data/bands_03-2024.csv"):
-
-        if fhss:
-            filename="ERC-data/bands_03-2024_FHSS.csv"
-
-        with open(filename, 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            # Skip the header row (assuming the first row contains column names)
-            next(reader)
-
-            for row in reader:
-                # Get band name, lower frequency, and upper frequency
-                band, lower_freq, upper_freq = row
-
-                # Convert frequencies to integers (assuming integer values in Hz)
-                lower_freq = int(lower_freq)
-                upper_freq = int(upper_freq)
-
-                # Check if the given frequency falls within the current band
-                if lower_freq <= freq <= upper_freq:
-                    return lower_freq, upper_freq
-
-        # Frequency not found in any band
-        return None
+        if results.get('report'):
+            self.screenshots_path_label.setText(self.screenshots_path_label.text() + f'<br>Test report: <a href="file:///{results["report"]}">{os.path.basename(results["report"])}</a>')
+
+# nominal or extreme voltage as entered, positive and not above the given maximum
+def valid_voltage(voltage, maximum=MAX_VOLTAGE):
+    try:
+        return 0 < float(voltage) <= maximum
+    except ValueError:
+        return False
+
+# checks of the measurement inputs shared by the GUI and the jobs of the station pool, without any instrument access. frequencies in Hz, voltages
+# and temperatures as entered, temperature_range (min, max) of the chamber in °C. returns the error message or None if the inputs are valid
+def input_error(inputs, temperature_range=None):
+    temperature_range = temperature_range or (wkl.TEMPERATURE_MIN, wkl.TEMPERATURE_MAX)
+    channels = inputs['channels']
+
+    if not channels:
+        return 'Please enter the operating frequency.'
+    if not all(0 < freq <= MAX_FREQ for freq in channels):
+        return 'Please enter a valid operating frequency. Maximum: 30 GHz'
+    if not 0 < inputs['ocw'] <= MAX_FREQ:
+        return 'Please enter a valid operating channel width. Maximum: 30 GHz'
+
+    if not str(inputs['voltage']).strip():
+        return 'Please enter the nominal operating voltage.'
+    if not valid_voltage(inputs['voltage'], MAX_NOMINAL_VOLTAGE):
+        return f'Please enter a valid nominal operating voltage. Maximum: {MAX_NOMINAL_VOLTAGE} V'
+
+    if inputs['measure_ex']:
+        if not all(str(inputs[key]).strip() for key in ('temp_min', 'temp_max', 'volt_min', 'volt_max')):
+            return 'Please enter the ranges for extreme conditions.'
+        if float(inputs['temp_min']) < temperature_range[0] or float(inputs['temp_max']) > temperature_range[1]:
+            return f'Temperature must be between {temperature_range[0]} and {temperature_range[1]} °C'
+        if not valid_voltage(inputs['volt_min']) or not valid_voltage(inputs['volt_max']):
+            return f'Extreme voltages must be between 0 and {MAX_VOLTAGE} V'
+
+    # the operational frequency band mask needs a band for every channel
+    if inputs['measure_oob']:
+        outside = [freq for freq, band in zip(channels, bands.band_ranges(channels, inputs['fhss'])) if band is None]
+        if outside:
+            return f'No operational frequency band found for {", ".join(f"{freq/1e6:.3f} MHz" for freq in outside)}.'
+
+    # make sure that at least one measurement is supposed to be executed (OBW/OOB)
+    if not inputs['measure_obw'] and not inputs['measure_oob']:
+        return 'Please select at least one of both OBW/OOB measurements to be executed.'
+    return None
+
+# inputs of a job of the station pool from an entry of a job file, frequencies in Hz. derived values as in the GUI. raises ValueError for invalid inputs
+def job_inputs(spec):
+    prefix = datetime.datetime.now().strftime('%Y-%m-%d_') + spec['project'].replace(" ", "-").replace("/", "-") + "_"
+    channels = [float(freq) for freq in spec['channels']]
+    fhss = spec.get('fhss', False)
+    inputs = {
+        'path': spec['path'],
+        'project': spec['project'],
+        'eut': spec.get('eut'),
+        'filename_obw': prefix + "OccupiedBandwidth.jpg",
+        'filename_oob_oc': prefix + "OOB-OC.jpg",
+        'filename_oob_ofb': prefix + "OOB-OFB-center.jpg",
+        'filename_telemetry': prefix + "Telemetry.csv",
+        'filename_traces': prefix + "Traces",
+        'filename_report': prefix + "Report.html",
+        'channels': channels,
+        'ocw': float(spec['ocw']),
+        'voltage': str(spec['voltage']),
+        'temp_min': str(spec.get('temp_min', '')),
+        'temp_max': str(spec.get('temp_max', '')),
+        'volt_min': str(spec.get('volt_min', '')),
+        'volt_max': str(spec.get('volt_max', '')),
+        'measure_obw': spec.get('measure_obw', True),
+        'measure_oob': spec.get('measure_oob', True),
+        'measure_ex': spec.get('measure_ex', False),
+        'adjust_erp': str(spec.get('adjust_erp', '')),
+        'dm2': spec.get('dm2', False),
+        'single_capture': spec.get('single_capture', False),
+        'fhss': fhss,
+        'ofb_ranges': bands.band_ranges(channels, fhss),
+        'ac': spec.get('ac', False),
+        'ac_freq': spec.get('ac_freq', 50)
+    }
+
+    error = input_error(inputs)
+    if error:
+        raise ValueError(f'Job {spec.get("name") or spec["project"]}: {error}')
+    return inputs
+
+# execute a job of the station pool on the drivers of a station, in the worker thread of the station. returns the results as shown in the GUI
+def run_station_job(station, job, channel=None, observer=None):
+    inputs = job.inputs
+    check = preflight.run_preflight(station.fsv, station.sps, station.chamber, inputs['path'], inputs['measure_ex'])
+    if not check.go:
+        raise RuntimeError(f'Pre-flight check failed on station {station.name}:\n{check.summary()}')
+
+    # EUT is set up at the station before the job is queued
+    if inputs['ac']:
+        applied = station.sps.set_voltage_ac(float(inputs['voltage']), inputs['ac_freq'])
+    else:
+        applied = station.sps.set_voltage_dc(float(inputs['voltage']))
+    if not applied:
+        raise RuntimeError(f'Nominal voltage could not be applied on station {station.name}: {station.sps.diagnosis}')
+
+    channel = channel or events.EventChannel()
+    thread = MeasurementThread(station.fsv, station.sps, station.chamber, EN_300_220_1.EN_300_220_1(), inputs, station.cancel_token, channel)
+    thread.observer = observer
+    thread.run()
+    if thread.error is not None:
+        raise thread.error
+    if thread.abort_reason is not None:
+        raise RuntimeError(thread.abort_reason)
+    return next((event.results for event in channel.drain() if isinstance(event, events.ResultEvent)), None)
+
+# run all jobs of a job file (JSON list of jobs) on the stations of the lab without GUI. returns True if every job completed
+def run_jobs(filename):
+    with open(filename, 'r') as f:
+        specs = json.load(f)
+
+    # every job is checked before the first one is started
+    try:
+        jobs = [stations.Job(job_inputs(spec), spec.get('name'), spec.get('station')) for spec in specs]
+    except (ValueError, KeyError, TypeError) as e:
+        tags.log('main', f'Invalid job file {filename}: {e}', tags.ERROR)
+        return False
+
+    pool = stations.StationPool(stations.load_stations(), run_station_job)
+    pool.start()
+    for job in jobs:
+        pool.submit(job)
+    pool.close()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        tags.log('main', 'Interrupted, stopping all stations.')
+        pool.stop()
+        pool.join()
+
+    for result in sorted(pool.results, key=lambda result: result.job.sequence):
+        tags.log('main', str(result))
+    return len(pool.results) == len(specs) and all(result.error is None and result.results for result in pool.results)
 
 def main():
+    # only the process started by the user writes the log file, processes of its pools import tags without it
+    logbook.configure(tags.log_file, tags.log_level)
+
+    # instrument traffic of the session recorded to or replayed from a cassette, in front of any other mode:
+    # obw-oob-automation_main.py --record session.cassette.gz [...], --replay session.cassette.gz [...] (full speed) or --replay-paced (recorded pace)
+    recorder = None
+    if len(sys.argv) > 2 and sys.argv[1] in ('--record', '--replay', '--replay-paced'):
+        if sys.argv[1] == '--record':
+            recorder = cassette.record(sys.argv[2])
+            atexit.register(recorder.close)
+        else:
+            cassette.replay(sys.argv[2], pace=1 if sys.argv[1] == '--replay-paced' else 0)
+        del sys.argv[1:3]
+
+    # headless operation of several stations: obw-oob-automation_main.py --jobs jobs.json
+    if len(sys.argv) > 2 and sys.argv[1] == '--jobs':
+        sys.exit(0 if run_jobs(sys.argv[2]) else 1)
+
+    # measurement engine as background service, jobs are submitted over its localhost API and traces read from its shared memory
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        service.serve(stations.load_stations(), run_station_job, job_inputs)
+        return
+
+    # observer of a running engine service: live spectrum of one station (or of all stations) without controlling the measurement
+    if len(sys.argv) > 1 and sys.argv[1] == '--watch':
+        app = QApplication(sys.argv)
+        view = spectrum_view.SpectrumView()
+        view.setWindowTitle('EN 300 220-1 Test Automation - Live Spectrum')
+        view.resize(800, 400)
+        poller = spectrum_view.RingPoller(sys.argv[2] if len(sys.argv) > 2 else None)
+        view.attach(poller)
+        poller.start()
+        view.show()
+        code = app.exec_()
+        poller.stop()
+        poller.wait()
+        sys.exit(code)
+
     myappid = 'tuevnord.srdautomation'
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
     app = QApplication(sys.argv)
@@ -0,0 +1,80 @@
+"""
+file: concurrent pre-flight health check of all instruments before a measurement is started
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, wait
+import tags
+import wkl
+from checks import Check, CheckReport, run_check
+
+PROBE_TIMEOUT = 1.5         # in seconds, per single instrument query
+PREFLIGHT_DEADLINE = 3      # in seconds, for the complete pre-flight stage
+MIN_FREE_DISK = 200         # in MB, free space required on the screenshot path
+
+
+### PROBES (each returns a detail string or raises)
+def probe_fsv(fsv):
+    idn, errors = fsv.probe(int(PROBE_TIMEOUT*1000))
+    if errors:
+        raise RuntimeError(f'{idn} reports errors: {"; ".join(errors)}')
+    return idn
+
+def probe_sps(sps):
+    idn, _ = sps.probe(int(PROBE_TIMEOUT*1000))
+    return idn
+
+def probe_ars(sps):
+    sps.probe_ars(int(PROBE_TIMEOUT*1000))
+    return f'ARS answering at {sps.ars_address}'
+
+def probe_wkl(chamber):
+    if chamber is not None:
+        return f'{chamber.idn}, {"running" if chamber.is_running else "idle"}'
+    chamber = wkl.WKL(tags.wkl_ip, timeout=PROBE_TIMEOUT)     # probe connection only, closed again
+    try:
+        return f'{chamber.idn}, {"running" if chamber.is_running else "idle"}'
+    finally:
+        chamber.close()
+
+def probe_disk(path):
+    if not os.path.isdir(path) or not os.access(path, os.W_OK):
+        raise RuntimeError(f'Screenshot path {path} is not a writable directory')
+    free = shutil.disk_usage(path).free / 2**20
+    if free < MIN_FREE_DISK:
+        raise RuntimeError(f'Only {free:.0f} MB free on {path}, at least {MIN_FREE_DISK} MB required')
+    return f'{free:.0f} MB free on {path}'
+
+
+# probe all instruments in parallel, every probe that doesn't answer within the deadline counts as failed
+def run_preflight(fsv, sps, chamber, path, require_chamber=True):
+    probes = {
+        'FSV': (probe_fsv, fsv),
+        'SPS': (probe_sps, sps),
+        'ARS': (probe_ars, sps),
+        'Disk': (probe_disk, path)
+    }
+    if require_chamber:
+        probes['WKL'] = (probe_wkl, chamber)
+
+    executor = ThreadPoolExecutor(max_workers=len(probes))
+    futures = {device: executor.submit(run_check, device, *probe) for device, probe in probes.items()}
+    wait(futures.values(), timeout=PREFLIGHT_DEADLINE)
+    executor.shutdown(wait=False, cancel_futures=True)     # don't block on probes hanging in a driver call
+
+    checks = []
+    for device, future in futures.items():
+        if future.done():
+            checks.append(future.result())
+        else:
+            checks.append(Check(device, False, f'no answer within {PREFLIGHT_DEADLINE} s', PREFLIGHT_DEADLINE))
+
+    report = CheckReport(checks)
+    for check in checks:
+        tags.log('Preflight', str(check), tags.INFO if check.ok else tags.ERROR, instrument=check.device, duration=round(check.duration, 3))
+    tags.log('Preflight', f'Pre-flight check result: {"GO" if report.go else "NO-GO"}')
+
+    return report
@@ -0,0 +1,110 @@
+"""
+file: HTML test report rendered from the trace archive in a process pool while the measurement is running
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import datetime
+import html
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import tags
+import trace_archive
+import report_worker
+
+PLOT_WIDTH = 640            # in px, also the number of columns the traces are decimated to
+PLOT_HEIGHT = 280
+PLOT_RANGE = 100            # in dB, vertical range below the reference line
+REPORT_WORKERS = 2
+
+STYLE = """
+body { font-family: Arial, sans-serif; margin: 2em; }
+table { border-collapse: collapse; margin-bottom: 1.5em; }
+td, th { border: 1px solid #999; padding: 4px 10px; text-align: left; }
+.pass { color: green; font-weight: bold; }
+.fail { color: red; font-weight: bold; }
+figure { display: inline-block; margin: 0 1em 1em 0; }
+"""
+
+
+# render a trace with its limit masks as inline SVG
+def render_svg(freqs, levels, masks):
+    freqs, levels = trace_archive.decimate_minmax(freqs, levels, PLOT_WIDTH)
+    f_start, f_stop = float(freqs[0]), float(freqs[-1])
+    top = 10 * np.ceil(max(float(np.nanmax(levels)), 0) / 10)
+
+    def points(fs, ls):
+        xs = (np.asarray(fs, dtype=float) - f_start) / (f_stop - f_start) * PLOT_WIDTH
+        ys = (top - np.asarray(ls, dtype=float)) / PLOT_RANGE * PLOT_HEIGHT
+        return ' '.join(f'{x:.1f},{y:.1f}' for x, y in zip(xs, ys))
+
+    grid = ''.join(f'<line x1="0" y1="{y:.1f}" x2="{PLOT_WIDTH}" y2="{y:.1f}" stroke="#ddd"/>' for y in np.arange(0, PLOT_HEIGHT + 1, PLOT_HEIGHT / (PLOT_RANGE / 10)))
+    mask_lines = ''.join(f'<polyline points="{points(*zip(*mask))}" fill="none" stroke="red" stroke-width="1.5"/>' for mask in masks)
+
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{PLOT_WIDTH}" height="{PLOT_HEIGHT + 20}" viewBox="0 0 {PLOT_WIDTH} {PLOT_HEIGHT + 20}">'
+            f'<svg width="{PLOT_WIDTH}" height="{PLOT_HEIGHT}" overflow="hidden">{grid}'
+            f'<polyline points="{points(freqs, levels)}" fill="none" stroke="#1f4e9c" stroke-width="1"/>{mask_lines}</svg>'
+            f'<text x="2" y="{PLOT_HEIGHT + 15}" font-size="11">{f_start/1e6:.3f} MHz</text>'
+            f'<text x="{PLOT_WIDTH - 2}" y="{PLOT_HEIGHT + 15}" font-size="11" text-anchor="end">{f_stop/1e6:.3f} MHz</text>'
+            f'<text x="2" y="12" font-size="11">{top:.0f} dBm</text></svg>')
+
+
+# render all archived traces of one channel at one plateau, runs in a worker process. masks as {label: [limit lines]}
+def render_condition(archive_directory, condition, channel, masks):
+    archive = trace_archive.TraceArchive(archive_directory)
+    figures = []
+    for i in archive.select(condition=condition, channel=channel):
+        record = archive.index[i]
+        label = record['label'].decode()
+        caption = f'{label} &ndash; RBW {record["rbw"]/1e3:g} kHz, VBW {record["vbw"]/1e3:g} kHz, {record["detector"].decode()}'
+        figures.append(f'<figure>{render_svg(*archive.trace(i), masks.get(label, []))}<figcaption>{caption}</figcaption></figure>')
+    return f'<h2>Condition: {html.escape(condition)}, channel {channel/1e6:.3f} MHz</h2>\n' + '\n'.join(figures)
+
+
+def verdict(passed):
+    if passed is None:
+        return '&ndash;'
+    return '<span class="pass">PASS</span>' if passed else '<span class="fail">FAIL</span>'
+
+
+# collects the plateaus of a measurement, renders them in a process pool as they arrive and writes the report at the end
+class ReportBuilder:
+
+    def __init__(self, filepath, title, parameters, archive_directory, workers=REPORT_WORKERS):
+        self.filepath = filepath
+        self.title = title
+        self.parameters = parameters            # {name: value} shown at the top of the report
+        self.archive_directory = archive_directory
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=report_worker.context)      # workers don't import the GUI script
+        self.conditions = []                    # (row of the condition table, future of the rendered section)
+
+    # start rendering a channel at a plateau, row contains condition, channel, temperature, voltage, obw, oc_pass and ofb_pass
+    def add_condition(self, row, masks):
+        future = self.executor.submit(render_condition, self.archive_directory, row['condition'], row['channel'], masks)
+        self.conditions.append((row, future))
+
+    # wait for all plateaus and write the report, returns the file path
+    def finish(self, status):
+        rows = []
+        sections = []
+        for row, future in self.conditions:
+            try:
+                sections.append(future.result())
+            except Exception as e:
+                sections.append(f'<h2>Condition: {html.escape(row["condition"])}</h2><p>Plots not available: {html.escape(str(e))}</p>')
+            temperature = f'{row["temperature"]} °C' if row['temperature'] is not None else 'ambient'
+            obw = f'{float(row["obw"])/1e3:.3f} kHz' if row['obw'] is not None else '&ndash;'
+            rows.append(f'<tr><td>{html.escape(row["condition"])}</td><td>{row["channel"]/1e6:.3f} MHz</td><td>{temperature}</td><td>{row["voltage"]} V</td><td>{obw}</td><td>{verdict(row["oc_pass"])}</td><td>{verdict(row["ofb_pass"])}</td></tr>')
+        self.executor.shutdown()
+
+        parameters = ''.join(f'<tr><th>{html.escape(name)}</th><td>{html.escape(str(value))}</td></tr>' for name, value in self.parameters.items())
+        document = (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(self.title)}</title><style>{STYLE}</style></head><body>\n'
+                    f'<h1>{html.escape(self.title)}</h1>\n<table>{parameters}<tr><th>Status</th><td>{html.escape(status)}</td></tr>'
+                    f'<tr><th>Generated</th><td>{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</td></tr></table>\n'
+                    '<table><tr><th>Condition</th><th>Channel</th><th>Temperature</th><th>Voltage</th><th>OBW</th><th>OOB Operating Channel</th><th>OOB Operational Frequency Band</th></tr>'
+                    + ''.join(rows) + '</table>\n' + '\n'.join(sections) + '\n</body></html>\n')
+
+        with open(self.filepath, 'w', encoding='utf-8') as f:
+            f.write(document)
+        tags.log('Report', f'Report written to {self.filepath}')
+        return self.filepath
@@ -0,0 +1,34 @@
+"""
+file: start of the report worker processes from this module instead of the GUI script, so that spawned workers only import the report modules
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import multiprocessing.context
+import sys
+import threading
+
+_main_lock = threading.Lock()
+
+
+# spawned process that imports this module as its main module. a spawned child re-imports the main module of the parent, which is the GUI
+# script with PyQt5, pyvisa and all drivers. the tasks import report and trace_archive themselves when they are unpickled
+class WorkerProcess(multiprocessing.context.SpawnProcess):
+
+    @staticmethod
+    def _Popen(process_obj):
+        with _main_lock:
+            main = sys.modules['__main__']
+            sys.modules['__main__'] = sys.modules[__name__]     # only read while the preparation data of the child is collected
+            try:
+                return multiprocessing.context.SpawnProcess._Popen(process_obj)
+            finally:
+                sys.modules['__main__'] = main
+
+
+# spawn context for the process pool of the report, same start method on every platform
+class WorkerContext(multiprocessing.context.SpawnContext):
+    Process = WorkerProcess
+
+
+context = WorkerContext()
@@ -0,0 +1,134 @@
+"""
+file: SQLite store of all runs, test conditions, measurement results, telemetry summaries and artifacts
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+import datetime
+import sqlite3
+import tags
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    eut TEXT,
+    started TEXT NOT NULL,
+    finished TEXT,
+    status TEXT NOT NULL DEFAULT 'running',
+    ocw INTEGER NOT NULL,
+    path TEXT
+);
+CREATE TABLE IF NOT EXISTS channels (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    centre_freq INTEGER NOT NULL,
+    band_low INTEGER,
+    band_high INTEGER
+);
+CREATE TABLE IF NOT EXISTS conditions (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    label TEXT NOT NULL,
+    temperature REAL,
+    voltage REAL,
+    recorded TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    id INTEGER PRIMARY KEY,
+    condition_id INTEGER NOT NULL REFERENCES conditions(id),
+    kind TEXT NOT NULL,
+    channel INTEGER NOT NULL,
+    value REAL,
+    passed INTEGER,
+    margin REAL
+);
+CREATE TABLE IF NOT EXISTS telemetry (
+    condition_id INTEGER NOT NULL REFERENCES conditions(id),
+    channel TEXT NOT NULL,
+    minimum REAL,
+    maximum REAL,
+    mean REAL,
+    samples INTEGER
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    condition_id INTEGER NOT NULL REFERENCES conditions(id),
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_project ON runs(project);
+CREATE INDEX IF NOT EXISTS runs_eut ON runs(eut);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started);
+CREATE INDEX IF NOT EXISTS channels_run ON channels(run_id);
+CREATE INDEX IF NOT EXISTS channels_band ON channels(band_low, band_high);
+CREATE INDEX IF NOT EXISTS conditions_run ON conditions(run_id);
+CREATE INDEX IF NOT EXISTS measurements_condition ON measurements(condition_id);
+CREATE INDEX IF NOT EXISTS measurements_kind_margin ON measurements(kind, margin);
+CREATE INDEX IF NOT EXISTS telemetry_condition ON telemetry(condition_id);
+CREATE INDEX IF NOT EXISTS artifacts_condition ON artifacts(condition_id);
+"""
+
+
+def now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+# connection to the results database, each thread opens its own store
+class ResultsStore:
+
+    def __init__(self, filepath=tags.results_db):
+        self.connection = sqlite3.connect(filepath, timeout=10)
+        self.connection.execute('PRAGMA journal_mode=WAL')         # readers don't block the writer of a running measurement
+        self.connection.execute('PRAGMA synchronous=NORMAL')        # WAL stays consistent, only the last commit may be lost on power failure
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    # register a new run with its channels and their operational frequency bands (None if outside of all bands) and return its id
+    def start_run(self, project, channels, ocw, bands, eut=None, path=None):
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO runs (project, eut, started, ocw, path) VALUES (?, ?, ?, ?, ?)',
+                (project, eut, now(), ocw, path))
+            self.connection.executemany(
+                'INSERT INTO channels (run_id, centre_freq, band_low, band_high) VALUES (?, ?, ?, ?)',
+                [(cursor.lastrowid, centre_freq, *(band or (None, None))) for centre_freq, band in zip(channels, bands)])
+        return cursor.lastrowid
+
+    def finish_run(self, run_id, status):
+        with self.connection:
+            self.connection.execute('UPDATE runs SET finished = ?, status = ? WHERE id = ?', (now(), status, run_id))
+
+    # store all results of one plateau in a single transaction. measurements as (kind, channel, value, passed, margin), telemetry as {channel: (min, max, mean, samples)}, artifacts as (kind, path)
+    def add_condition(self, run_id, label, temperature, voltage, measurements, telemetry=None, artifacts=()):
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO conditions (run_id, label, temperature, voltage, recorded) VALUES (?, ?, ?, ?, ?)',
+                (run_id, label, temperature, voltage, now()))
+            condition_id = cursor.lastrowid
+
+            self.connection.executemany(
+                'INSERT INTO measurements (condition_id, kind, channel, value, passed, margin) VALUES (?, ?, ?, ?, ?, ?)',
+                [(condition_id, kind, channel, value, None if passed is None else int(passed), margin) for kind, channel, value, passed, margin in measurements])
+            self.connection.executemany(
+                'INSERT INTO telemetry (condition_id, channel, minimum, maximum, mean, samples) VALUES (?, ?, ?, ?, ?, ?)',
+                [(condition_id, channel, *summary) for channel, summary in (telemetry or {}).items()])
+            self.connection.executemany(
+                'INSERT INTO artifacts (condition_id, kind, path) VALUES (?, ?, ?)',
+                [(condition_id, kind, path) for kind, path in artifacts])
+        return condition_id
+
+    # all measurements of a kind with a margin below the given value (in dB) for EUT channels in the band of the given frequency
+    def find_low_margins(self, freq, max_margin, kind='oob_oc'):
+        return self.connection.execute("""
+            SELECT runs.project, runs.eut, runs.started, channels.centre_freq, conditions.label, measurements.margin
+            FROM channels
+            JOIN runs ON runs.id = channels.run_id
+            JOIN conditions ON conditions.run_id = runs.id
+            JOIN measurements ON measurements.condition_id = conditions.id AND measurements.channel = channels.centre_freq
+            WHERE channels.band_low <= ? AND channels.band_high >= ? AND measurements.kind = ? AND measurements.margin < ?
+            ORDER BY measurements.margin""", (freq, freq, kind, max_margin)).fetchall()
+
+    # all runs of a project, most recent first
+    def find_runs(self, project):
+        return self.connection.execute('SELECT * FROM runs WHERE project = ? ORDER BY started DESC', (project,)).fetchall()
@@ -0,0 +1,338 @@
+"""
+file: measurement engine as a local background service: job API over localhost HTTP and a shared-memory ring with traces and telemetry for any number of clients
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import itertools
+import json
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import events
+import stations
+import tags
+
+RING_SLOTS = 64
+RING_MAX_POINTS = 32001     # maximum number of sweep points of the FSV
+LIVE_INTERVAL = 1           # in seconds, polling of the analyzers of running stations for the live view
+
+# record kinds in the ring
+TRACE = 1       # trace captured by a measurement step
+LIVE = 2        # trace polled from the analyzer in between
+TELEMETRY = 3   # levels hold (chamber temperature, supply voltage)
+
+RING_HEADER_DTYPE = np.dtype([('magic', 'S8'), ('slots', '<i4'), ('max_points', '<i4'), ('written', '<u8')])
+RING_SLOT_DTYPE = np.dtype([
+    ('sequence', '<u8'),        # number of the record + 1, 0 while the slot is being written
+    ('kind', 'u1'),
+    ('timestamp', '<f8'),
+    ('station', 'S16'),
+    ('label', 'S32'),
+    ('start', '<f8'),
+    ('stop', '<f8'),
+    ('points', '<i4'),
+    ('levels', '<f4', (RING_MAX_POINTS,))
+])
+RING_MAGIC = b'OOBRING1'
+
+
+### SHARED-MEMORY RING
+# map header and slots onto a shared memory block
+def _ring_views(shm):
+    header = np.ndarray(1, dtype=RING_HEADER_DTYPE, buffer=shm.buf)
+    slots = np.ndarray(int(header['slots'][0]) or RING_SLOTS, dtype=RING_SLOT_DTYPE, buffer=shm.buf, offset=RING_HEADER_DTYPE.itemsize)
+    return header, slots
+
+
+# single writer of the ring, owned by the engine process
+class TraceRing:
+
+    def __init__(self, name=tags.trace_ring, slots=RING_SLOTS):
+        size = RING_HEADER_DTYPE.itemsize + slots*RING_SLOT_DTYPE.itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:         # left over by an engine that wasn't shut down
+            shared_memory.SharedMemory(name=name).unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray(1, dtype=RING_HEADER_DTYPE, buffer=self.shm.buf)
+        header[0] = (RING_MAGIC, slots, RING_MAX_POINTS, 0)
+        self.header, self.slots = _ring_views(self.shm)
+        self.lock = threading.Lock()        # several station workers publish
+
+    def publish(self, kind, station, label, start, stop, levels):
+        levels = np.asarray(levels, dtype=np.float32)[:RING_MAX_POINTS]
+        with self.lock:
+            written = int(self.header['written'][0])
+            slot = self.slots[written % len(self.slots):][:1]
+            slot['sequence'] = 0            # readers skip the slot until it is complete
+            slot['kind'] = kind
+            slot['timestamp'] = time.time()
+            slot['station'] = station.encode()[:16]
+            slot['label'] = label.encode()[:32]
+            slot['start'] = start
+            slot['stop'] = stop
+            slot['points'] = len(levels)
+            slot['levels'][0, :len(levels)] = levels
+            slot['sequence'] = written + 1
+            self.header['written'] = written + 1
+
+    def close(self):
+        del self.header, self.slots
+        self.shm.close()
+        self.shm.unlink()
+
+
+# reader of the ring in a client process, every reader keeps its own position
+class TraceRingReader:
+
+    def __init__(self, name=tags.trace_ring):
+        self.shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(self.shm._name, 'shared_memory')        # the engine owns the block, it must not be removed when a client exits
+        self.header, self.slots = _ring_views(self.shm)
+        if self.header['magic'][0] != RING_MAGIC:
+            raise ValueError(f'{name} is not a trace ring')
+        self.position = int(self.header['written'][0])      # only records published after connecting
+        self.lost = 0
+
+    # records published since the last call as dicts, records overwritten before they were read are counted as lost
+    def read(self, kinds=None):
+        written = int(self.header['written'][0])
+        if written - self.position > len(self.slots):
+            self.lost += written - self.position - len(self.slots)
+            self.position = written - len(self.slots)
+
+        records = []
+        for number in range(self.position, written):
+            slot = self.slots[number % len(self.slots):][:1]        # view into the shared memory, not a copy
+            if slot['sequence'][0] != number + 1:
+                self.lost += 1
+                continue
+            record = {
+                'kind': int(slot['kind'][0]),
+                'timestamp': float(slot['timestamp'][0]),
+                'station': slot['station'][0].decode(),
+                'label': slot['label'][0].decode(),
+                'start': float(slot['start'][0]),
+                'stop': float(slot['stop'][0]),
+                'levels': slot['levels'][0, :slot['points'][0]].copy()
+            }
+            if slot['sequence'][0] != number + 1:      # overwritten while copying
+                self.lost += 1
+                continue
+            if kinds is None or record['kind'] in kinds:
+                records.append(record)
+        self.position = written
+        return records
+
+    def close(self):
+        del self.header, self.slots
+        self.shm.close()
+
+
+### ENGINE
+# events of a job on a station: telemetry goes to the ring, progress is kept for the status, only results and warnings are queued
+class ServiceChannel(events.EventChannel):
+
+    def __init__(self, engine, station):
+        super().__init__()
+        self.engine = engine
+        self.station = station
+
+    def post(self, event):
+        if isinstance(event, events.TelemetryEvent):
+            self.engine.ring.publish(TELEMETRY, self.station, 'telemetry', 0, 0, [event.chamber_temp, event.sps_voltage])
+        elif isinstance(event, events.ProgressEvent):
+            self.engine.progress[self.station] = event.message
+        else:
+            if isinstance(event, events.WarningEvent):
+                tags.log('Service', f'{self.station}: {event.title}: {event.message}', tags.WARNING)
+            super().post(event)
+
+
+# station pool of the engine process with job bookkeeping for the API. runner(station, job, channel, observer) executes a job
+class Engine:
+
+    def __init__(self, station_list, runner):
+        self.runner = runner
+        self.ring = TraceRing()
+        self.pool = stations.StationPool(station_list, self.run_job, self.on_result)
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()       # jobs are submitted and cancelled by the HTTP threads and started and finished by the station workers
+        self.ids = itertools.count(1)
+        self.progress = {}
+        self.stop_event = threading.Event()
+
+    def start(self):
+        self.pool.start()
+        threading.Thread(target=self.poll_live, name='Live view', daemon=True).start()
+
+    def shutdown(self):
+        self.stop_event.set()
+        self.pool.stop()
+        self.pool.join(10)
+        self.ring.close()
+
+    # stop the running jobs and drop the queued ones, new jobs are still accepted
+    def cancel(self):
+        with self.jobs_lock:
+            for job in self.jobs.values():
+                if job.state == 'pending':
+                    job.state = 'cancelled'
+            self.pool.cancel()
+
+    # raises ValueError if no station can run the job, the job is not registered then
+    def submit(self, job):
+        with self.jobs_lock:
+            job.id = next(self.ids)
+            job.state = 'pending'
+            job.station_name = None
+            job.result = None
+            self.pool.submit(job)
+            self.jobs[job.id] = job
+            return job.id
+
+    # snapshot of all jobs in the order of submission
+    def job_list(self):
+        with self.jobs_lock:
+            return list(self.jobs.values())
+
+    # job with the given id, None if there is none
+    def find_job(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    # executed in the worker thread of the station
+    def run_job(self, station, job):
+        with self.jobs_lock:
+            job.state = 'running'
+            job.station_name = station.name
+        observer = lambda freqs, levels, label, settings: self.ring.publish(TRACE, station.name, label, freqs[0], freqs[-1], levels)
+        return self.runner(station, job, ServiceChannel(self, station.name), observer)
+
+    def on_result(self, result):
+        with self.jobs_lock:
+            result.job.result = result
+            result.job.state = 'failed' if result.error else 'complete' if result.results else 'aborted'
+        self.progress.pop(result.station, None)
+
+    # traces of all analyzers with a running job, skipped while the measurement uses the session
+    def poll_live(self):
+        while not self.stop_event.wait(LIVE_INTERVAL):
+            for station in self.pool.stations:
+                if station.job is None or station.fsv is None or not station.fsv.connected:
+                    continue        # only on the session opened by the job, a short-lived one would race its connect()
+                try:
+                    trace = station.fsv.fetch_trace()
+                except Exception:
+                    trace = None        # lost connections are handled by the watchdog of the job
+                if trace is not None:
+                    freqs, levels = trace
+                    self.ring.publish(LIVE, station.name, 'live', freqs[0], freqs[-1], levels)
+
+    def job_status(self, job):
+        with self.jobs_lock:
+            status = {'id': job.id, 'name': job.name, 'state': job.state, 'station': job.station_name}
+            if job.result is not None:
+                status['results'] = job.result.results
+                status['error'] = str(job.result.error) if job.result.error else None
+        return status
+
+    def status(self):
+        return {
+            'ring': tags.trace_ring,
+            'stations': [{'name': station.name, 'capabilities': sorted(station.capabilities), 'job': station.job.name if station.job else None,
+                          'progress': self.progress.get(station.name)} for station in self.pool.stations],
+            'pending': sum(job.state == 'pending' for job in self.job_list())
+        }
+
+
+### HTTP API (localhost only)
+# GET /status, GET /jobs, GET /jobs/<id>, POST /jobs (JSON job entry), POST /stop
+class RequestHandler(BaseHTTPRequestHandler):
+
+    def reply(self, code, body):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        engine = self.server.engine
+        job = engine.find_job(int(self.path[6:])) if self.path.startswith('/jobs/') and self.path[6:].isdigit() else None
+        if self.path == '/status':
+            self.reply(200, engine.status())
+        elif self.path == '/jobs':
+            self.reply(200, [engine.job_status(job) for job in engine.job_list()])
+        elif job is not None:
+            self.reply(200, engine.job_status(job))
+        else:
+            self.reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        engine = self.server.engine
+        if self.path == '/jobs':
+            try:
+                spec = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                job = stations.Job(self.server.job_inputs(spec), spec.get('name'), spec.get('station'))
+                self.reply(201, {'id': engine.submit(job)})
+            except (ValueError, KeyError, TypeError) as e:
+                self.reply(400, {'error': str(e)})
+        elif self.path == '/stop':
+            engine.cancel()
+            self.reply(200, {'stopped': True})
+        else:
+            self.reply(404, {'error': 'not found'})
+
+    def log_message(self, format, *args):
+        tags.log('Service', format % args, tags.DEBUG)
+
+
+# run the engine until interrupted. job_inputs(spec) turns a job entry into measurement inputs, runner as in Engine
+def serve(station_list, runner, job_inputs, port=tags.service_port):
+    engine = Engine(station_list, runner)
+    server = ThreadingHTTPServer(('127.0.0.1', port), RequestHandler)
+    server.engine = engine
+    server.job_inputs = job_inputs
+    engine.start()
+    tags.log('Service', f'Measurement engine listening on http://127.0.0.1:{port}, traces in shared memory {tags.trace_ring}.')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        tags.log('Service', 'Shutting down, stopping all stations.')
+    finally:
+        server.server_close()
+        engine.shutdown()
+
+
+### CLIENT
+# minimal client of the job API
+class EngineClient:
+
+    def __init__(self, port=tags.service_port, timeout=5):
+        self.url = f'http://127.0.0.1:{port}'
+        self.timeout = timeout
+
+    def request(self, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method='POST' if data is not None or path == '/stop' else 'GET',
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def submit(self, spec):
+        return self.request('/jobs', spec)['id']
+
+    def job(self, job_id):
+        return self.request(f'/jobs/{job_id}')
+
+    def status(self):
+        return self.request('/status')
+
+    def stop(self):
+        return self.request('/stop', {})
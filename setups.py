@@ -0,0 +1,58 @@
+"""
+file: cache of complete FSV measurement setups stored on the instrument, recalled in one command when switching between test phases
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+SETUP_DIR = 'C:\\Documents and Settings\\instrument\\My Documents\\oob_obw_setups'     # on the FSV, one state file per phase
+SETUP_SUFFIX = '.dfl'
+
+
+# state file of one phase on the instrument with the settings it contains
+class Setup:
+
+    def __init__(self, filename, key, shadow, sweep_time):
+        self.filename = filename
+        self.key = key
+        self.shadow = dict(shadow)      # setting cache of the driver at the time of storing, valid again after the recall
+        self.sweep_time = sweep_time
+
+
+# stored setups per phase (e.g. 'obw', 'oob'), valid as long as the EUT configuration and the parameters of the phase are unchanged
+class SetupCache:
+
+    def __init__(self, directory=SETUP_DIR):
+        self.directory = directory
+        self.setups = {}
+        self.eut = None
+        self.directory_created = False      # created on the instrument with the first stored setup of the session
+
+    # identification of the setup of a phase from everything that went into it, e.g. the sweep parameters and the e.r.p. offset
+    @staticmethod
+    def key(phase, parameters, **state):
+        return (phase,) + tuple(sorted((name, repr(value)) for name, value in {**parameters, **state}.items()))
+
+    # a different EUT configuration invalidates all stored setups
+    def select_eut(self, eut):
+        if eut != self.eut:
+            self.setups.clear()
+            self.eut = eut
+
+    def filename(self, phase):
+        return f'{self.directory}\\{phase}{SETUP_SUFFIX}'
+
+    # the stored setup of a phase if it matches the key, None if there is none or it is outdated
+    def lookup(self, phase, key):
+        setup = self.setups.get(phase)
+        return setup if setup is not None and setup.key == key else None
+
+    def store(self, phase, key, shadow, sweep_time):
+        self.setups[phase] = Setup(self.filename(phase), key, shadow, sweep_time)
+        return self.setups[phase]
+
+    # forget the setups of the given phases or of all phases, e.g. if a state file could not be loaded
+    def invalidate(self, *phases):
+        if not phases:
+            self.setups.clear()
+        for phase in phases:
+            self.setups.pop(phase, None)
@@ -0,0 +1,27 @@
+"""
+file: concurrent shutdown of all instruments into a verified safe state at the end of or on interruption of a measurement
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import checks
+import tags
+
+# shut down all instruments in parallel, sequences within one device (e.g. SPS amplitude before output) stay ordered
+def safe_state(fsv, sps, chamber):
+    steps = {
+        'SPS': sps.safe_off,
+        'FSV': fsv.safe_reset
+    }
+    if chamber is not None:
+        steps['WKL'] = chamber.safe_stop
+
+    with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+        futures = [executor.submit(checks.run_check, device, step) for device, step in steps.items()]
+        report = checks.CheckReport([future.result() for future in futures])
+
+    for check in report.checks:
+        tags.log('Shutdown', str(check), tags.INFO if check.ok else tags.ERROR, instrument=check.device, duration=round(check.duration, 3))
+
+    return report
@@ -0,0 +1,160 @@
+"""
+file: live spectrum view with background trace polling, display decimation and limit mask overlay
+author: rueck.joshua@gmail.com
+last updated: 18/10/2026
+"""
+
+import math
+import time
+import threading
+import numpy as np
+import tags
+from trace_archive import decimate_minmax
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QThread, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+
+MIN_INTERVAL = 0.1          # in seconds, fastest polling (10 frames per second)
+MAX_INTERVAL = 5            # in seconds, slowest polling while the measurement keeps the analyzer busy
+DUTY_CYCLE = 0.1            # maximum share of time the poller may occupy the analyzer session
+DISPLAY_RANGE = 100         # in dB, vertical range of the plot below the reference line
+
+
+# thread fetching traces from the analyzer, backs off whenever the measurement is using the session
+class TracePoller(QThread):
+
+    trace_ready = pyqtSignal(object, object)
+
+    def __init__(self, fsv, width=600):
+        super().__init__()
+        self.fsv = fsv
+        self.width = width              # pixel width of the view, updated by the view on resize
+        self.interval = MIN_INTERVAL
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            if not self.fsv.connected:
+                continue            # no session open by the measurement, a short-lived one would race its connect()
+            start = time.monotonic()
+            try:
+                trace = self.fsv.fetch_trace()
+            except Exception as e:
+                tags.log('Spectrum View', f'Trace fetch failed: {e}')      # lost connections are handled by the watchdog
+                trace = None
+            duration = time.monotonic() - start
+
+            if trace is None:
+                self.interval = min(2*self.interval, MAX_INTERVAL)        # analyzer busy, don't compete for the session
+                continue
+
+            # keep the share of session time taken by polling below the duty cycle
+            self.interval = min(max(duration / DUTY_CYCLE, MIN_INTERVAL), MAX_INTERVAL)
+            freqs, levels = decimate_minmax(*trace, self.width)
+            self.trace_ready.emit(freqs, levels)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# thread reading the traces published by the measurement engine service from its shared-memory ring, same interface as TracePoller
+class RingPoller(QThread):
+
+    trace_ready = pyqtSignal(object, object)
+
+    def __init__(self, station=None, width=600):
+        super().__init__()
+        import service      # only needed by clients of the engine service
+        self.reader = service.TraceRingReader()
+        self.kinds = (service.TRACE, service.LIVE)
+        self.station = station          # None for the traces of all stations
+        self.width = width
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stop_event.wait(MIN_INTERVAL):
+                records = [record for record in self.reader.read(self.kinds) if self.station in (None, record['station'])]
+                if records:
+                    record = records[-1]        # only the latest trace is displayed
+                    freqs = np.linspace(record['start'], record['stop'], len(record['levels']))
+                    self.trace_ready.emit(*decimate_minmax(freqs, record['levels'], self.width))
+        finally:
+            self.reader.close()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# widget plotting the latest decimated trace with the limit masks of the standard
+class SpectrumView(QWidget):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(180)
+        self.freqs = None
+        self.levels = None
+        self.masks = []
+        self.poller = None
+
+    # connect a poller to the view, the view keeps the poller informed about its pixel width
+    def attach(self, poller):
+        self.poller = poller
+        poller.width = self.width()
+        poller.trace_ready.connect(self.set_trace)
+
+    def set_trace(self, freqs, levels):
+        self.freqs = freqs
+        self.levels = levels
+        self.update()
+
+    # limit lines as lists of (frequency, dBm) points as returned by EN_300_220_1
+    def set_masks(self, masks):
+        self.masks = [mask for mask in masks if mask]
+        self.update()
+
+    def clear(self):
+        self.freqs = None
+        self.levels = None
+        self.masks = []
+        self.update()
+
+    def resizeEvent(self, event):
+        if self.poller is not None:
+            self.poller.width = self.width()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self.freqs is None or len(self.freqs) < 2:
+            painter.setPen(Qt.gray)
+            painter.drawText(self.rect(), Qt.AlignCenter, 'No trace available')
+            return
+
+        f_start, f_stop = float(self.freqs[0]), float(self.freqs[-1])
+        top = 10 * math.ceil(max(float(np.nanmax(self.levels)), 0) / 10)
+        bottom = top - DISPLAY_RANGE
+        width, height = self.width(), self.height()
+
+        def x(freq):
+            return (freq - f_start) / (f_stop - f_start) * width
+
+        def y(level):
+            return (top - level) / DISPLAY_RANGE * height
+
+        # grid with 10 dB per division
+        painter.setPen(QPen(QColor(60, 60, 60)))
+        for level in range(int(bottom), int(top) + 1, 10):
+            painter.drawLine(0, int(y(level)), width, int(y(level)))
+        painter.setPen(Qt.gray)
+        painter.drawText(4, 12, f'{top} dBm')
+
+        # trace
+        painter.setPen(QPen(QColor(255, 220, 0)))
+        painter.drawPolyline(QPolygonF([QPointF(x(f), y(l)) for f, l in zip(self.freqs, self.levels)]))
+
+        # limit masks, clipped to the displayed frequency range by the widget
+        painter.setPen(QPen(Qt.red, 1.5))
+        for mask in self.masks:
+            painter.drawPolyline(QPolygonF([QPointF(x(f), y(l)) for f, l in mask]))
@@ -1,30 +1,44 @@
 """
 file: derived instrument class for Spitzenberger Spies "power supply system"
 author: rueck.joshua@gmail.com
-last updated: 02/08/2024
+last updated: 19/10/2026
 """
 
 import instrument
 import tags
+import time
 from time import sleep
 
+SETTLE_TOLERANCE_ABS = 0.2      # in V, minimum width of tolerance band around the target voltage
+SETTLE_TOLERANCE_REL = 0.01     # relative to target voltage
+SETTLE_SAMPLES = 3              # consecutive readings within tolerance required
+SETTLE_INTERVAL = 0.25          # in seconds, between readings
+SETTLE_TIMEOUT = 20             # in seconds
+RAMP_TIME = 7                   # in seconds, oscillator ramp to the new amplitude before the output is switched on
+
 class SPS(instrument.BaseInstrument):
 
-    def __init__(self, visa_address):
+    reset_commands = ('DCL', '*RST')
+
+    def __init__(self, visa_address, ars_address=tags.ars_addr):
         super().__init__(visa_address)
-        self.stop_flag = False
+        self.ars_address = ars_address      # ARS (AC source and impedance network) driven over its own GPIB address
+        self.applied = None     # (voltage, AC frequency or None for DC) currently supplied to the EUT, replayed after a lost connection
+        self.diagnosis = ''     # description of the last failed voltage settling
+        self.voltage_listener = None    # called with (timestamp, voltage) for every voltage reading, e.g. by the telemetry sampler
+        self.restore_pending = False    # output found in a different state after a reconnect, re-applied by the measurement thread
 
     # initialize system for direct voltage supply
     def initialize(self):
         if self.connect('SPS'):
-            self.instrument.write('DCL')   # reset SyCore to default settings
+            self.write('DCL')   # reset SyCore to default settings
             sleep(2)
-            id = self.instrument.query('*IDN?')
+            id = self.query('*IDN?')
             tags.log('Instrument', f"Succesfully connected to instrument {id.strip()}")
             self.disconnect()
 
         try:
-            ars = self.rm.open_resource(tags.ars_addr)
+            ars = self.rm.open_resource(self.ars_address)
             sleep(1)
             ars.write('SET_IMPEDANCE=OFF')
             sleep(1)
@@ -33,121 +47,215 @@ class SPS(instrument.BaseInstrument):
             ars.close()
             tags.log('SPS', 'Succesfully initialized ARS to direct mode.')
         except:
-            tags.log('SPS', 'Initialization: Error initializing ARS to direct mode.')
+            tags.log('SPS', 'Initialization: Error initializing ARS to direct mode.', tags.ERROR)
 
-    # set stop flag for interruption
-    def stop_operation(self):
-        self.stop_flag = True
+    # check that the ARS answers on the bus with a device clear in a separate short-lived session, raises on failure
+    def probe_ars(self, timeout=1500):
+        ars = self.rm.open_resource(self.ars_address, open_timeout=timeout)
+        try:
+            ars.timeout = timeout
+            ars.clear()
+        finally:
+            ars.close()
+
+    # check the EUT supply after the connection was lost (watchdog thread). the supply is not reprogrammed here, a different output state is only
+    # flagged and re-applied by the measurement thread with restore_output()
+    def restore_state(self):
+        self.restore_pending = False
+        if self.applied is None:
+            return
+        voltage, freq = self.applied
+        measured, amp_on = self.run_with(lambda session: (float(session.query('MEAS:VOLT?')), session.query('AMP:OUTPUT?').strip()))
+        if amp_on == '1' and abs(measured - voltage) < 0.05*voltage + 0.5:
+            return
+        self.restore_pending = True
+        tags.log('SPS', f'Output not in expected state after reconnect ({amp_on}, {measured:.2f} V), {voltage} V will be re-applied.', tags.WARNING)
+
+    # re-apply the EUT supply flagged by restore_state, called by the measurement thread before it continues. returns False if it failed
+    def restore_output(self):
+        if not self.restore_pending:
+            return True
+        self.restore_pending = False
+        voltage, freq = self.applied
+        return self.apply_voltage(voltage, freq)
 
-    # check if stop flag has been set
-    def check_stop(self):
-        if self.stop_flag:
-            raise InterruptedError('Measurement was stopped.')
+    # safety commands are always sent, a stale cache (e.g. output switched on at the front panel) must never suppress them
+    def write_off(self, command):
+        self.write(command)
+        self.shadow[command.split(' ')[0]] = command
 
     # reset
     def reset(self):
         if self.connect('SPS'):
-            self.instrument.write('DCL')
+            self.applied = None
+            self.write('DCL')
             sleep(2)
             self.disconnect()
 
     # turn amp off
     def set_amp_off(self):
         if self.connect():
-            self.instrument.write(f'OSC:AMP 1,0V')              # reset oscillator amplitude to 0V
-            sleep(3)
-            self.instrument.write('AMP:OUTPUT 0')               # turn amplifier output off
+            self.write_off('OSC:AMP 1,0V')                  # reset oscillator amplitude to 0V
+            self.settle_voltage_connected(0, tolerance=1, interruptible=False)
+            self.write_off('AMP:OUTPUT 0')                  # turn amplifier output off
+            self.applied = None
             sleep(2)
 
             self.disconnect()
             tags.log('SPS', 'Amplifier turned off.')
 
-    # set voltage DC
-    def set_voltage_dc(self, voltage):
+    # bring supply to safe state in one session: amplitude to 0 before output off, then reset. returns verified output voltage, raises if not safe
+    def safe_off(self):
+        if not self.connect('SPS'):
+            raise ConnectionError('SPS not reachable')
         try:
-            if self.connect():
-
-                self.instrument.write('DCL')                        # reset instrument to default state
-                sleep(2)
-
-                range = self.determine_range(voltage)
-                
-                self.instrument.write(f'AMP:RANGE {range}')         # set appropriate amplifier range
-                self.check_stop()
-                sleep(3)
-                self.instrument.write('AMP:MODE:DC')                # set amplifier to DC mode
-                sleep(0.5)
-                self.instrument.write('OSC:PAGE:FUNC 1,"DC"')       # set oscillator to DC mode (phase 1)
-                sleep(1)
-                self.instrument.write(f'OSC:AMP 1,{voltage}V')      # set oscillator amplitude to voltage (phase 1)
-                self.check_stop()
-                sleep(7)
-                self.check_stop()
-                self.instrument.write('AMP:OUTPUT 1')               # turn on amplifier output
-                sleep(2)
-                
-                self.disconnect()
-                tags.log('SPS', f'DC voltage set to {voltage}V')
-
-                return True
+            self.write_off('OSC:AMP 1,0V')                  # amplitude must be 0 before the output is switched off
+            self.settle_voltage_connected(0, tolerance=1, interruptible=False)
+            self.write_off('AMP:OUTPUT 0')
+            sleep(2)
+            self.write('DCL')
+            self.applied = None
+            sleep(2)
 
-        except InterruptedError:
+            amp_on = self.query('AMP:OUTPUT?').strip()
+            voltage = float(self.query('MEAS:VOLT?'))
+        finally:
             self.disconnect()
-            tags.log('SPS', 'Measurement interrupted.')
-            return False
-    
+
+        if amp_on != '0' or abs(voltage) > 1:
+            raise RuntimeError(f'Output not safe after shutdown: output state {amp_on}, {voltage:.2f} V measured')
+        tags.log('SPS', f'Amplifier turned off and reset, {voltage:.2f} V measured at output.')
+        return f'output off, {voltage:.2f} V measured'
+
+    # set voltage DC
+    def set_voltage_dc(self, voltage):
+        return self.apply_voltage(voltage)
+
     # change voltage DC without turning amp off
     def change_voltage_dc(self, voltage):
-        if self.connect():
-            self.instrument.write(f'OSC:AMP 1,{voltage}V')
-            sleep(1)
-            self.disconnect()
-            tags.log('SPS', f'DC voltage adjusted to {voltage} V')
-            return True
-        return False
+        return self.apply_voltage(voltage)
 
     # set voltage AC
     def set_voltage_ac(self, voltage, freq):
-        try:
-            if self.connect():
-
-                self.instrument.write('DCL')                        # reset instrument to default state
-                sleep(2)
-
-                range = self.determine_range(voltage)
-
-                self.instrument.write(f'AMP:RANGE {range}')         # set appropriate amplifier range
-                self.check_stop()
-                sleep(3)    
-                self.instrument.write('AMP:MODE:AC')                # set amplifier to DC mode
-                sleep(0.5)
-                self.instrument.write(f'OSC:FREQ {freq}')           # set oscillator frequency
-                sleep(0.5)
-                self.instrument.write(f'OSC:AMP 1,{voltage}V')      # set oscillator amplitude to voltage (phase 1)
-                self.check_stop()
-                sleep(7)
-                self.check_stop()
-                self.instrument.write('AMP:OUTPUT 1')               # turn on amplifier output
-                sleep(2)
-
-                self.disconnect()
-                tags.log('SPS', f'AC voltage set to {voltage}V at {freq}Hz')
+        return self.apply_voltage(voltage, freq)
 
-                return True
+    # change voltage AC without turning amp off, keeps the AC frequency currently applied (survives a cleared setting cache)
+    def change_voltage_ac(self, voltage):
+        freq = self.applied[1] if self.applied is not None else None
+        if freq is None:
+            tags.log('SPS', 'AC frequency unknown, set the AC voltage with frequency first.')
+            return False
+        return self.apply_voltage(voltage, freq)
 
+    # apply voltage to the EUT with only the commands required from the current state. freq is None for DC
+    def apply_voltage(self, voltage, freq=None):
+        if not self.connect():
+            return False
+        try:
+            settled = self.program_voltage_connected(voltage, freq)
+            if not settled:
+                self.output_off_connected()         # never leave a live output at an unverified voltage
         except InterruptedError:
-            self.disconnect()
+            self.output_off_connected()             # stopped while ramping, the amplitude at the output is unknown
             tags.log('SPS', 'Measurement interrupted.')
             return False
-
-    # change voltage AC without turning amp off  
-    def change_voltage_ac(self, voltage):
-        if self.connect():
-            self.instrument.write(f'OSC:AMP 1,{voltage}V')
-            sleep(1)
+        finally:
             self.disconnect()
-            tags.log('SPS', f'AC voltage adjusted to {voltage} V')
-            return True
+        if not settled:
+            return False
+
+        self.applied = (voltage, freq)
+        if freq is None:
+            tags.log('SPS', f'DC voltage set to {voltage}V')
+        else:
+            tags.log('SPS', f'AC voltage set to {voltage}V at {freq}Hz')
+        return True
+
+    # state machine on the shadow cache: full reset only if range or mode change, otherwise live change of frequency and amplitude
+    def program_voltage_connected(self, voltage, freq=None):
+        range = self.determine_range(voltage)
+        mode = 'AMP:MODE:DC' if freq is None else 'AMP:MODE:AC'
+
+        # range and mode can't be changed on a live output and a mode change needs the default oscillator function restored by DCL
+        if self.shadow.get('AMP:RANGE') != f'AMP:RANGE {range}' or self.shadow.get('AMP:MODE') != mode:
+            tags.log('SPS', f'Range {range} / {mode[-2:]} mode not active, reprogramming supply.')
+            if self.shadow.get('AMP:OUTPUT') == 'AMP:OUTPUT 1':
+                self.write_off('OSC:AMP 1,0V')                   # amplitude to 0 before the reset switches the output off
+                if not self.settle_voltage_connected(0, tolerance=1):
+                    return False                                # no reset of a live output that didn't reach 0 V
+
+            self.write('DCL')                        # reset instrument to default state
+            self.wait(2)
+
+            self.write_setting(f'AMP:RANGE {range}')         # set appropriate amplifier range
+            self.check_stop()
+            self.wait(3)
+            self.write_setting(mode, 'AMP:MODE')             # set amplifier to DC/AC mode
+            self.wait(0.5)
+            if freq is None:
+                self.write_setting('OSC:PAGE:FUNC 1,"DC"')       # set oscillator to DC mode (phase 1)
+                self.wait(1)
+
+        if freq is not None and self.write_setting(f'OSC:FREQ {freq}'):     # set oscillator frequency
+            self.wait(0.5)
+
+        self.write_setting(f'OSC:AMP 1,{voltage}V')      # set oscillator amplitude to voltage (phase 1)
+        if self.shadow.get('AMP:OUTPUT') != 'AMP:OUTPUT 1':
+            self.wait(RAMP_TIME)                          # ramp with the output off, the EUT only sees the final amplitude
+            self.write_setting('AMP:OUTPUT 1')            # turn on amplifier output
+        return self.settle_voltage_connected(voltage)     # wait until output verified instead of fixed delays
+
+    # ramp the output to 0 V and switch it off on the open session, e.g. after the voltage didn't settle
+    def output_off_connected(self):
+        self.write_off('OSC:AMP 1,0V')
+        self.settle_voltage_connected(0, tolerance=1, interruptible=False)
+        self.write_off('AMP:OUTPUT 0')
+        self.applied = None
+        tags.log('SPS', 'Amplifier output ramped to 0 V and turned off.', tags.WARNING)
+
+    # measure voltage at the amplifier output on the open session
+    def measure_voltage_connected(self):
+        voltage = float(self.query('MEAS:VOLT?'))
+        self.record_voltage(voltage)
+        return voltage
+
+    # measure voltage without disturbing a running operation, returns None if the supply is busy
+    def sample_voltage(self):
+        response = self.sample('MEAS:VOLT?')
+        if response is None:
+            return None
+        voltage = float(response)
+        self.record_voltage(voltage)
+        return voltage
+
+    # pass a voltage reading on to the listener
+    def record_voltage(self, voltage):
+        listener = self.voltage_listener
+        if listener is not None:
+            listener(time.time(), voltage)
+
+    # poll output voltage until SETTLE_SAMPLES consecutive readings are within tolerance of the target. returns False after timeout
+    def settle_voltage_connected(self, target, tolerance=None, timeout=SETTLE_TIMEOUT, interruptible=True):
+        if tolerance is None:
+            tolerance = max(SETTLE_TOLERANCE_ABS, SETTLE_TOLERANCE_REL*target)
+        start = time.monotonic()
+        readings = []
+        in_band = 0
+
+        while time.monotonic() - start < timeout:
+            voltage = self.measure_voltage_connected()
+            readings.append(voltage)
+            in_band = in_band + 1 if abs(abs(voltage) - target) <= tolerance else 0
+            if in_band >= SETTLE_SAMPLES:
+                tags.log('SPS', f'Output settled at {voltage:.2f} V (target {target} V) after {time.monotonic() - start:.1f} s.')
+                return True
+            if interruptible:
+                self.wait(SETTLE_INTERVAL)
+            else:
+                sleep(SETTLE_INTERVAL)
+
+        self.diagnosis = f'Output did not settle at {target} V ± {tolerance:.2f} V within {timeout} s, last readings: {", ".join(f"{v:.2f}" for v in readings[-5:])} V'
+        tags.log('SPS', self.diagnosis, tags.ERROR)
         return False
 
     # helper function for range selection
@@ -163,9 +271,9 @@ class SPS(instrument.BaseInstrument):
         
     def query_status(self):
         if self.connect():
-            voltage = self.instrument.query('MEAS:VOLT?')
+            voltage = self.query('MEAS:VOLT?')
             sleep(0.2)
-            amp_on = self.instrument.query('AMP:OUTPUT?')
+            amp_on = self.query('AMP:OUTPUT?')
             sleep(0.2)
             self.disconnect()
             return voltage, amp_on
@@ -0,0 +1,219 @@
+"""
+file: pool of test stations (FSV, SPS/ARS and optional climate chamber each) working off one shared job queue
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import csv
+import itertools
+import os
+import threading
+import time
+import cancellation
+import fsv
+import sps
+import tags
+import wkl
+
+STATIONS_FILE = 'stations.csv'      # name, fsv_addr, sps_addr, ars_addr, wkl_ip, capabilities (separated by ';', e.g. 'ac;dc')
+AMBIENT_TEMP = 23                   # in °C, chamber temperature wanted for jobs under normal conditions only
+IDLE_INTERVAL = 5                   # in seconds, idle stations re-check the queue at least this often (chamber temperatures change)
+
+
+# a measurement to be executed on any capable station, inputs as collected by the GUI
+class Job:
+
+    def __init__(self, inputs, name=None, station=None):
+        self.inputs = inputs
+        self.name = name or inputs['project']
+        self.station = station          # name of a station the job is pinned to, e.g. because the EUT is set up there
+        self.sequence = None            # order of submission, assigned by the pool
+
+    # capabilities a station needs for this job
+    def requirements(self):
+        required = {'ac' if self.inputs['ac'] else 'dc'}
+        if self.inputs['measure_ex']:
+            required.add('chamber')
+        return required
+
+    # chamber temperature at the start of the job, extreme conditions start at the maximum temperature
+    def start_temperature(self):
+        return float(self.inputs['temp_max']) if self.inputs['measure_ex'] else AMBIENT_TEMP
+
+
+# outcome of a job as collected centrally by the pool
+class JobResult:
+
+    def __init__(self, job, station, results=None, error=None, started=None, finished=None):
+        self.job = job
+        self.station = station
+        self.results = results
+        self.error = error
+        self.started = started
+        self.finished = finished
+
+    def __str__(self):
+        outcome = f'failed: {self.error}' if self.error else 'complete' if self.results else 'no results'
+        return f'{self.job.name} on {self.station} ({self.finished - self.started:.0f} s): {outcome}'
+
+
+# one set of instruments with its own drivers, connected by the worker of the station
+class Station:
+
+    def __init__(self, name, fsv_addr, sps_addr, ars_addr=None, wkl_ip=None, capabilities=('dc',)):
+        self.name = name
+        self.fsv_addr = fsv_addr
+        self.sps_addr = sps_addr
+        self.ars_addr = ars_addr or tags.ars_addr
+        self.wkl_ip = wkl_ip
+        self.capabilities = set(capabilities) | ({'chamber'} if wkl_ip else set())
+        self.fsv = None
+        self.sps = None
+        self.chamber = None
+        self.cancel_token = cancellation.CancelToken()
+        self.job = None                 # job currently running on the station
+
+    # create and initialize the drivers, called in the worker thread of the station
+    def open(self):
+        self.fsv = fsv.FSV(self.fsv_addr)
+        self.sps = sps.SPS(self.sps_addr, self.ars_addr)
+        self.fsv.initialize('FSV')
+        self.sps.initialize()
+        if self.wkl_ip:
+            try:
+                self.chamber = wkl.WKL(self.wkl_ip)
+            except Exception as e:
+                self.capabilities.discard('chamber')
+                tags.log('Stations', f'Station {self.name}: climate chamber not available ({e}), only jobs under normal conditions.')
+
+    # new cancellation token for every job, shared with the instruments of the station
+    def new_token(self):
+        self.cancel_token = cancellation.CancelToken()
+        self.fsv.cancel_token = self.cancel_token
+        self.sps.cancel_token = self.cancel_token
+        return self.cancel_token
+
+    def can_run(self, job):
+        return (job.station is None or job.station == self.name) and job.requirements() <= self.capabilities
+
+    # current chamber temperature, None without a chamber or if it doesn't answer
+    def chamber_temp(self):
+        if self.chamber is None:
+            return None
+        try:
+            return float(self.chamber.current_temp)
+        except Exception:
+            return None
+
+
+# station workers taking jobs from the shared queue. runner(station, job) executes a job on the drivers of the station and returns its results
+class StationPool:
+
+    def __init__(self, stations, runner, on_result=None):
+        self.stations = stations
+        self.runner = runner
+        self.on_result = on_result      # called with every JobResult in the worker thread of the station
+        self.pending = []
+        self.results = []
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.closed = False
+        self.threads = []
+
+    def start(self):
+        for station in self.stations:
+            thread = threading.Thread(target=self._work, args=(station,), name=f'Station {station.name}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    # add a job to the queue, raises ValueError if no station of the pool can execute it
+    def submit(self, job):
+        if not any(station.can_run(job) for station in self.stations):
+            raise ValueError(f'No station can run job {job.name} (requires {", ".join(sorted(job.requirements()))})')
+        with self.condition:
+            job.sequence = next(self.sequence)
+            self.pending.append(job)
+            self.condition.notify_all()
+
+    # no further jobs, the workers finish once the queue is empty
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    # stop all running jobs and drop the queued ones, the pool stays open for new jobs
+    def cancel(self):
+        with self.condition:
+            self.pending.clear()
+        for station in self.stations:
+            station.cancel_token.cancel()
+
+    # stop all running jobs, drop the queued ones and let the workers finish
+    def stop(self):
+        self.cancel()
+        self.close()
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    # next job for a station: the capable job whose start temperature is closest to the current chamber temperature, oldest first among equals. None once the pool is closed and empty
+    def _take(self, station):
+        while True:
+            temperature = station.chamber_temp()        # queried outside of the lock, the chamber may be slow to answer
+            with self.condition:
+                jobs = [job for job in self.pending if station.can_run(job)]
+                if jobs:
+                    distance = lambda job: abs(job.start_temperature() - temperature) if temperature is not None else 0
+                    job = min(jobs, key=lambda job: (distance(job), job.sequence))
+                    self.pending.remove(job)
+                    return job
+                if self.closed:
+                    return None
+                self.condition.wait(IDLE_INTERVAL)
+
+    def _work(self, station):
+        try:
+            station.open()
+        except Exception as e:
+            tags.log('Stations', f'Station {station.name} not available: {e}', tags.ERROR)
+            return
+        tags.log('Stations', f'Station {station.name} ready ({", ".join(sorted(station.capabilities))}).')
+
+        while True:
+            job = self._take(station)
+            if job is None:
+                break
+            station.job = job
+            station.new_token()
+            result = JobResult(job, station.name, started=time.time())
+            tags.log('Stations', f'Job {job.name} started on station {station.name}.')
+            try:
+                result.results = self.runner(station, job)
+            except Exception as e:
+                result.error = e
+            result.finished = time.time()
+            station.job = None
+            tags.log('Stations', str(result), tags.ERROR if result.error else tags.INFO, duration=round(result.finished - result.started, 3))
+
+            with self.condition:
+                self.results.append(result)
+            if self.on_result is not None:
+                self.on_result(result)
+
+
+# stations of the lab from the stations file, the single station of tags.py if there is none
+def load_stations(filename=STATIONS_FILE):
+    if not os.path.exists(filename):
+        return [Station('default', tags.fsv_addr, tags.sps_addr, tags.ars_addr, tags.wkl_ip, ('ac', 'dc'))]
+
+    stations = []
+    with open(filename, 'r') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)        # skip header row
+        for row in reader:
+            if not row:
+                continue
+            name, fsv_addr, sps_addr, ars_addr, wkl_ip, capabilities = (field.strip() for field in row)
+            stations.append(Station(name, fsv_addr, sps_addr, ars_addr or None, wkl_ip or None, [c for c in capabilities.split(';') if c]))
+    return stations
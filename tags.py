@@ -1,10 +1,11 @@
 """
 file: contains constants referenced in other parts of program and logic for logging
 author: rueck.joshua@gmail.com
-last updated: 25/06/2024
+last updated: 19/10/2026
 """
 
-import datetime
+import logbook
+from logbook import DEBUG, INFO, WARNING, ERROR
 
 sps_addr = 'GPIB0::6::INSTR' 
 ars_addr = 'GPIB0::3::INSTR'
@@ -13,5 +14,23 @@ wkl_ip = "172.16.102.1"
 
 inputfield_width = 80
 
-def log(tag, message):
-    print(f'{datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]} -- LOG -- [{tag}] {message}')
\ No newline at end of file
+results_db = 'results.sqlite'     # local database of all runs, conditions and results
+
+service_port = 8765                 # localhost port of the job API of the measurement engine service
+trace_ring = 'oob_obw_traces'       # shared memory with traces and telemetry published by the measurement engine service
+
+log_file = 'oob_obw_log.jsonl'      # structured log of all runs (JSON lines, rotated), also printed to the console. opened by main() only
+log_level = INFO                    # records below this level are dropped, DEBUG adds the duration of every measurement step
+
+# console and ring buffer only until main() sets the log file, so that worker processes (e.g. report rendering) never write or rotate it
+logbook.configure(level=log_level)
+
+# queue a log record, written by the background writer of logbook.py. fields (e.g. instrument, duration) are added to the JSON record
+def log(tag, message, level=INFO, **fields):
+    logbook.emit(level, tag, message, fields)
+
+# fields added to all records logged by the current thread within the block, e.g. phase=..., condition=...
+log_context = logbook.context
+
+# fields added to all further records logged by the current thread, None removes a field
+set_log_context = logbook.set_context
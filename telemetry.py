@@ -0,0 +1,157 @@
+"""
+file: background sampler recording chamber temperature and EUT supply voltage into fixed-size ring buffers
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import csv
+import datetime
+import threading
+import time
+import numpy as np
+import tags
+
+CHAMBER_INTERVAL = 5        # in seconds, between chamber temperature/running state samples
+SPS_INTERVAL = 1            # in seconds, between supply voltage samples on the open session of a running operation
+SPS_IDLE_INTERVAL = 60      # in seconds, between supply voltage samples while no session is open (e.g. chamber wait), each opens a short-lived session
+BUFFER_CAPACITY = 16384     # samples per channel, ~4.5 h of supply voltage at 1 Hz
+
+
+# fixed-size ring buffer of (timestamp, value) samples. writers are serialized, readers never lock and only see complete samples
+class RingBuffer:
+
+    def __init__(self, capacity=BUFFER_CAPACITY):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.count = 0                  # total number of samples written, published after the sample is stored
+        self.write_lock = threading.Lock()
+
+    def append(self, timestamp, value):
+        with self.write_lock:
+            i = self.count % self.capacity
+            self.times[i] = timestamp
+            self.values[i] = value
+            self.count += 1
+
+    # most recent sample as (timestamp, value), None if empty
+    def latest(self):
+        count = self.count
+        if count == 0:
+            return None
+        i = (count - 1) % self.capacity
+        return self.times[i], self.values[i]
+
+    # copy of all samples (optionally newer than since) in chronological order
+    def snapshot(self, since=None):
+        count = self.count
+        n = min(count, self.capacity)
+        index = np.arange(count - n, count) % self.capacity
+        times = self.times[index]
+        values = self.values[index]
+
+        # samples overwritten by the writer while copying are dropped
+        overwritten = self.count - count - (self.capacity - n)
+        if overwritten > 0:
+            times, values = times[overwritten:], values[overwritten:]
+
+        if since is not None:
+            mask = times >= since
+            times, values = times[mask], values[mask]
+        return times, values
+
+
+# thread polling chamber and power supply at individual rates
+class TelemetrySampler(threading.Thread):
+
+    def __init__(self, chamber, sps, chamber_interval=CHAMBER_INTERVAL, sps_interval=SPS_INTERVAL, sps_idle_interval=SPS_IDLE_INTERVAL, capacity=BUFFER_CAPACITY, listener=None):
+        super().__init__(daemon=True)
+        self.chamber = chamber
+        self.sps = sps
+        self.listener = listener        # called with the latest chamber temperature and supply voltage after each new sample
+        self.chamber_interval = chamber_interval
+        self.sps_interval = sps_interval
+        self.sps_idle_interval = sps_idle_interval
+        self.buffers = {
+            'chamber_temp': RingBuffer(capacity),
+            'chamber_running': RingBuffer(capacity),
+            'sps_voltage': RingBuffer(capacity)
+        }
+        self.stop_event = threading.Event()
+
+        # readings of the supply voltage taken by the SPS itself (e.g. while settling) are recorded as well
+        self.sps.voltage_listener = self.buffers['sps_voltage'].append
+
+    def run(self):
+        while not self.stop_event.wait(min(self.chamber_interval, self.sps_interval) / 2):
+            now = time.time()
+            sampled = False
+            if self.chamber is not None and self._due('chamber_temp', self.chamber_interval, now):
+                self._sample_chamber(now)
+                sampled = True
+            if self._due('sps_voltage', self.current_sps_interval(), now):
+                self._sample_sps()
+                sampled = True
+            if sampled and self.listener is not None:
+                self.listener(self.recent('chamber_temp', 2*self.chamber_interval), self.recent('sps_voltage', 2*self.current_sps_interval()))
+
+    def stop(self):
+        self.stop_event.set()
+        self.sps.voltage_listener = None
+
+    # supply samples are cheap on the open session of the measurement, without one every sample opens a GPIB session and competes with connect()
+    def current_sps_interval(self):
+        return self.sps_interval if self.sps.connected else self.sps_idle_interval
+
+    # check if the last sample of a channel is older than its interval
+    def _due(self, name, interval, now):
+        latest = self.buffers[name].latest()
+        return latest is None or now - latest[0] >= interval
+
+    def _sample_chamber(self, now):
+        try:
+            self.buffers['chamber_temp'].append(now, self.chamber.current_temp)
+            self.buffers['chamber_running'].append(now, float(self.chamber.is_running))
+        except Exception as e:
+            tags.log('Telemetry', f'Chamber sample failed: {e}', tags.WARNING, instrument='WKL')
+            self.buffers['chamber_temp'].append(now, np.nan)    # keep the sampling interval even if the chamber doesn't answer
+
+    def _sample_sps(self):
+        try:
+            self.sps.sample_voltage()       # recorded through the voltage listener, skipped if the supply is busy
+        except Exception as e:
+            tags.log('Telemetry', f'Supply voltage sample failed: {e}', tags.WARNING, instrument='SPS')
+            self.buffers['sps_voltage'].append(time.time(), np.nan)
+
+    # most recent value of a channel if it's not older than max_age seconds, otherwise None
+    def recent(self, name, max_age):
+        latest = self.buffers[name].latest()
+        if latest is None or time.time() - latest[0] > max_age or np.isnan(latest[1]):
+            return None
+        return latest[1]
+
+    # (min, max, mean, samples) of every channel since the given time, ignoring failed samples
+    def summary(self, since=None):
+        result = {}
+        for name, buffer in self.buffers.items():
+            _, values = buffer.snapshot(since)
+            values = values[~np.isnan(values)]
+            if len(values):
+                result[name] = (float(values.min()), float(values.max()), float(values.mean()), len(values))
+        return result
+
+    # write all samples since the given time to a CSV file as proof of the test conditions of a plateau
+    def export_csv(self, filepath, since=None):
+        rows = []
+        for name, buffer in self.buffers.items():
+            times, values = buffer.snapshot(since)
+            rows.extend(zip(times, [name]*len(times), values))
+        rows.sort(key=lambda row: row[0])
+
+        with open(filepath, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['time', 'channel', 'value'])
+            for timestamp, name, value in rows:
+                writer.writerow([datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3], name, f'{value:.3f}'])
+
+        tags.log('Telemetry', f'{len(rows)} samples exported to {filepath}')
@@ -0,0 +1,11 @@
+"""
+file: pytest setup, makes the modules of the repository importable from the tests
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
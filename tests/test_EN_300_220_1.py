@@ -0,0 +1,189 @@
+"""
+file: tests of the test parameters, spectral masks and mask evaluation of EN 300 220-1
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import numpy as np
+import pytest
+import EN_300_220_1
+
+OCWS = [25000, 125000, 600000]
+
+
+@pytest.fixture
+def standard():
+    return EN_300_220_1.EN_300_220_1()
+
+
+### BATCH VARIANTS
+# every row of the batch settings matches the settings calculated for the single OCW
+def test_parameters_batch_match_scalar(standard):
+    obw = standard.calc_obw_parameters_batch(OCWS)
+    oob = standard.calc_oob_parameters_batch(OCWS)
+    for i, ocw in enumerate(OCWS):
+        for key, value in standard.calc_obw_parameters(ocw).items():
+            assert obw[key][i] == value
+        for key, value in standard.calc_oob_parameters(ocw).items():
+            assert oob[key][i] == value
+    assert np.all(np.isnan(oob['vbw_ratio']))
+
+
+def test_limits_batch_match_scalar(standard):
+    channels = [868.1e6, 868.3e6, 869.5e6]
+    limits = standard.calc_limits_oc(channels, 125000)
+    assert limits.shape == (3, len(EN_300_220_1.OC_MASK_OFFSETS))
+    for i, channel in enumerate(channels):
+        assert [(int(freq), int(limit)) for freq, limit in limits[i]] == standard.calc_limit_oc(channel, 125000)
+
+    limits = standard.calc_limits_ofb([863e6, 868e6], [865e6, 868.6e6])
+    assert limits.shape == (2, len(EN_300_220_1.OFB_MASK_OFFSETS))
+    assert [(int(freq), int(limit)) for freq, limit in limits[1]] == standard.calc_limit_ofb(868e6, 868.6e6)
+
+
+def test_operating_channel_mask(standard):
+    assert standard.calc_limit_oc(868e6, 100000) == [
+        (867750000, -36), (867950000, 0), (867950000, 14), (868050000, 14), (868050000, 0), (868250000, -36)]
+
+
+def test_operational_band_mask(standard):
+    assert standard.calc_limit_ofb(868e6, 868.6e6) == [
+        (867600000, -36), (867800000, -36), (868000000, 0), (868000000, 14), (868600000, 14), (868600000, 0), (868800000, -36), (869000000, -36)]
+
+
+# equal inputs return the cached array, which callers can't change
+def test_batch_results_memoized_and_read_only(standard):
+    first = standard.calc_limits_oc([868e6], [125000])
+    second = standard.calc_limits_oc(868e6, 125000)
+    assert first is second
+    with pytest.raises(ValueError):
+        first['limit'][0, 0] = 0
+    assert standard.calc_obw_parameters_batch(OCWS) is standard.calc_obw_parameters_batch(np.array(OCWS))
+
+
+def test_ocw_per_channel(standard):
+    limits = standard.calc_limits_oc([868e6, 869e6], [100000, 200000])
+    assert limits['freq'][0, 0] == 868e6 - 2.5*100000
+    assert limits['freq'][1, 0] == 869e6 - 2.5*200000
+
+
+### MASK EVALUATION
+def test_mask_limit_interpolates_and_takes_lower_limit_at_steps(standard):
+    mask = standard.calc_limits_oc(868e6, 100000)[0]
+    limits = standard.mask_limit([867.75e6, 867.85e6, 867.95e6, 868e6, 868.05e6, 868.25e6], mask)
+    np.testing.assert_allclose(limits, [-36, -18, 0, 14, 0, -36])
+
+
+def test_mask_limit_outside_of_mask(standard):
+    mask = standard.calc_limits_oc(868e6, 100000)[0]
+    assert np.all(np.isnan(standard.mask_limit([867e6, 869e6], mask)))
+
+
+# one margin per trace, negative where the mask is violated, frequencies outside of the mask are ignored
+def test_mask_margin(standard):
+    mask = standard.calc_limits_oc(868e6, 100000)[0]
+    freqs = np.array([867e6, 867.85e6, 868e6, 868.2e6])
+    levels = np.array([
+        [50, -30, 4, -40],          # pass, closest to the limit in the channel
+        [50, -10, 4, -40],          # fails on the slope
+        [50, -30, 20, -40]          # fails in the channel
+    ])
+    np.testing.assert_allclose(standard.mask_margin(freqs, levels, mask), [10, -8, -6])
+    np.testing.assert_allclose(standard.mask_margin(freqs, levels[0], mask), [10])
+
+
+def test_mask_margin_without_overlap(standard):
+    mask = standard.calc_limits_oc(868e6, 100000)[0]
+    assert np.isnan(standard.mask_margin([900e6, 901e6], [0, 0], mask)[0])
+
+
+### OCCUPIED BANDWIDTH
+# flat spectrum: 99 % of the power lie within 99 % of its width
+def test_obw_of_flat_spectrum(standard):
+    freqs = np.linspace(867.9e6, 868.1e6, 20001)
+    levels = np.where(np.abs(freqs - 868e6) <= 5000, 0.0, -200.0)
+    assert standard.calc_obw(freqs, levels) == pytest.approx(0.99*10000, rel=2e-3)      # within one 10 Hz bin
+
+
+# the OBW doesn't depend on the absolute level or the position of the signal
+def test_obw_independent_of_level_and_offset(standard):
+    freqs = np.linspace(867.9e6, 868.1e6, 20001)
+    levels = -40*((freqs - 868e6)/20000)**2
+    shifted = -40*((freqs - 868.02e6)/20000)**2
+    obw = standard.calc_obw(freqs, levels)
+    assert standard.calc_obw(freqs, levels - 30) == pytest.approx(obw)
+    assert standard.calc_obw(freqs, shifted) == pytest.approx(obw, rel=1e-3)
+
+
+def test_obw_power_share(standard):
+    freqs = np.linspace(867.9e6, 868.1e6, 20001)
+    levels = np.where(np.abs(freqs - 868e6) <= 5000, 0.0, -200.0)
+    assert standard.calc_obw(freqs, levels, power=0.5) == pytest.approx(5000, rel=1e-3)
+
+
+# OBW and operating channel OOB share one capture only if the OOB RBW is valid for the OBW and no averaged trace is needed
+def test_single_capture_parameters(standard):
+    parameters = standard.calc_single_capture_parameters(50000)
+    assert parameters['rbw'] == 1000
+    assert parameters['span'] >= standard.calc_obw_parameters(50000)['span']
+    assert standard.calc_single_capture_parameters(50000, dm2=True) is None
+    assert standard.calc_single_capture_parameters(125000) is None        # 1 kHz below 1 % of the OCW
+
+
+### SWEEP OPTIMIZATION
+def test_predict_sweep_time(standard):
+    # analog limit: k * span / RBW², 2.5 * 1 MHz / (1 kHz)² = 2.5 s
+    assert standard.predict_sweep_time(1e6, 1000, 1001) == pytest.approx(2.5)
+    # settling time per point dominates for narrow spans
+    assert standard.predict_sweep_time(1e3, 1000, 1001) == pytest.approx(1.001)
+    assert standard.predict_sweep_time(1, 1e6, 1) == EN_300_220_1.MIN_SWEEP_TIME
+    times = standard.predict_sweep_time(1e6, [1000, 3000, 10000], 1001)
+    assert np.all(np.diff(times) < 0)
+
+
+# fastest RBW within the range, with enough points per RBW and never less than the FSV default
+def test_optimize_sweep(standard):
+    parameters = standard.optimize_sweep(375000, 'rms', 1250, 6250)
+    assert parameters['rbw'] in EN_300_220_1.RBW_STEPS
+    assert 1250 <= parameters['rbw'] <= 6250
+    assert parameters['points'] >= EN_300_220_1.BINS_PER_RBW*375000/parameters['rbw'] + 1
+    assert parameters['points'] >= EN_300_220_1.MIN_SWEEP_POINTS
+    assert parameters['sweep_time'] == parameters['predicted_time']
+
+    for rbw in EN_300_220_1.RBW_STEPS[(EN_300_220_1.RBW_STEPS >= 1250) & (EN_300_220_1.RBW_STEPS <= 6250)]:
+        points = max(np.ceil(EN_300_220_1.BINS_PER_RBW*375000/rbw) + 1, EN_300_220_1.MIN_SWEEP_POINTS)
+        assert standard.predict_sweep_time(375000, rbw, points) >= parameters['predicted_time']
+
+
+def test_optimize_sweep_fixed_rbw(standard):
+    parameters = standard.optimize_sweep(750000, 'rms', 1000)
+    assert parameters['rbw'] == 1000
+    assert parameters['points'] == 1501
+
+
+# only RMS needs the sweep time set, other detectors keep the automatic sweep time
+def test_optimize_sweep_other_detector(standard):
+    parameters = standard.optimize_sweep(750000, 'pos', 1000)
+    assert parameters['sweep_time'] is None
+    assert parameters['predicted_time'] > 0
+
+
+def test_optimize_sweep_without_valid_settings(standard):
+    assert standard.optimize_sweep(1e6, 'rms', 1100, 1900) is None             # no RBW step of the FSV in range
+    assert standard.optimize_sweep(1e9, 'rms', 1000) is None                   # too many points needed
+
+
+def test_sweeps_per_test(standard):
+    obw = standard.calc_obw_sweep(125000)
+    assert standard.check_obw_rbw(obw['rbw'], 125000)
+    assert obw['span'] == 3*125000
+    assert standard.calc_oob_sweep(125000)['rbw'] == 1000
+
+    sweeps = standard.calc_ofb_sweeps(standard.calc_limit_ofb(868e6, 868.6e6))
+    assert sweeps['center']['span'] == 1.4e6 and sweeps['center']['rbw'] == EN_300_220_1.OFB_CENTER_RBW
+    assert sweeps['left'] == sweeps['right']
+    assert sweeps['left']['rbw'] == EN_300_220_1.OFB_DOMAIN_RBW
+
+    fhss = standard.calc_fhss_sweep([868.1e6, 868.3e6, 868.5e6], 125000)
+    assert fhss['centre'] == pytest.approx(868.3e6)
+    assert fhss['span'] == pytest.approx(0.4e6 + 6*125000)
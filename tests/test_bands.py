@@ -0,0 +1,42 @@
+"""
+file: tests of the lookup of operational frequency bands
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import pytest
+import bands
+from conftest import ROOT
+
+
+# the band files are referenced relative to the repository
+@pytest.fixture(autouse=True)
+def in_repository(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+# the first band in file order wins, also over a narrower band listed later
+def test_first_band_in_file_order():
+    assert bands.band_ranges([26.995e6]) == [(26957000, 27283000)]
+    assert bands.band_ranges([868e6]) == [(865000000, 868000000)]
+
+
+def test_channel_outside_of_all_bands():
+    assert bands.band_ranges([868.65e6, 2e9]) == [None, None]
+
+
+def test_fhss_bands():
+    assert bands.band_ranges([868.3e6], fhss=True) == [(863000000, 870000000)]
+    assert bands.band_ranges([868.3e6]) == [(868000000, 868600000)]
+
+
+# many channels at once, same result as one at a time and in the order of the channels
+def test_many_channels():
+    channels = [869.5e6, 868.3e6, 868.65e6, 864e6, 27.05e6]
+    assert bands.band_ranges(channels) == [bands.band_ranges([freq])[0] for freq in channels]
+    assert bands.band_ranges(channels)[2] is None
+
+
+def test_table_loaded_once():
+    assert bands.table() is bands.table()
+    assert bands.table(fhss=True) is not bands.table()
@@ -0,0 +1,50 @@
+"""
+file: tests of the cancellation token shared by measurement thread and instruments
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import threading
+import time
+import pytest
+import cancellation
+
+
+def test_not_cancelled():
+    token = cancellation.CancelToken()
+    assert not token.cancelled
+    token.check()
+    assert token.wait(0) is False
+    token.sleep(0)
+
+
+def test_cancelled():
+    token = cancellation.CancelToken()
+    token.cancel()
+    assert token.cancelled
+    assert token.wait(10) is True
+    with pytest.raises(InterruptedError):
+        token.check()
+    with pytest.raises(InterruptedError):
+        token.sleep(10)
+
+
+# a long wait ends as soon as another thread cancels
+def test_cancel_wakes_up_sleeping_thread():
+    token = cancellation.CancelToken()
+    outcome = []
+
+    def sleep():
+        started = time.monotonic()
+        try:
+            token.sleep(30)
+        except InterruptedError:
+            outcome.append(time.monotonic() - started)
+
+    thread = threading.Thread(target=sleep)
+    thread.start()
+    time.sleep(0.05)
+    token.cancel()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(outcome) == 1 and outcome[0] < 5
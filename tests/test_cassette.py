@@ -0,0 +1,178 @@
+"""
+file: tests of recording instrument sessions to cassettes and answering the drivers from them
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import gzip
+import socket
+import numpy as np
+import pytest
+import pyvisa
+import cassette
+
+FSV = 'TCPIP0::1::INSTR'
+WKL = '10.0.0.1:2049'
+
+
+# session of a fake instrument answering every query with a counter
+class FakeResource:
+
+    def __init__(self):
+        self.timeout = 0
+        self.queries = 0
+        self.written = []
+
+    def write(self, command):
+        self.written.append(command)
+
+    def query(self, command):
+        if command == 'FAIL?':
+            raise pyvisa.errors.VisaIOError(pyvisa.constants.StatusCode.error_timeout)
+        self.queries += 1
+        return str(self.queries)
+
+    def query_binary_values(self, command, **kwargs):
+        return [1.5, -2.5, 3.0]
+
+    def close(self):
+        pass
+
+
+def make_cassette(filename, operations):
+    recorder = cassette.Recorder(str(filename), 'test')
+    for operation in operations:
+        recorder.record(*operation)
+    recorder.close()
+    return str(filename)
+
+
+def test_record_and_replay_session(tmp_path):
+    filename = str(tmp_path / 'session.cassette.gz')
+    recorder = cassette.Recorder(filename)
+    resource = cassette.RecordingResource(FakeResource(), recorder, FSV)
+    resource.timeout = 5000
+    resource.write('*RST')
+    assert resource.query('FREQ?') == '1'
+    assert resource.query_binary_values('TRAC? TRACE1') == [1.5, -2.5, 3.0]
+    with pytest.raises(pyvisa.errors.VisaIOError):
+        resource.query('FAIL?')
+    resource.close()
+    recorder.close()
+    assert resource._resource.timeout == 5000
+    assert recorder.count == 5
+
+    player = cassette.Player(filename)
+    replayed = cassette.ReplayResource(player, FSV)
+    assert replayed.write('*RST') is None
+    assert replayed.query('FREQ?') == '1'
+    np.testing.assert_array_equal(replayed.query_binary_values('TRAC? TRACE1', container=np.array), [1.5, -2.5, 3.0])
+    with pytest.raises(pyvisa.errors.VisaIOError) as error:
+        replayed.query('FAIL?')
+    assert error.value.error_code == pyvisa.constants.StatusCode.error_timeout
+    assert player.header['note'] == ''
+
+
+# queries with a command take the next recorded answer to the same command, so that heartbeats in between don't shift the answers
+def test_take_matches_command(tmp_path):
+    filename = make_cassette(tmp_path / 'a.cassette.gz', [
+        (FSV, 'query', 'SWE:COUN?', '1'),
+        (FSV, 'query', '*IDN?', 'FSV'),
+        (FSV, 'query', 'SWE:COUN?', '2'),
+        (FSV, 'query', '*IDN?', 'FSV'),
+        (FSV, 'query', 'SWE:COUN?', '3')
+    ])
+    player = cassette.Player(filename)
+    assert [player.take(FSV, 'query', 'SWE:COUN?') for _ in range(3)] == ['1', '2', '3']
+    assert player.remaining() == {FSV: 2}
+    assert player.take(FSV, 'query', '*IDN?') == 'FSV'
+    assert player.remaining() == {FSV: 1}
+
+
+# a polling loop that runs longer than recorded gets the last answer again
+def test_take_repeats_last_answer(tmp_path):
+    filename = make_cassette(tmp_path / 'a.cassette.gz', [(FSV, 'query', 'SWE:COUN?', '1'), (FSV, 'query', 'SWE:COUN?', '2')])
+    player = cassette.Player(filename)
+    assert [player.take(FSV, 'query', 'SWE:COUN?') for _ in range(4)] == ['1', '2', '2', '2']
+    assert player.repeated == 2
+    assert player.remaining() == {}
+
+
+# reads continue after the last consumed entry of the device, also if earlier reads were skipped
+def test_take_reads_follow_last_entry(tmp_path):
+    filename = make_cassette(tmp_path / 'a.cassette.gz', [
+        (WKL, 'send', b'temp 1', 4),
+        (WKL, 'recv', None, b'answer 1'),
+        (WKL, 'send', b'temp 2', 4),
+        (WKL, 'recv', None, b'answer 2'),
+        (WKL, 'send', b'temp 3', 4),
+        (WKL, 'recv', None, b'answer 3')
+    ])
+    player = cassette.Player(filename)
+    assert player.take(WKL, 'send', b'temp 1') == 4
+    assert player.take(WKL, 'recv') == b'answer 1'
+    assert player.take(WKL, 'send', b'temp 3') == 4
+    assert player.take(WKL, 'recv') == b'answer 3'
+    assert player.remaining() == {WKL: 2}
+
+
+# devices are answered independently of each other
+def test_take_per_device(tmp_path):
+    other = 'GPIB0::6::INSTR'
+    filename = make_cassette(tmp_path / 'a.cassette.gz', [(FSV, 'query', 'X?', 'fsv'), (other, 'query', 'X?', 'sps'), (other, 'read', None, 'read sps')])
+    player = cassette.Player(filename)
+    assert player.take(other, 'query', 'X?') == 'sps'
+    assert player.take(FSV, 'query', 'X?') == 'fsv'
+    assert player.take(other, 'read') == 'read sps'
+
+
+def test_take_not_recorded(tmp_path):
+    player = cassette.Player(make_cassette(tmp_path / 'a.cassette.gz', [(FSV, 'query', 'X?', '1')]))
+    with pytest.raises(cassette.CassetteError, match='not recorded'):
+        player.take(FSV, 'query', 'Y?')
+
+
+def test_socket_errors_replayed(tmp_path):
+    recorder = cassette.Recorder(str(tmp_path / 'a.cassette.gz'))
+    recorder.record(WKL, 'connect', error=ConnectionRefusedError('refused'))
+    recorder.record(WKL, 'recv', error=socket.timeout('timed out'))
+    recorder.close()
+
+    player = cassette.Player(recorder.filename)
+    replayed = cassette.ReplaySocket(player)
+    with pytest.raises(ConnectionError):
+        replayed.connect(('10.0.0.1', 2049))
+    with pytest.raises(socket.timeout):
+        replayed.recv(1024)
+
+
+def test_encoding_round_trip():
+    assert cassette._decode(cassette._encode(b'\x00\xff')) == b'\x00\xff'
+    levels = np.array([-80.5, -20.25], dtype=np.float32)
+    decoded = cassette._decode(cassette._encode(levels))
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, levels)
+    np.testing.assert_array_equal(cassette._decode(cassette._encode([1.0, 2.0])), [1.0, 2.0])
+    assert cassette._decode(cassette._encode('text')) == 'text'
+
+
+# a cassette cut off by a crash is replayed up to its last complete line
+def test_load_truncated_cassette(tmp_path):
+    filename = make_cassette(tmp_path / 'a.cassette.gz', [(FSV, 'query', f'Q{i}?', str(i)) for i in range(100)])
+    with gzip.open(filename, 'rt', encoding='utf-8') as file:
+        text = file.read()
+    with gzip.open(filename, 'wt', encoding='utf-8') as file:
+        file.write(text[:len(text)//2])
+
+    header, entries = cassette.load(filename)
+    assert header['version'] == cassette.CASSETTE_VERSION
+    assert 0 < len(entries) < 100
+    assert [entry['cmd'] for entry in entries] == [f'Q{i}?' for i in range(len(entries))]
+
+
+def test_load_other_file(tmp_path):
+    filename = str(tmp_path / 'other.gz')
+    with gzip.open(filename, 'wt', encoding='utf-8') as file:
+        file.write('{"version": 99}\n')
+    with pytest.raises(cassette.CassetteError):
+        cassette.load(filename)
@@ -0,0 +1,179 @@
+"""
+file: tests of the connection watchdog and of the heartbeat of the instruments
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import socket
+import threading
+import time
+import pytest
+import pyvisa
+import connection_watchdog
+import instrument
+
+
+# instrument with scripted heartbeat and reconnect outcomes
+class FakeDevice:
+
+    def __init__(self, heartbeat_errors=(), reconnect_errors=()):
+        self.last_activity = 0.0
+        self.heartbeat_errors = list(heartbeat_errors)
+        self.reconnect_errors = list(reconnect_errors)
+        self.heartbeats = 0
+        self.restored = 0
+
+    def heartbeat(self, timeout):
+        self.heartbeats += 1
+        if self.heartbeat_errors:
+            raise self.heartbeat_errors.pop(0)
+        return True
+
+    def reconnect(self):
+        if self.reconnect_errors:
+            raise self.reconnect_errors.pop(0)
+
+    def restore_state(self):
+        self.restored += 1
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(connection_watchdog, 'RECONNECT_DELAYS', [0, 0, 0])
+
+
+def test_busy_link_not_probed():
+    device = FakeDevice()
+    device.last_activity = time.monotonic()
+    watchdog = connection_watchdog.ConnectionWatchdog({'FSV': device, 'WKL': None})
+    watchdog._check(watchdog.links['FSV'])
+    assert device.heartbeats == 0
+    assert list(watchdog.links) == ['FSV']
+
+
+# a failed heartbeat marks the link as down, the next attempt reconnects and restores the state
+def test_lost_link_recovered():
+    device = FakeDevice(heartbeat_errors=[ConnectionError('reset by peer')], reconnect_errors=[socket.timeout('timed out')])
+    watchdog = connection_watchdog.ConnectionWatchdog({'FSV': device})
+    link = watchdog.links['FSV']
+
+    watchdog._check(link)
+    assert link.state == 'down' and not link.recovered.is_set()
+    assert link.diagnosis == 'ConnectionError: reset by peer'
+
+    watchdog._recover(link)
+    assert link.state == 'down' and link.attempt == 1
+    watchdog._recover(link)
+    assert link.state == 'up' and link.attempt == 0
+    assert device.restored == 1
+    assert watchdog.wait_recovered('FSV', timeout=0)
+
+
+# after the last reconnect attempt the link is given up, waiting measurements wake up and the failure is reported
+def test_link_given_up():
+    failures = []
+    device = FakeDevice(reconnect_errors=[pyvisa.errors.VisaIOError(pyvisa.constants.StatusCode.error_timeout)]*3)
+    watchdog = connection_watchdog.ConnectionWatchdog({'SPS': device}, on_failure=failures.append)
+    watchdog.report_failure('SPS', ConnectionError('lost'))
+    for _ in range(3):
+        watchdog._recover(watchdog.links['SPS'])
+
+    assert watchdog.links['SPS'].state == 'failed'
+    assert not watchdog.wait_recovered('SPS', timeout=0)
+    assert failures == [watchdog.diagnosis()]
+    assert '3 reconnect attempts failed' in failures[0]
+
+
+# other errors are logical errors of the measurement, not link losses
+def test_other_errors_are_not_link_losses():
+    watchdog = connection_watchdog.ConnectionWatchdog({'FSV': FakeDevice(heartbeat_errors=[ValueError('parse error')])})
+    with pytest.raises(ValueError):
+        watchdog._check(watchdog.links['FSV'])
+    assert watchdog.links['FSV'].state == 'up'
+
+
+# after a failed operation all links are probed at once, lost ones are recovered by the running watchdog
+def test_recover_all():
+    watchdog = connection_watchdog.ConnectionWatchdog({'FSV': FakeDevice()})
+    assert watchdog.recover_all(timeout=0) is False
+
+    lost = FakeDevice(heartbeat_errors=[ConnectionError('lost')])
+    watchdog = connection_watchdog.ConnectionWatchdog({'FSV': FakeDevice(), 'SPS': lost})
+    watchdog.start()
+    try:
+        assert watchdog.recover_all(timeout=5) is True
+        assert lost.restored == 1
+    finally:
+        watchdog.stop()
+
+
+### HEARTBEAT OF THE INSTRUMENTS
+class FakeResource:
+
+    def __init__(self, log):
+        self.log = log
+
+    def write(self, command):
+        self.log.append(command)
+
+    def query(self, command):
+        self.log.append(command)
+        return 'IDN'
+
+    def close(self):
+        self.log.append('close')
+
+
+class FakeResourceManager:
+
+    def __init__(self):
+        self.log = []
+        self.sessions = 0
+
+    def open_resource(self, address, **kwargs):
+        self.sessions += 1
+        return FakeResource(self.log)
+
+
+@pytest.fixture
+def device(monkeypatch):
+    manager = FakeResourceManager()
+    monkeypatch.setattr(instrument, 'resource_manager_factory', lambda: manager)
+    device = instrument.BaseInstrument('GPIB0::1::INSTR')
+    device.error_query = 'SYST:ERR?'
+    return device
+
+
+# without an open session the heartbeat only asks for the identification on a short-lived session, the error queue is left alone
+def test_heartbeat_without_session(device):
+    assert device.heartbeat()
+    assert device.rm.log == ['*IDN?', 'close']
+    assert device.rm.sessions == 1
+
+
+def test_heartbeat_on_open_session(device):
+    device.connect()
+    device.heartbeat()
+    assert device.rm.log == ['*IDN?']
+    assert device.rm.sessions == 1
+
+
+# a session busy with a running operation counts as alive without traffic
+def test_heartbeat_while_busy(device):
+    locked = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with device.io_lock:
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+    try:
+        assert device.heartbeat(timeout=50) is False
+    finally:
+        release.set()
+        thread.join()
+    assert device.rm.log == []
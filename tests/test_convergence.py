@@ -0,0 +1,83 @@
+"""
+file: tests of the convergence detector of max-hold acquisitions
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import numpy as np
+import pytest
+import convergence
+
+
+# monotonic clock of the detector, advanced by the tests
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(convergence.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_first_sweep_never_stable(clock):
+    monitor = convergence.MaxHoldMonitor(5)
+    assert monitor.update(np.full(5, -50.0)) == np.inf
+    assert monitor.stable == 0
+
+
+def test_growth_of_envelope_power(clock):
+    monitor = convergence.MaxHoldMonitor(2)
+    monitor.update(np.array([-50.0, -50.0]))
+    assert monitor.update(np.array([-47.0, -60.0])) == pytest.approx(10*np.log10((10**-4.7 + 10**-5)/(2*10**-5)))
+    np.testing.assert_array_equal(monitor.envelope, [-47, -50])
+    assert monitor.update(np.array([-60.0, -60.0])) == 0
+
+
+# converged after STABLE_SWEEPS sweeps without growth, a new peak starts the count again
+def test_converged_after_stable_sweeps(clock):
+    monitor = convergence.MaxHoldMonitor(3)
+    monitor.reset(stable_sweeps=3, min_time=0)
+    levels = np.array([-60.0, -40.0, -60.0])
+    for _ in range(3):
+        monitor.update(levels)
+        assert not monitor.converged()
+    monitor.update(levels)
+    assert monitor.converged() and monitor.done()
+
+    monitor.update(np.array([-60.0, -20.0, -60.0]))
+    assert monitor.stable == 0 and not monitor.converged()
+
+
+def test_growth_below_threshold_is_stable(clock):
+    monitor = convergence.MaxHoldMonitor(1)
+    monitor.reset(threshold=0.05, stable_sweeps=1, min_time=0)
+    monitor.update(np.array([-50.0]))
+    monitor.update(np.array([-49.97]))
+    assert monitor.converged()
+
+
+# a converged envelope still waits for the minimum time, the maximum time ends the acquisition without convergence
+def test_min_and_max_time(clock):
+    monitor = convergence.MaxHoldMonitor(1)
+    monitor.reset(stable_sweeps=1, min_time=2, max_time=10)
+    monitor.update(np.array([-50.0]))
+    monitor.update(np.array([-50.0]))
+    assert not monitor.done()
+    clock[0] += 2
+    assert monitor.converged()
+
+    monitor.reset(stable_sweeps=1, min_time=2, max_time=10)
+    monitor.update(np.array([-50.0]))
+    clock[0] += 10
+    assert not monitor.converged() and monitor.expired() and monitor.done()
+
+
+# the buffers are only reallocated when the trace length changes, reset clears the envelope
+def test_reset_reuses_buffers(clock):
+    monitor = convergence.MaxHoldMonitor(4)
+    envelope = monitor.envelope
+    monitor.update(np.zeros(4))
+    monitor.reset(points=4)
+    assert monitor.envelope is envelope
+    assert np.all(monitor.envelope == -np.inf) and monitor.sweeps == 0 and monitor.power == 0
+
+    monitor.reset(points=8)
+    assert monitor.envelope is not envelope and len(monitor.envelope) == 8
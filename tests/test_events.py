@@ -0,0 +1,60 @@
+"""
+file: tests of the event channel between measurement thread and GUI
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import threading
+import events
+
+
+def test_drain_empty():
+    assert events.EventChannel().drain() == []
+
+
+# only the latest progress and telemetry event survive, results and warnings are all kept in order
+def test_drain_coalesces_progress_and_telemetry():
+    channel = events.EventChannel()
+    posted = [
+        events.ProgressEvent('step 1'),
+        events.TelemetryEvent(20.0, 12.0),
+        events.WarningEvent('Warning', 'first'),
+        events.ProgressEvent('step 2'),
+        events.ResultEvent({'obw': 1}),
+        events.TelemetryEvent(21.0, 12.1),
+        events.WarningEvent('Warning', 'second'),
+        events.ProgressEvent('step 3')
+    ]
+    for event in posted:
+        channel.post(event)
+
+    drained = channel.drain()
+    assert drained == [posted[2], posted[4], posted[5], posted[6], posted[7]]
+    assert channel.drain() == []
+
+
+def test_drain_keeps_single_events():
+    channel = events.EventChannel()
+    progress = events.ProgressEvent('only')
+    telemetry = events.TelemetryEvent(None, None)
+    channel.post(progress)
+    channel.post(telemetry)
+    assert channel.drain() == [progress, telemetry]
+
+
+# events posted from several threads are all received
+def test_post_from_threads():
+    channel = events.EventChannel()
+
+    def post_results(n):
+        for i in range(100):
+            channel.post(events.ResultEvent((n, i)))
+
+    threads = [threading.Thread(target=post_results, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = [event.results for event in channel.drain()]
+    assert sorted(results) == [(n, i) for n in range(4) for i in range(100)]
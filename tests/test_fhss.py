@@ -0,0 +1,104 @@
+"""
+file: tests of the hop coverage and spectrogram ring of FHSS captures
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import numpy as np
+import fhss
+
+FREQS = 868e6 + np.arange(1001) * 1e3
+CHANNELS = [868.1e6, 868.3e6, 868.5e6]
+OCW = 50e3
+NOISE = -100.0
+
+
+# sweep with a hop of the given level on every given channel
+def sweep(*channels, level=-60.0):
+    levels = np.full(len(FREQS), NOISE)
+    for channel in channels:
+        levels[np.abs(FREQS - channel) <= 10e3] = level
+    return levels
+
+
+def test_hop_counted_once_per_dwell():
+    coverage = fhss.HopCoverage(FREQS, CHANNELS, OCW)
+    coverage.update(sweep(CHANNELS[0]))
+    coverage.update(sweep(CHANNELS[0]))
+    assert list(coverage.hits) == [1, 0, 0]
+    coverage.update(sweep())
+    coverage.update(sweep(CHANNELS[0]))
+    assert list(coverage.hits) == [2, 0, 0]
+
+
+# complete once every channel was seen often enough, missing lists the others
+def test_complete_and_missing():
+    coverage = fhss.HopCoverage(FREQS, CHANNELS, OCW, hits_required=2)
+    for channel in CHANNELS + CHANNELS[:2]:
+        coverage.update(sweep(channel))
+    assert not coverage.complete()
+    np.testing.assert_array_equal(coverage.missing(), [CHANNELS[2]])
+
+    coverage.update(sweep(CHANNELS[2]))
+    assert coverage.complete()
+    assert len(coverage.missing()) == 0
+
+
+# levels within the threshold above the noise floor don't count as a hop
+def test_threshold():
+    coverage = fhss.HopCoverage(FREQS, CHANNELS, OCW, threshold=10)
+    coverage.update(sweep(CHANNELS[1], level=NOISE + 5))
+    assert list(coverage.hits) == [0, 0, 0]
+    coverage.update(sweep(CHANNELS[1], level=NOISE + 15))
+    assert list(coverage.hits) == [0, 1, 0]
+
+
+def test_envelope_and_occupancy():
+    coverage = fhss.HopCoverage(FREQS, CHANNELS, OCW)
+    coverage.update(sweep(CHANNELS[0], level=-50))
+    coverage.update(sweep(CHANNELS[1], level=-40))
+    assert coverage.envelope.max() == -40
+    occupancy = coverage.occupancy()
+    assert occupancy[np.argmin(np.abs(FREQS - CHANNELS[0]))] == 0.5
+    assert occupancy[np.argmin(np.abs(FREQS - CHANNELS[2]))] == 0
+
+
+# the envelope of a channel only holds sweeps in which it was the only occupied channel, otherwise the worst case of all sweeps
+def test_channel_envelope():
+    coverage = fhss.HopCoverage(FREQS, CHANNELS, OCW)
+    coverage.update(sweep(CHANNELS[0], level=-50))
+    coverage.update(sweep(CHANNELS[0], CHANNELS[1], level=-30))
+    coverage.update(sweep(CHANNELS[1], level=-45))
+
+    assert coverage.isolated(0) and coverage.isolated(1) and not coverage.isolated(2)
+    assert coverage.channel_envelope(0).max() == -50
+    assert coverage.channel_envelope(1).max() == -45
+    np.testing.assert_array_equal(coverage.channel_envelope(2), coverage.envelope)
+
+
+def test_spectrogram_ring_wraparound():
+    ring = fhss.SpectrogramRing(4, depth=3)
+    for i in range(5):
+        ring.append(np.full(4, -100.0 + i), float(i))
+    timestamps, levels = ring.spectrogram()
+    assert len(ring) == 3
+    np.testing.assert_array_equal(timestamps, [2, 3, 4])
+    np.testing.assert_array_equal(levels[:, 0], [-98, -97, -96])
+
+
+# levels are quantized to LEVEL_STEP and clipped to the range of one byte
+def test_spectrogram_quantization():
+    ring = fhss.SpectrogramRing(4)
+    ring.append([-200.0, fhss.LEVEL_FLOOR, -50.2, 100.0], 0.0)
+    _, levels = ring.spectrogram()
+    np.testing.assert_allclose(levels[0], [fhss.LEVEL_FLOOR, fhss.LEVEL_FLOOR, -50.0, fhss.LEVEL_FLOOR + 255*fhss.LEVEL_STEP])
+
+
+def test_spectrogram_save(tmp_path):
+    ring = fhss.SpectrogramRing(4)
+    ring.append(np.full(4, -80.0), 1.0)
+    filepath = tmp_path / 'hops.npz'
+    ring.save(filepath, np.arange(4), hits=np.array([1, 2]))
+    with np.load(filepath) as data:
+        np.testing.assert_array_equal(data['levels'], [[-80, -80, -80, -80]])
+        np.testing.assert_array_equal(data['hits'], [1, 2])
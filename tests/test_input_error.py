@@ -0,0 +1,83 @@
+"""
+file: tests of the input checks shared by the GUI and the jobs of the station pool
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import importlib.util
+import os
+import pytest
+from conftest import ROOT
+
+pytest.importorskip('PyQt5.QtWidgets')
+
+
+# the main script can't be imported by name because of the hyphens in its file name
+@pytest.fixture(scope='module')
+def main():
+    spec = importlib.util.spec_from_file_location('obw_oob_automation_main', os.path.join(ROOT, 'obw-oob-automation_main.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# the band files are referenced relative to the repository
+@pytest.fixture(autouse=True)
+def in_repository(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+def valid_inputs(**changes):
+    inputs = {'channels': [868.3e6], 'ocw': 125000, 'voltage': '12', 'measure_ex': True, 'temp_min': '-20', 'temp_max': '55',
+              'volt_min': '10.8', 'volt_max': '13.2', 'measure_obw': True, 'measure_oob': True, 'fhss': False}
+    inputs.update(changes)
+    return inputs
+
+
+def test_valid_inputs(main):
+    assert main.input_error(valid_inputs()) is None
+    assert main.input_error(valid_inputs(voltage='230', volt_min='207', volt_max='253')) is None
+
+
+@pytest.mark.parametrize('changes, message', [
+    ({'channels': []}, 'Please enter the operating frequency.'),
+    ({'channels': [868e6, 31e9]}, 'Please enter a valid operating frequency. Maximum: 30 GHz'),
+    ({'ocw': 0}, 'Please enter a valid operating channel width. Maximum: 30 GHz'),
+    ({'voltage': ' '}, 'Please enter the nominal operating voltage.'),
+    ({'voltage': '0'}, 'Please enter a valid nominal operating voltage. Maximum: 230 V'),
+    ({'voltage': 'abc'}, 'Please enter a valid nominal operating voltage. Maximum: 230 V'),
+    ({'temp_max': ''}, 'Please enter the ranges for extreme conditions.'),
+    ({'volt_max': '271'}, 'Extreme voltages must be between 0 and 270 V'),
+    ({'channels': [868.65e6]}, 'No operational frequency band found for 868.650 MHz.'),
+    ({'measure_obw': False, 'measure_oob': False}, 'Please select at least one of both OBW/OOB measurements to be executed.')
+])
+def test_invalid_inputs(main, changes, message):
+    assert main.input_error(valid_inputs(**changes)) == message
+
+
+# the nominal voltage keeps the 230 V limit of the GUI, extreme voltages may use the whole output range of the SPS
+def test_voltage_limits(main):
+    assert main.input_error(valid_inputs(voltage='231', volt_min='207', volt_max='253')) == 'Please enter a valid nominal operating voltage. Maximum: 230 V'
+    assert main.input_error(valid_inputs(voltage='230', volt_min='207', volt_max='270')) is None
+
+
+def test_temperature_range(main):
+    assert main.input_error(valid_inputs(temp_min='-45')) == 'Temperature must be between -40 and 180 °C'
+    assert main.input_error(valid_inputs(temp_max='60'), temperature_range=(-20, 55)) == 'Temperature must be between -20 and 55 °C'
+
+
+# extreme conditions are only checked if they are measured, the band only if OOB is measured
+def test_checks_only_selected_measurements(main):
+    assert main.input_error(valid_inputs(measure_ex=False, temp_max='', volt_max='999')) is None
+    assert main.input_error(valid_inputs(measure_oob=False, channels=[868.65e6])) is None
+
+
+def test_job_inputs(main, tmp_path):
+    spec = {'name': 'job', 'project': 'ABC 12/345', 'path': str(tmp_path), 'channels': [868.3e6], 'ocw': 125000, 'voltage': 12}
+    inputs = main.job_inputs(spec)
+    assert inputs['filename_report'].endswith('_ABC-12-345_Report.html')
+    assert inputs['ofb_ranges'] == [(868000000, 868600000)]
+    assert inputs['voltage'] == '12'
+
+    with pytest.raises(ValueError, match='Job job: Please enter a valid nominal operating voltage'):
+        main.job_inputs(dict(spec, voltage=240))
@@ -0,0 +1,132 @@
+"""
+file: tests of the session I/O of the instruments: shadow cache of settings and short-lived sessions
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import threading
+import pytest
+import instrument
+import sps
+
+
+class FakeResource:
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def write(self, command):
+        self.manager.log.append(command)
+
+    def query(self, command):
+        self.manager.log.append(command)
+        return '1'
+
+    def close(self):
+        self.manager.log.append('close')
+
+
+class FakeResourceManager:
+
+    def __init__(self):
+        self.log = []
+        self.sessions = 0
+
+    def open_resource(self, address, **kwargs):
+        self.sessions += 1
+        return FakeResource(self)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = FakeResourceManager()
+    monkeypatch.setattr(instrument, 'resource_manager_factory', lambda: manager)
+    return manager
+
+
+@pytest.fixture
+def device(manager):
+    device = instrument.BaseInstrument('TCPIP0::1::INSTR')
+    device.connect()
+    return device
+
+
+### SHADOW CACHE
+def test_write_setting_skips_repeated_setting(device, manager):
+    assert device.write_setting('SENS:BAND:RES 1000')
+    assert not device.write_setting('SENS:BAND:RES 1000')
+    assert device.write_setting('SENS:BAND:RES 3000')
+    assert manager.log == ['SENS:BAND:RES 1000', 'SENS:BAND:RES 3000']
+
+
+def test_write_setting_with_key(device, manager):
+    device.write_setting('DISP:TRAC1:MODE MAXH', 'trace 1')
+    device.write_setting('DISP:TRAC1:MODE MAXH', 'trace 1')
+    device.write_setting('DISP:TRAC1:MODE MAXH', 'other')
+    assert manager.log == ['DISP:TRAC1:MODE MAXH']*2
+
+
+def test_invalidate(device, manager):
+    device.write_setting('SENS:BAND:RES 1000')
+    device.write_setting('SENS:FREQ:SPAN 1e6')
+    device.invalidate('SENS:BAND:RES')
+    device.write_setting('SENS:BAND:RES 1000')
+    device.write_setting('SENS:FREQ:SPAN 1e6')
+    device.invalidate()
+    device.write_setting('SENS:FREQ:SPAN 1e6')
+    assert manager.log == ['SENS:BAND:RES 1000', 'SENS:FREQ:SPAN 1e6', 'SENS:BAND:RES 1000', 'SENS:FREQ:SPAN 1e6']
+
+
+# a reset command brings the instrument back to its defaults, nothing cached is valid afterwards
+def test_reset_clears_shadow(device, manager):
+    device.write_setting('SENS:BAND:RES 1000')
+    device.write('*RST')
+    assert device.write_setting('SENS:BAND:RES 1000')
+    assert manager.log == ['SENS:BAND:RES 1000', '*RST', 'SENS:BAND:RES 1000']
+
+
+# commands of the safe state of the supply are always sent, even if the cache says they already are in effect
+def test_sps_write_off_always_written(manager):
+    supply = sps.SPS('GPIB0::6::INSTR', 'GPIB0::3::INSTR')
+    supply.connect()
+    supply.write_setting('AMP:OUTPUT 0')
+    supply.write_off('AMP:OUTPUT 0')
+    supply.write_off('AMP:OUTPUT 0')
+    assert manager.log == ['AMP:OUTPUT 0']*3
+    assert not supply.write_setting('AMP:OUTPUT 0')
+    supply.write('DCL')
+    assert supply.write_setting('AMP:OUTPUT 0')
+
+
+### SHORT-LIVED SESSIONS
+def test_run_with_uses_open_session(device, manager):
+    assert device.run_with(lambda session: session.query('MEAS?')) == '1'
+    assert manager.sessions == 1 and manager.log == ['MEAS?']
+
+
+def test_run_with_opens_short_lived_session(manager):
+    device = instrument.BaseInstrument('TCPIP0::1::INSTR')
+    assert device.sample('MEAS?') == '1'
+    assert manager.sessions == 1 and manager.log == ['MEAS?', 'close']
+    assert not device.connected
+
+
+# sampling never waits for a running operation
+def test_sample_while_busy(device, manager):
+    locked = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with device.io_lock:
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+    try:
+        assert device.sample('MEAS?') is None
+    finally:
+        release.set()
+        thread.join()
+    assert manager.log == []
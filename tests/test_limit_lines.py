@@ -0,0 +1,54 @@
+"""
+file: tests of the library of limit lines on the FSV
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import EN_300_220_1
+import limit_lines
+
+MASK = [(867750000, -36), (867950000, 0), (867950000, 14), (868050000, 14), (868050000, 0), (868250000, -36)]
+
+
+def test_name_format():
+    name = limit_lines.LimitLibrary.name(MASK)
+    assert len(name) == limit_lines.NAME_LENGTH
+    assert name.startswith('M') and name == name.upper()
+
+
+# identical masks share one line, also if calculated as floats or from the batch API
+def test_identical_masks_share_name():
+    standard = EN_300_220_1.EN_300_220_1()
+    name = limit_lines.LimitLibrary.name(MASK)
+    assert limit_lines.LimitLibrary.name([(float(freq) + 0.2, level + 0.001) for freq, level in MASK]) == name
+    assert limit_lines.LimitLibrary.name(standard.calc_limit_oc(868e6, 100000)) == name
+    assert limit_lines.LimitLibrary.name(standard.calc_limits_oc(868e6, 100000)[0]) == name
+
+
+def test_different_masks_differ():
+    name = limit_lines.LimitLibrary.name(MASK)
+    assert limit_lines.LimitLibrary.name(MASK[:-1]) != name
+    assert limit_lines.LimitLibrary.name(MASK[:-1] + [(868250000, -30)]) != name
+    assert limit_lines.LimitLibrary.name(list(reversed(MASK))) != name
+
+
+# lines of a previous EUT become stale and are handed out for deletion once
+def test_select_eut_and_take_stale():
+    library = limit_lines.LimitLibrary()
+    library.select_eut('EUT-1')
+    library.uploaded.update({'MAAAAAAA', 'MBBBBBBB'})
+    library.select_eut('EUT-1')
+    assert library.take_stale() == []
+
+    library.select_eut('EUT-2')
+    assert library.uploaded == set()
+    assert library.take_stale() == ['MAAAAAAA', 'MBBBBBBB']
+    assert library.take_stale() == []
+
+
+def test_invalidate():
+    library = limit_lines.LimitLibrary()
+    library.uploaded.add('MAAAAAAA')
+    library.invalidate()
+    assert library.uploaded == set()
+    assert library.take_stale() == []
@@ -0,0 +1,112 @@
+"""
+file: tests of the structured logging with background writer, context fields, rotation and ring buffer
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import json
+import os
+import threading
+import time
+import pytest
+import logbook
+
+
+# log file of the test only, console output off. settings of tags.py restored afterwards
+@pytest.fixture
+def log_file(tmp_path):
+    filename = str(tmp_path / 'log.jsonl')
+    logbook.configure(filename, logbook.DEBUG, to_console=False)
+    yield filename
+    logbook.flush()
+    logbook.configure(level=logbook.INFO)
+
+
+def records(filename):
+    with open(filename, encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def test_record_written_with_fields(log_file):
+    logbook.emit(logbook.WARNING, 'FSV', 'Sweep time kept', {'instrument': 'FSV', 'duration': 0.25})
+    logbook.flush()
+    record = records(log_file)[-1]
+    assert (record['level'], record['tag'], record['message']) == ('WARNING', 'FSV', 'Sweep time kept')
+    assert record['instrument'] == 'FSV' and record['duration'] == 0.25
+    assert record['thread'] == threading.current_thread().name
+
+
+def test_records_below_threshold_dropped(log_file):
+    logbook.configure(log_file, logbook.WARNING, to_console=False)
+    logbook.emit(logbook.INFO, 'Test', 'dropped')
+    logbook.emit(logbook.ERROR, 'Test', 'kept')
+    logbook.flush()
+    assert [record['message'] for record in records(log_file)] == ['kept']
+
+
+# context fields apply to the calling thread within the block only, nested blocks add to them
+def test_context(log_file):
+    with logbook.context(condition='nominal'):
+        with logbook.context(phase='obw'):
+            logbook.emit(logbook.INFO, 'Test', 'inner')
+        logbook.emit(logbook.INFO, 'Test', 'outer')
+        thread = threading.Thread(target=logbook.emit, args=(logbook.INFO, 'Test', 'other thread'))
+        thread.start()
+        thread.join()
+    logbook.emit(logbook.INFO, 'Test', 'outside')
+    logbook.flush()
+
+    logged = {record['message']: record for record in records(log_file)}
+    assert (logged['inner']['condition'], logged['inner']['phase']) == ('nominal', 'obw')
+    assert logged['outer']['condition'] == 'nominal' and 'phase' not in logged['outer']
+    assert 'condition' not in logged['other thread']
+    assert 'condition' not in logged['outside']
+
+
+def test_set_context(log_file):
+    logbook.set_context(condition='minvolt', phase='oob')
+    logbook.set_context(phase=None)
+    logbook.emit(logbook.INFO, 'Test', 'message')
+    logbook.set_context(condition=None)
+    logbook.emit(logbook.INFO, 'Test', 'cleared')
+    logbook.flush()
+
+    logged = {record['message']: record for record in records(log_file)}
+    assert logged['message']['condition'] == 'minvolt' and 'phase' not in logged['message']
+    assert 'condition' not in logged['cleared']
+
+
+# the ring buffer of the GUI returns the records after a sequence number, oldest first
+def test_tail(log_file):
+    logbook.emit(logbook.INFO, 'Test', 'first')
+    logbook.flush()
+    since = logbook.tail()[-1][0]
+    logbook.emit(logbook.INFO, 'Test', 'second')
+    logbook.emit(logbook.INFO, 'Test', 'third')
+    logbook.flush()
+
+    tail = logbook.tail(since)
+    assert [record['message'] for _, record in tail] == ['second', 'third']
+    assert [sequence for sequence, _ in tail] == [since + 1, since + 2]
+    assert logbook.tail(tail[-1][0]) == []
+
+
+# full files are rotated to .1 ... .BACKUPS, the oldest one is dropped
+def test_rotation(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'log.jsonl')
+    monkeypatch.setattr(logbook, 'log_file', filename)
+    monkeypatch.setattr(logbook, 'console', False)
+    monkeypatch.setattr(logbook, 'MAX_BYTES', 1000)
+    writer = logbook.LogWriter()
+    for i in range(200):
+        writer.write((time.time(), logbook.INFO, 'Test', f'record {i}', 'main', None, None))
+    writer.close()
+
+    files = sorted(os.listdir(tmp_path))
+    assert files == ['log.jsonl'] + [f'log.jsonl.{i}' for i in range(1, logbook.BACKUPS + 1)]
+    assert all(os.path.getsize(tmp_path / name) <= 1000 for name in files)
+    assert records(filename)[-1]['message'] == 'record 199'
+
+    # no record lost between the current and the last rotated file
+    first = int(records(filename)[0]['message'].split()[1])
+    assert records(f'{filename}.1')[-1]['message'] == f'record {first - 1}'
@@ -0,0 +1,96 @@
+"""
+file: tests of the concurrent pre-flight check with fake instruments
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import threading
+import pytest
+import preflight
+
+
+class FakeFSV:
+
+    def __init__(self, errors=(), hang=None):
+        self.errors = list(errors)
+        self.hang = hang        # event the probe waits for, simulating a driver call that doesn't return
+
+    def probe(self, timeout):
+        if self.hang is not None:
+            self.hang.wait()
+        return 'Rohde&Schwarz,FSV', self.errors
+
+
+class FakeSPS:
+
+    ars_address = 'GPIB0::3::INSTR'
+
+    def __init__(self, ars_ok=True):
+        self.ars_ok = ars_ok
+
+    def probe(self, timeout):
+        return 'SPS', []
+
+    def probe_ars(self, timeout):
+        if not self.ars_ok:
+            raise ConnectionError('ARS not answering')
+
+
+class FakeChamber:
+
+    idn = 'WKL'
+    is_running = False
+
+
+@pytest.fixture(autouse=True)
+def short_deadline(monkeypatch):
+    monkeypatch.setattr(preflight, 'PREFLIGHT_DEADLINE', 0.5)
+    monkeypatch.setattr(preflight, 'MIN_FREE_DISK', 0)
+
+
+def devices(report):
+    return {check.device: check for check in report.checks}
+
+
+def test_all_instruments_go(tmp_path):
+    report = preflight.run_preflight(FakeFSV(), FakeSPS(), FakeChamber(), str(tmp_path))
+    assert report.go
+    assert set(devices(report)) == {'FSV', 'SPS', 'ARS', 'Disk', 'WKL'}
+    assert devices(report)['WKL'].detail == 'WKL, idle'
+
+
+def test_chamber_not_required(tmp_path):
+    report = preflight.run_preflight(FakeFSV(), FakeSPS(), None, str(tmp_path), require_chamber=False)
+    assert report.go and 'WKL' not in devices(report)
+
+
+# pending errors of the analyzer and a missing ARS are NO-GO, the other checks are still reported
+def test_failed_probes(tmp_path):
+    report = preflight.run_preflight(FakeFSV(errors=['-222,"Data out of range"']), FakeSPS(ars_ok=False), FakeChamber(), str(tmp_path))
+    checks = devices(report)
+    assert not report.go
+    assert not checks['FSV'].ok and 'Data out of range' in checks['FSV'].detail
+    assert not checks['ARS'].ok and checks['ARS'].detail == 'ConnectionError: ARS not answering'
+    assert checks['SPS'].ok and checks['Disk'].ok
+
+
+# a probe hanging in a driver call fails at the deadline instead of blocking the check
+def test_hanging_probe(tmp_path):
+    hang = threading.Event()
+    try:
+        report = preflight.run_preflight(FakeFSV(hang=hang), FakeSPS(), FakeChamber(), str(tmp_path))
+    finally:
+        hang.set()
+    checks = devices(report)
+    assert not report.go
+    assert checks['FSV'].detail == 'no answer within 0.5 s'
+    assert checks['SPS'].ok
+
+
+def test_disk(tmp_path, monkeypatch):
+    assert preflight.probe_disk(str(tmp_path)).endswith(f'free on {tmp_path}')
+    with pytest.raises(RuntimeError, match='not a writable directory'):
+        preflight.probe_disk(str(tmp_path / 'missing'))
+    monkeypatch.setattr(preflight, 'MIN_FREE_DISK', float('inf'))
+    with pytest.raises(RuntimeError, match='MB free on'):
+        preflight.probe_disk(str(tmp_path))
@@ -0,0 +1,85 @@
+"""
+file: tests of the HTML test report and of its worker processes
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+import report
+import trace_archive
+
+SETTINGS = {'rbw': 1000, 'vbw': 3000, 'detector': 'RMS'}
+MASK = [(867750000, -36), (867950000, 0), (867950000, 14), (868050000, 14), (868050000, 0), (868250000, -36)]
+
+
+@pytest.fixture
+def archive_directory(tmp_path):
+    archive = trace_archive.TraceArchive(str(tmp_path / 'traces'))
+    freqs = np.linspace(867.7e6, 868.3e6, 1501)
+    levels = np.full(1501, -90.0)
+    levels[700:800] = -10
+    archive.append(freqs, levels, 'oob_oc', 'nominal', 868e6, SETTINGS)
+    archive.append(freqs, levels - 3, 'oob_oc', 'minvolt', 868e6, SETTINGS)
+    return archive.directory
+
+
+# main module and loaded packages of a worker process
+def worker_modules():
+    return os.path.basename(getattr(sys.modules['__main__'], '__file__', '')), sorted(name for name in sys.modules if name.split('.')[0] in ('PyQt5', 'pyvisa'))
+
+
+def test_render_svg():
+    freqs = np.linspace(867.7e6, 868.3e6, 5000)
+    svg = report.render_svg(freqs, np.full(5000, -50.0), [MASK])
+    assert svg.startswith('<svg') and svg.endswith('</svg>')
+    assert svg.count('<polyline') == 2
+    assert '867.700 MHz' in svg and '868.300 MHz' in svg and '0 dBm' in svg
+
+
+def test_render_condition(archive_directory):
+    section = report.render_condition(archive_directory, 'minvolt', 868e6, {'oob_oc': [MASK]})
+    assert section.startswith('<h2>Condition: minvolt, channel 868.000 MHz</h2>')
+    assert section.count('<figure>') == 1
+    assert 'oob_oc &ndash; RBW 1 kHz, VBW 3 kHz, RMS' in section
+
+
+def test_report(archive_directory, tmp_path):
+    filepath = str(tmp_path / 'report.html')
+    builder = report.ReportBuilder(filepath, 'ABC <12/345>', {'EUT': 'EUT-1'}, archive_directory, workers=1)
+    builder.add_condition({'condition': 'nominal', 'channel': 868e6, 'temperature': None, 'voltage': 12, 'obw': 12500.0, 'oc_pass': True, 'ofb_pass': None}, {'oob_oc': [MASK]})
+    builder.add_condition({'condition': 'minvolt', 'channel': 868e6, 'temperature': 55, 'voltage': 10.8, 'obw': None, 'oc_pass': False, 'ofb_pass': False}, {})
+    assert builder.finish('complete') == filepath
+
+    with open(filepath, encoding='utf-8') as f:
+        document = f.read()
+    assert '<title>ABC &lt;12/345&gt;</title>' in document
+    assert '<td>ambient</td><td>12 V</td><td>12.500 kHz</td><td><span class="pass">PASS</span></td><td>&ndash;</td>' in document
+    assert '<td>55 °C</td><td>10.8 V</td><td>&ndash;</td><td><span class="fail">FAIL</span></td>' in document
+    assert document.count('<figure>') == 2
+
+
+# a section that can't be rendered is reported instead of failing the report
+def test_report_without_archive(tmp_path):
+    filepath = str(tmp_path / 'report.html')
+    archive_directory = tmp_path / 'traces'
+    archive_directory.write_text('not a directory')
+    builder = report.ReportBuilder(filepath, 'Report', {}, str(archive_directory), workers=1)
+    builder.add_condition({'condition': 'nominal', 'channel': 868e6, 'temperature': None, 'voltage': 12, 'obw': None, 'oc_pass': None, 'ofb_pass': None}, {})
+    builder.finish('aborted')
+
+    with open(filepath, encoding='utf-8') as f:
+        document = f.read()
+    assert '<h2>Condition: nominal</h2><p>Plots not available:' in document
+    assert '<th>Status</th><td>aborted</td>' in document
+
+
+# spawned workers start from report_worker.py, not from the main module of the GUI with PyQt5 and the instrument drivers
+def test_worker_main_module():
+    builder = report.ReportBuilder(os.devnull, 'Report', {}, '', workers=1)
+    try:
+        assert builder.executor.submit(worker_modules).result(timeout=60) == ('report_worker.py', [])
+    finally:
+        builder.executor.shutdown()
@@ -0,0 +1,78 @@
+"""
+file: tests of the SQLite store of runs, conditions and results
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import pytest
+import results_db
+
+BAND = (868000000, 868600000)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = results_db.ResultsStore(str(tmp_path / 'results.sqlite'))
+    yield store
+    store.close()
+
+
+def test_run_with_conditions(store):
+    run_id = store.start_run('ABC 12/345', [868100000, 869000000], 125000, [BAND, None], eut='EUT-1', path='C:\\results')
+    condition_id = store.add_condition(run_id, 'nominal', 23.0, 12.0,
+                                       [('obw', 868100000, 12500.0, None, None), ('oob_oc', 868100000, None, True, 3.5)],
+                                       telemetry={'sps_voltage': (11.9, 12.1, 12.0, 60)}, artifacts=[('screenshot', 'C:\\results\\obw.jpg')])
+    store.finish_run(run_id, 'complete')
+
+    connection = store.connection
+    assert connection.execute('SELECT project, eut, status, ocw FROM runs').fetchall() == [('ABC 12/345', 'EUT-1', 'complete', 125000)]
+    assert connection.execute('SELECT centre_freq, band_low, band_high FROM channels ORDER BY centre_freq').fetchall() == [
+        (868100000, *BAND), (869000000, None, None)]
+    assert connection.execute('SELECT kind, value, passed, margin FROM measurements WHERE condition_id = ? ORDER BY kind', (condition_id,)).fetchall() == [
+        ('obw', 12500.0, None, None), ('oob_oc', None, 1, 3.5)]
+    assert connection.execute('SELECT channel, minimum, maximum, mean, samples FROM telemetry').fetchall() == [('sps_voltage', 11.9, 12.1, 12.0, 60)]
+    assert connection.execute('SELECT kind, path FROM artifacts').fetchall() == [('screenshot', 'C:\\results\\obw.jpg')]
+
+
+# low margins are found by the band of the channel across projects, smallest margin first
+def test_find_low_margins(store):
+    first = store.start_run('A', [868100000], 125000, [BAND])
+    store.add_condition(first, 'nominal', 23.0, 12.0, [('oob_oc', 868100000, None, True, 1.5)])
+    store.add_condition(first, 'minvolt', 23.0, 10.8, [('oob_oc', 868100000, None, False, -0.5)])
+    second = store.start_run('B', [868300000, 869500000], 125000, [BAND, (869400000, 869650000)])
+    store.add_condition(second, 'nominal', 23.0, 3.3, [('oob_oc', 868300000, None, True, 0.8), ('oob_oc', 869500000, None, True, 0.1),
+                                                       ('oob_ofb', 868300000, None, True, 0.2)])
+
+    rows = store.find_low_margins(868400000, 2.0)
+    assert [(row[0], row[3], row[4], row[5]) for row in rows] == [('A', 868100000, 'minvolt', -0.5), ('B', 868300000, 'nominal', 0.8),
+                                                                  ('A', 868100000, 'nominal', 1.5)]
+    assert [row[5] for row in store.find_low_margins(868400000, 1.0)] == [-0.5, 0.8]
+    assert [row[5] for row in store.find_low_margins(868400000, 1.0, kind='oob_ofb')] == [0.2]
+
+
+def test_find_runs(store):
+    store.start_run('A', [868100000], 125000, [BAND])
+    store.start_run('B', [868100000], 125000, [BAND])
+    assert [row[1] for row in store.find_runs('A')] == ['A']
+    assert store.find_runs('C') == []
+
+
+# a failed plateau leaves no partial results behind
+def test_condition_is_one_transaction(store):
+    run_id = store.start_run('A', [868100000], 125000, [BAND])
+    with pytest.raises(ValueError):
+        store.add_condition(run_id, 'nominal', 23.0, 12.0, [('obw', 868100000, 12500.0, None)])
+    assert store.connection.execute('SELECT COUNT(*) FROM conditions').fetchone() == (0,)
+
+
+def test_reopen(tmp_path):
+    filepath = str(tmp_path / 'results.sqlite')
+    store = results_db.ResultsStore(filepath)
+    store.start_run('A', [868100000], 125000, [BAND])
+    store.close()
+
+    store = results_db.ResultsStore(filepath)
+    try:
+        assert len(store.find_runs('A')) == 1
+    finally:
+        store.close()
@@ -0,0 +1,147 @@
+"""
+file: tests of the shared-memory trace ring and the job bookkeeping of the measurement engine service
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import threading
+import uuid
+import numpy as np
+import pytest
+import service
+import stations
+
+
+# ring of four slots under a name of its own, so that a running engine is never touched
+@pytest.fixture
+def ring():
+    ring = service.TraceRing(name=f'oob_test_{uuid.uuid4().hex[:8]}', slots=4)
+    yield ring
+    ring.close()
+
+
+@pytest.fixture
+def reader(ring):
+    reader = service.TraceRingReader(name=ring.shm.name)
+    yield reader
+    reader.close()
+
+
+def publish(ring, count, kind=service.TRACE):
+    for i in range(count):
+        ring.publish(kind, 'A', f'trace {i}', 868e6, 869e6, np.full(10 + i, -float(i)))
+
+
+def test_read_published_records(ring, reader):
+    publish(ring, 3)
+    records = reader.read()
+    assert [record['label'] for record in records] == ['trace 0', 'trace 1', 'trace 2']
+    assert records[2]['station'] == 'A' and records[2]['start'] == 868e6
+    np.testing.assert_array_equal(records[2]['levels'], np.full(12, -2.0))
+    assert reader.lost == 0
+    assert reader.read() == []
+
+
+# a new reader only sees records published after connecting
+def test_reader_starts_at_current_position(ring):
+    publish(ring, 2)
+    reader = service.TraceRingReader(name=ring.shm.name)
+    try:
+        assert reader.read() == []
+        publish(ring, 1)
+        assert len(reader.read()) == 1
+    finally:
+        reader.close()
+
+
+# records overwritten before they were read are counted as lost, the rest is returned in order
+def test_lost_records_of_slow_reader(ring, reader):
+    publish(ring, 7)
+    records = reader.read()
+    assert [record['label'] for record in records] == ['trace 3', 'trace 4', 'trace 5', 'trace 6']
+    assert reader.lost == 3
+
+    publish(ring, 2)
+    assert len(reader.read()) == 2
+    assert reader.lost == 3
+
+
+# a slot being written when the reader gets to it is skipped and counted as lost
+def test_slot_being_written_is_lost(ring, reader):
+    publish(ring, 2)
+    ring.slots['sequence'][1] = 0
+    assert [record['label'] for record in reader.read()] == ['trace 0']
+    assert reader.lost == 1
+
+
+def test_read_kinds(ring, reader):
+    publish(ring, 1, service.TRACE)
+    publish(ring, 1, service.LIVE)
+    publish(ring, 1, service.TELEMETRY)
+    assert [record['kind'] for record in reader.read(kinds=(service.TRACE, service.TELEMETRY))] == [service.TRACE, service.TELEMETRY]
+    assert reader.lost == 0
+
+
+def test_levels_limited_to_max_points(ring, reader):
+    ring.publish(service.TRACE, 'A', 'long', 0, 1, np.zeros(service.RING_MAX_POINTS + 10))
+    assert len(reader.read()[0]['levels']) == service.RING_MAX_POINTS
+
+
+### ENGINE
+@pytest.fixture
+def engine(monkeypatch):
+    name = f'oob_test_{uuid.uuid4().hex[:8]}'
+    trace_ring = service.TraceRing
+    monkeypatch.setattr(service, 'TraceRing', lambda: trace_ring(name=name, slots=4))
+    engine = service.Engine([stations.Station('A', 'FSV', 'SPS')], runner=None)
+    yield engine
+    engine.ring.close()
+
+
+def make_job(name, ac=False):
+    return stations.Job({'project': name, 'ac': ac, 'measure_ex': False}, name)
+
+
+def test_submit_and_cancel(engine):
+    first = engine.submit(make_job('first'))
+    second = engine.submit(make_job('second'))
+    assert [job.id for job in engine.job_list()] == [first, second]
+    assert engine.status()['pending'] == 2
+
+    engine.cancel()
+    assert [engine.job_status(job)['state'] for job in engine.job_list()] == ['cancelled', 'cancelled']
+    assert engine.pool.pending == []
+    assert engine.find_job(first).name == 'first'
+    assert engine.find_job(99) is None
+
+
+# jobs no station can run are rejected and not registered
+def test_submit_rejected(engine):
+    with pytest.raises(ValueError):
+        engine.submit(make_job('ac', ac=True))
+    assert engine.job_list() == []
+
+
+# listing the jobs while other threads submit never fails
+def test_job_list_while_submitting(engine):
+    errors = []
+
+    def submit():
+        for i in range(200):
+            engine.submit(make_job(f'job {i}'))
+
+    def list_jobs():
+        try:
+            for _ in range(200):
+                [engine.job_status(job) for job in engine.job_list()]
+                engine.status()
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit) for _ in range(2)] + [threading.Thread(target=list_jobs) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(engine.job_list()) == 400
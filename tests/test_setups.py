@@ -0,0 +1,70 @@
+"""
+file: tests of the cache of FSV setups stored per test phase
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import setups
+
+PARAMETERS = {'rbw': 1000, 'span': 750000, 'det_mode': 'rms'}
+
+
+def test_key_independent_of_order():
+    assert setups.SetupCache.key('oob', PARAMETERS, offset=1.5) == setups.SetupCache.key('oob', dict(reversed(list(PARAMETERS.items()))), offset=1.5)
+
+
+# everything that went into a setup is part of its key
+def test_key_changes_with_inputs():
+    key = setups.SetupCache.key('oob', PARAMETERS, offset=1.5)
+    assert key != setups.SetupCache.key('obw', PARAMETERS, offset=1.5)
+    assert key != setups.SetupCache.key('oob', dict(PARAMETERS, rbw=3000), offset=1.5)
+    assert key != setups.SetupCache.key('oob', PARAMETERS, offset=1.8)
+    assert key != setups.SetupCache.key('oob', PARAMETERS)
+
+
+def test_store_and_lookup():
+    cache = setups.SetupCache('C:\\setups')
+    key = setups.SetupCache.key('oob', PARAMETERS)
+    shadow = {'SENS:BAND:RES': 'SENS:BAND:RES 1000'}
+    setup = cache.store('oob', key, shadow, 0.2)
+    shadow.clear()
+
+    assert cache.lookup('oob', key) is setup
+    assert setup.filename == 'C:\\setups\\oob' + setups.SETUP_SUFFIX
+    assert setup.shadow == {'SENS:BAND:RES': 'SENS:BAND:RES 1000'}        # copy of the cache at the time of storing
+    assert setup.sweep_time == 0.2
+    assert cache.lookup('obw', key) is None
+    assert cache.lookup('oob', setups.SetupCache.key('oob', dict(PARAMETERS, rbw=3000))) is None
+
+
+# storing a phase again replaces its setup
+def test_store_replaces_outdated_setup():
+    cache = setups.SetupCache()
+    old = setups.SetupCache.key('oob', PARAMETERS)
+    new = setups.SetupCache.key('oob', dict(PARAMETERS, rbw=3000))
+    cache.store('oob', old, {}, 0.2)
+    cache.store('oob', new, {}, 0.1)
+    assert cache.lookup('oob', old) is None
+    assert cache.lookup('oob', new).sweep_time == 0.1
+
+
+def test_select_eut():
+    cache = setups.SetupCache()
+    key = setups.SetupCache.key('oob', PARAMETERS)
+    cache.select_eut('EUT-1')
+    cache.store('oob', key, {}, 0.2)
+    cache.select_eut('EUT-1')
+    assert cache.lookup('oob', key) is not None
+    cache.select_eut('EUT-2')
+    assert cache.lookup('oob', key) is None
+
+
+def test_invalidate():
+    cache = setups.SetupCache()
+    obw, oob = setups.SetupCache.key('obw', PARAMETERS), setups.SetupCache.key('oob', PARAMETERS)
+    cache.store('obw', obw, {}, 0.2)
+    cache.store('oob', oob, {}, 0.2)
+    cache.invalidate('obw')
+    assert cache.lookup('obw', obw) is None and cache.lookup('oob', oob) is not None
+    cache.invalidate()
+    assert cache.lookup('oob', oob) is None
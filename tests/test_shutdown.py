@@ -0,0 +1,58 @@
+"""
+file: tests of the check runner and the concurrent shutdown into a safe state
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import threading
+import checks
+import shutdown
+
+
+def test_run_check():
+    check = checks.run_check('SPS', lambda voltage: f'{voltage} V', 12)
+    assert check.ok and check.detail == '12 V' and check.duration >= 0
+    assert str(check).startswith('[GO] SPS: 12 V')
+
+    check = checks.run_check('FSV', lambda: 1/0)
+    assert not check.ok and check.detail == 'ZeroDivisionError: division by zero'
+    assert str(check).startswith('[NO-GO] FSV')
+
+
+def test_report_verdict():
+    assert checks.CheckReport([checks.Check('A', True, 'ok'), checks.Check('B', True, 'ok')]).go
+    report = checks.CheckReport([checks.Check('A', True, 'ok'), checks.Check('B', False, 'failed')])
+    assert not report.go
+    assert report.summary().splitlines()[1].startswith('[NO-GO] B: failed')
+    assert checks.CheckReport([]).go
+
+
+# instruments shut down in parallel, each one waits for the others here, so a sequential shutdown would never finish
+class Instrument:
+
+    def __init__(self, barrier, error=None):
+        self.barrier = barrier
+        self.error = error
+
+    def step(self):
+        self.barrier.wait(timeout=5)
+        if self.error:
+            raise self.error
+        return 'safe'
+
+    safe_off = safe_reset = safe_stop = step
+
+
+def test_safe_state_in_parallel():
+    barrier = threading.Barrier(3)
+    report = shutdown.safe_state(Instrument(barrier), Instrument(barrier), Instrument(barrier))
+    assert report.go
+    assert [check.device for check in report.checks] == ['SPS', 'FSV', 'WKL']
+
+
+def test_safe_state_failure_and_no_chamber():
+    barrier = threading.Barrier(2)
+    report = shutdown.safe_state(fsv=Instrument(barrier), sps=Instrument(barrier, RuntimeError('output still on')), chamber=None)
+    assert not report.go
+    assert [(check.device, check.ok) for check in report.checks] == [('SPS', False), ('FSV', True)]
+    assert report.checks[0].detail == 'RuntimeError: output still on'
@@ -0,0 +1,109 @@
+"""
+file: tests of the live spectrum view: polling backoff of the trace poller and painting of the widget
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import os
+import numpy as np
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt5.QtWidgets')
+
+from PyQt5.QtWidgets import QApplication
+import spectrum_view
+
+FREQS = np.linspace(867e6, 869e6, 10001)
+
+
+# analyzer answering with the scripted traces (None while busy), the poller is stopped after the last one
+class FakeFSV:
+
+    def __init__(self, traces, poller=None):
+        self.connected = True
+        self.traces = list(traces)
+        self.poller = poller
+        self.intervals = []
+
+    def fetch_trace(self):
+        self.intervals.append(self.poller.interval)
+        trace = self.traces.pop(0)
+        if not self.traces:
+            self.poller.stop()
+        if isinstance(trace, Exception):
+            raise trace
+        return trace
+
+
+@pytest.fixture
+def poll(monkeypatch):
+    monkeypatch.setattr(spectrum_view, 'MIN_INTERVAL', 0.001)
+    monkeypatch.setattr(spectrum_view, 'MAX_INTERVAL', 0.008)
+
+    def poll(traces):
+        fsv = FakeFSV(traces)
+        poller = spectrum_view.TracePoller(fsv, width=100)
+        fsv.poller = poller
+        emitted = []
+        poller.trace_ready.connect(lambda freqs, levels: emitted.append((freqs, levels)))
+        poller.run()        # in the calling thread, returns once the poller is stopped
+        return fsv, poller, emitted
+    return poll
+
+
+# a busy analyzer doubles the interval up to the maximum, a trace brings it back to the duty cycle
+def test_backoff_while_busy(poll):
+    trace = (FREQS, np.full(len(FREQS), -80.0))
+    fsv, poller, emitted = poll([None, None, None, None, trace])
+    assert fsv.intervals == [0.001, 0.002, 0.004, 0.008, 0.008]
+    assert poller.interval < 0.008
+    assert len(emitted) == 1
+
+
+def test_failed_fetch_backs_off(poll):
+    fsv, poller, emitted = poll([ConnectionError('lost'), None])
+    assert fsv.intervals == [0.001, 0.002]
+    assert emitted == []
+
+
+# traces are decimated to the pixel width of the view without losing peaks
+def test_trace_decimated(poll):
+    levels = np.full(len(FREQS), -80.0)
+    levels[4321] = -5
+    _, _, emitted = poll([(FREQS, levels)])
+    freqs, decimated = emitted[0]
+    assert len(freqs) == len(decimated) == 200
+    assert decimated.max() == -5
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_view_paints(app):
+    view = spectrum_view.SpectrumView()
+    view.resize(400, 200)
+    assert not view.grab().isNull()         # without trace
+
+    view.set_trace(FREQS, np.full(len(FREQS), -60.0))
+    view.set_masks([[(867.5e6, -36), (868e6, 14), (868.5e6, -36)], []])
+    assert len(view.masks) == 1
+    image = view.grab().toImage()
+    assert image.width() == 400
+
+    view.clear()
+    assert view.freqs is None and view.masks == []
+
+
+# the view tells the attached poller its pixel width
+def test_view_sets_poller_width(app):
+    view = spectrum_view.SpectrumView()
+    view.resize(320, 200)
+    poller = spectrum_view.TracePoller(FakeFSV([]), width=600)
+    view.attach(poller)
+    assert poller.width == 320
+    view.set_trace(FREQS[:2], np.zeros(2))
+    poller.trace_ready.emit(FREQS, np.zeros(len(FREQS)))
+    assert len(view.freqs) == len(FREQS)
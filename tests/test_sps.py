@@ -0,0 +1,111 @@
+"""
+file: tests of the voltage programming of the SPS on a simulated supply, in particular the safe state after failed or interrupted changes
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import pytest
+import instrument
+import sps
+
+
+# supply whose output follows the programmed amplitude while the output is on, or stays at a stuck voltage
+class FakeSupply:
+
+    def __init__(self):
+        self.log = []
+        self.amplitude = 0.0
+        self.output = False
+        self.stuck = None
+
+    def open_resource(self, address, **kwargs):
+        return self
+
+    def write(self, command):
+        self.log.append(command)
+        if command.startswith('OSC:AMP'):
+            self.amplitude = float(command.split(',')[1][:-1])
+        elif command.startswith('AMP:OUTPUT'):
+            self.output = command.endswith('1')
+        elif command == 'DCL':
+            self.amplitude, self.output = 0.0, False
+
+    def query(self, command):
+        if command == 'MEAS:VOLT?':
+            if self.stuck is not None:
+                return str(self.stuck)
+            return str(self.amplitude if self.output else 0.0)
+        return '1'
+
+    def close(self):
+        pass
+
+
+# clock of the settling loop, every reading takes a second
+class FakeTime:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        self.now += 1
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def supply(monkeypatch):
+    fake = FakeSupply()
+    monkeypatch.setattr(instrument, 'resource_manager_factory', lambda: fake)
+    monkeypatch.setattr(sps, 'time', FakeTime())
+    monkeypatch.setattr(sps, 'sleep', lambda seconds: None)
+    device = sps.SPS('GPIB0::6::INSTR', 'GPIB0::3::INSTR')
+    device.wait = lambda seconds: device.check_stop()       # interruptible without waiting
+    return device
+
+
+def test_apply_dc_voltage(supply):
+    assert supply.apply_voltage(12)
+    fake = supply.rm
+    assert fake.output and fake.amplitude == 12
+    assert fake.log[0] == 'DCL' and fake.log[-1] == 'AMP:OUTPUT 1'
+    assert supply.applied == (12, None)
+    assert not supply.connected
+
+
+# within the same range and mode only the amplitude is changed on the live output
+def test_change_without_reset(supply):
+    supply.apply_voltage(12)
+    supply.rm.log.clear()
+    assert supply.apply_voltage(10.8)
+    assert supply.rm.log == ['OSC:AMP 1,10.8V']
+
+
+# stopped while ramping: the output is ramped down and switched off before the session is closed
+def test_interrupted_change_switches_output_off(supply):
+    supply.cancel_token.cancel()
+    assert supply.apply_voltage(12) is False
+    fake = supply.rm
+    assert fake.log[-2:] == ['OSC:AMP 1,0V', 'AMP:OUTPUT 0']
+    assert not fake.output and supply.applied is None
+    assert not supply.connected
+
+
+def test_voltage_not_settled_switches_output_off(supply, capfd):
+    supply.rm.stuck = 9.0
+    assert supply.apply_voltage(12) is False
+    assert supply.rm.log[-1] == 'AMP:OUTPUT 0'
+    assert not supply.rm.output and supply.applied is None
+    assert 'did not settle at 12 V' in capfd.readouterr().out
+
+
+# a live output that doesn't reach 0 V is never reset by DCL
+def test_no_reset_of_live_output(supply):
+    supply.apply_voltage(12)
+    supply.rm.log.clear()
+    supply.rm.stuck = 12.0
+    assert supply.apply_voltage(230, 50) is False
+    assert 'DCL' not in supply.rm.log
+    assert supply.rm.log[0] == 'OSC:AMP 1,0V' and supply.rm.log[-1] == 'AMP:OUTPUT 0'
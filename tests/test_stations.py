@@ -0,0 +1,91 @@
+"""
+file: tests of the job queue of the station pool, without instruments
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import pytest
+import stations
+
+
+def make_job(name, ac=False, measure_ex=False, temp_max='55', station=None):
+    inputs = {'project': name, 'ac': ac, 'measure_ex': measure_ex, 'temp_max': temp_max}
+    return stations.Job(inputs, name, station)
+
+
+class FakeChamber:
+
+    def __init__(self, temperature):
+        self.current_temp = temperature
+
+
+def make_station(name, capabilities=('dc',), temperature=None):
+    station = stations.Station(name, 'FSV', 'SPS', capabilities=capabilities)
+    if temperature is not None:
+        station.capabilities.add('chamber')
+        station.chamber = FakeChamber(temperature)
+    return station
+
+
+def test_requirements():
+    assert make_job('dc').requirements() == {'dc'}
+    assert make_job('ac', ac=True, measure_ex=True).requirements() == {'ac', 'chamber'}
+    assert make_job('ex', measure_ex=True, temp_max='40').start_temperature() == 40
+    assert make_job('normal').start_temperature() == stations.AMBIENT_TEMP
+
+
+def test_can_run():
+    station = make_station('A', ('ac', 'dc'))
+    assert station.can_run(make_job('ac', ac=True))
+    assert not station.can_run(make_job('ex', measure_ex=True))
+    assert not station.can_run(make_job('pinned', station='B'))
+    assert make_station('B', temperature=20).can_run(make_job('ex', measure_ex=True, station='B'))
+
+
+def test_submit_without_capable_station():
+    pool = stations.StationPool([make_station('A')], runner=None)
+    with pytest.raises(ValueError, match='No station can run job ac'):
+        pool.submit(make_job('ac', ac=True))
+    assert pool.pending == []
+
+
+# a station takes the job whose start temperature is closest to its chamber temperature, the oldest first among equals
+def test_take_closest_start_temperature():
+    pool = stations.StationPool([], runner=None)
+    for job in (make_job('normal 1'), make_job('hot', measure_ex=True, temp_max='55'), make_job('normal 2'), make_job('warm', measure_ex=True, temp_max='40')):
+        pool.pending.append(job)
+        job.sequence = next(pool.sequence)
+
+    station = make_station('A', temperature=50)
+    assert [pool._take(station).name for _ in range(2)] == ['hot', 'warm']
+    station.chamber.current_temp = 23
+    assert [pool._take(station).name for _ in range(2)] == ['normal 1', 'normal 2']
+
+
+# stations without a chamber take the jobs they can run in the order of submission
+def test_take_without_chamber():
+    pool = stations.StationPool([], runner=None)
+    for job in (make_job('ex', measure_ex=True), make_job('first'), make_job('second')):
+        pool.pending.append(job)
+        job.sequence = next(pool.sequence)
+
+    station = make_station('A')
+    assert pool._take(station).name == 'first'
+    assert pool._take(station).name == 'second'
+    pool.close()
+    assert pool._take(station) is None
+    assert [job.name for job in pool.pending] == ['ex']
+
+
+def test_load_stations(tmp_path):
+    filename = tmp_path / 'stations.csv'
+    filename.write_text('name,fsv_addr,sps_addr,ars_addr,wkl_ip,capabilities\n'
+                        'A,TCPIP0::1::INSTR,GPIB0::6::INSTR,,10.0.0.1,ac;dc\n'
+                        '\n'
+                        'B,TCPIP0::2::INSTR,GPIB0::7::INSTR,GPIB0::3::INSTR,,dc\n')
+    a, b = stations.load_stations(str(filename))
+    assert (a.name, a.capabilities, a.wkl_ip) == ('A', {'ac', 'dc', 'chamber'}, '10.0.0.1')
+    assert (b.name, b.capabilities, b.ars_addr) == ('B', {'dc'}, 'GPIB0::3::INSTR')
+
+    default, = stations.load_stations(str(tmp_path / 'missing.csv'))
+    assert default.name == 'default'
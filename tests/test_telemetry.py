@@ -0,0 +1,80 @@
+"""
+file: tests of the ring buffers of the telemetry sampler
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import numpy as np
+import telemetry
+
+
+def fill(buffer, count):
+    for i in range(count):
+        buffer.append(float(i), 10.0*i)
+
+
+def test_empty_buffer():
+    buffer = telemetry.RingBuffer(4)
+    assert buffer.latest() is None
+    times, values = buffer.snapshot()
+    assert len(times) == 0 and len(values) == 0
+
+
+def test_snapshot_before_wraparound():
+    buffer = telemetry.RingBuffer(4)
+    fill(buffer, 3)
+    times, values = buffer.snapshot()
+    np.testing.assert_array_equal(times, [0, 1, 2])
+    np.testing.assert_array_equal(values, [0, 10, 20])
+    assert buffer.latest() == (2.0, 20.0)
+
+
+# after wrapping around only the newest capacity samples remain, still in chronological order
+def test_snapshot_after_wraparound():
+    buffer = telemetry.RingBuffer(4)
+    fill(buffer, 10)
+    times, values = buffer.snapshot()
+    np.testing.assert_array_equal(times, [6, 7, 8, 9])
+    np.testing.assert_array_equal(values, [60, 70, 80, 90])
+    assert buffer.latest() == (9.0, 90.0)
+    assert buffer.count == 10
+
+
+def test_snapshot_since():
+    buffer = telemetry.RingBuffer(4)
+    fill(buffer, 10)
+    times, _ = buffer.snapshot(since=8)
+    np.testing.assert_array_equal(times, [8, 9])
+
+
+# samples overwritten while the reader copies are dropped instead of being returned out of order
+def test_snapshot_drops_samples_overwritten_while_copying(monkeypatch):
+    buffer = telemetry.RingBuffer(4)
+    fill(buffer, 4)
+    arange = np.arange
+
+    def overwriting_arange(*args):
+        buffer.append(4.0, 40.0)
+        buffer.append(5.0, 50.0)
+        return arange(*args)
+
+    monkeypatch.setattr(telemetry.np, 'arange', overwriting_arange)
+    times, _ = buffer.snapshot()
+    np.testing.assert_array_equal(times, [2, 3])
+
+
+class FakeSupply:
+
+    def __init__(self):
+        self.connected = False
+        self.voltage_listener = None
+
+
+# without an open session the supply is only sampled at the idle interval
+def test_sps_interval_follows_session():
+    sps = FakeSupply()
+    sampler = telemetry.TelemetrySampler(None, sps, sps_interval=1, sps_idle_interval=60, capacity=8)
+    assert sampler.current_sps_interval() == 60
+    sps.connected = True
+    assert sampler.current_sps_interval() == 1
+    assert sps.voltage_listener == sampler.buffers['sps_voltage'].append
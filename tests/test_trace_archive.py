@@ -0,0 +1,129 @@
+"""
+file: tests of the trace archive: float32 and int16 delta records, reopening and decimation for plots
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import os
+import numpy as np
+import pytest
+import trace_archive
+
+SETTINGS = {'rbw': 1000, 'vbw': 3000, 'detector': 'RMS'}
+
+
+def make_trace(points=1001, seed=0):
+    rng = np.random.default_rng(seed)
+    freqs = np.linspace(867e6, 869e6, points)
+    levels = (-80 + 5*rng.standard_normal(points)).astype(np.float32)
+    return freqs, levels
+
+
+def test_first_trace_is_float32(tmp_path):
+    archive = trace_archive.TraceArchive(str(tmp_path / 'traces'))
+    freqs, levels = make_trace()
+    record = archive.append(freqs, levels, 'obw', 'nominal', 868e6, SETTINGS)
+
+    assert record == 0
+    assert archive.index['encoding'][0] == trace_archive.FLOAT32
+    assert archive.index['reference'][0] == -1
+    np.testing.assert_array_equal(archive.levels(0), levels)
+    np.testing.assert_allclose(archive.freqs(0), freqs)
+
+
+# a later trace with the same label and frequency axis is stored as int16 delta and read back within half a delta step
+def test_delta_round_trip(tmp_path):
+    archive = trace_archive.TraceArchive(str(tmp_path / 'traces'))
+    freqs, reference = make_trace(seed=0)
+    _, levels = make_trace(seed=1)
+    archive.append(freqs, reference, 'obw', 'nominal', 868e6, SETTINGS)
+    record = archive.append(freqs, levels, 'obw', 'maxtemp_minvolt', 868e6, SETTINGS)
+
+    assert archive.index['encoding'][record] == trace_archive.DELTA16
+    assert archive.index['reference'][record] == 0
+    assert os.path.getsize(archive.delta_file) == 2*len(levels)
+    np.testing.assert_allclose(archive.levels(record), levels, atol=trace_archive.DELTA_STEP/2 + 1e-4)
+
+
+def test_other_label_or_axis_is_float32(tmp_path):
+    archive = trace_archive.TraceArchive(str(tmp_path / 'traces'))
+    freqs, levels = make_trace()
+    archive.append(freqs, levels, 'obw', 'nominal', 868e6, SETTINGS)
+    other_label = archive.append(freqs, levels, 'oob_oc', 'nominal', 868e6, SETTINGS)
+    other_axis = archive.append(freqs + 1e6, levels, 'obw', 'nominal', 869e6, SETTINGS)
+
+    assert archive.index['encoding'][other_label] == trace_archive.FLOAT32
+    assert archive.index['encoding'][other_axis] == trace_archive.FLOAT32
+
+
+# traces evaluated against a mask are kept bit-exact
+def test_lossless_is_float32(tmp_path):
+    archive = trace_archive.TraceArchive(str(tmp_path / 'traces'))
+    freqs, reference = make_trace(seed=0)
+    _, levels = make_trace(seed=1)
+    archive.append(freqs, reference, 'oob_oc', 'nominal', 868e6, SETTINGS)
+    record = archive.append(freqs, levels, 'oob_oc', 'minvolt', 868e6, SETTINGS, lossless=True)
+
+    assert archive.index['encoding'][record] == trace_archive.FLOAT32
+    np.testing.assert_array_equal(archive.levels(record), levels)
+
+
+# differences beyond the int16 range or not finite fall back to float32
+@pytest.mark.parametrize('change', [400.0, np.inf])
+def test_large_difference_is_float32(tmp_path, change):
+    archive = trace_archive.TraceArchive(str(tmp_path / 'traces'))
+    freqs, reference = make_trace()
+    levels = reference.copy()
+    levels[10] += change
+    archive.append(freqs, reference, 'obw', 'nominal', 868e6, SETTINGS)
+    record = archive.append(freqs, levels, 'obw', 'minvolt', 868e6, SETTINGS)
+
+    assert archive.index['encoding'][record] == trace_archive.FLOAT32
+    np.testing.assert_array_equal(archive.levels(record), levels)
+
+
+def test_reopen_and_select(tmp_path):
+    directory = str(tmp_path / 'traces')
+    archive = trace_archive.TraceArchive(directory)
+    freqs, levels = make_trace()
+    archive.append(freqs, levels, 'obw', 'nominal', 868e6, SETTINGS)
+    archive.append(freqs, levels - 1, 'obw', 'minvolt', 868e6, SETTINGS)
+    archive.append(freqs, levels, 'oob_oc', 'nominal', 868e6, SETTINGS)
+
+    reopened = trace_archive.TraceArchive(directory)
+    assert len(reopened) == 3
+    assert list(reopened.select(label='obw')) == [0, 1]
+    assert list(reopened.select(condition='nominal')) == [0, 2]
+    assert reopened.index['detector'][0] == b'RMS'
+    np.testing.assert_allclose(reopened.levels(1), levels - 1, atol=trace_archive.DELTA_STEP)
+
+
+# every run gets a directory of its own, also when started within the same second
+def test_run_directory_is_unused(tmp_path):
+    base = str(tmp_path / 'x_Traces')
+    first = trace_archive.run_directory(base)
+    os.makedirs(first)
+    second = trace_archive.run_directory(base)
+
+    assert first.startswith(base + '_')
+    assert second != first
+    assert not os.path.exists(second)
+
+
+def test_decimate_keeps_extremes():
+    freqs = np.arange(10000, dtype=float)
+    levels = np.zeros(10000, dtype=np.float32)
+    levels[1234] = 50
+    levels[8765] = -50
+    out_freqs, out_levels = trace_archive.decimate_minmax(freqs, levels, 100)
+
+    assert len(out_freqs) == len(out_levels) == 200
+    assert out_levels.max() == 50 and out_levels.min() == -50
+    assert np.all(np.diff(out_freqs) >= 0)
+
+
+def test_decimate_short_trace_unchanged():
+    freqs = np.arange(100, dtype=float)
+    levels = np.arange(100, dtype=np.float32)
+    out_freqs, out_levels = trace_archive.decimate_minmax(freqs, levels, 100)
+    assert out_freqs is freqs and out_levels is levels
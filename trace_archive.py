@@ -0,0 +1,171 @@
+"""
+file: append-only archive of raw analyzer traces with memory-mapped access for offline re-evaluation
+author: rueck.joshua@gmail.com
+last updated: 19/10/2026
+"""
+
+import os
+import time
+import numpy as np
+import tags
+
+DELTA_STEP = 0.01           # in dB, resolution of traces stored as difference to a reference trace (not used for traces evaluated against a mask)
+
+# one record per trace, appended to the index file after the trace data has been written
+INDEX_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('label', 'S32'),           # measurement step, e.g. obw, oob_oc, oob_ofb_left
+    ('condition', 'S32'),       # plateau, e.g. nominal, maxtemp_minvolt
+    ('channel', '<f8'),         # centre frequency of the measured operating channel
+    ('start', '<f8'),
+    ('stop', '<f8'),
+    ('points', '<i4'),
+    ('rbw', '<f8'),
+    ('vbw', '<f8'),
+    ('detector', 'S8'),
+    ('encoding', 'u1'),         # 0: float32 in the trace file, 1: int16 delta to the reference record in the delta file
+    ('offset', '<i8'),          # in samples of the respective data file
+    ('reference', '<i4')        # record of the float32 reference trace, -1 for float32 traces
+])
+
+FLOAT32 = 0
+DELTA16 = 1
+
+
+# reduce a trace to the minimum and maximum of each pixel column so that no peak gets lost. returns interleaved (freqs, levels)
+def decimate_minmax(freqs, levels, width):
+    n = len(levels)
+    if width <= 0 or n <= 2*width:
+        return freqs, levels
+
+    edges = np.linspace(0, n, width + 1).astype(int)[:-1]
+    mins = np.minimum.reduceat(levels, edges)
+    maxs = np.maximum.reduceat(levels, edges)
+    centres = freqs[np.minimum(edges + (n // width) // 2, n - 1)]
+
+    out_freqs = np.repeat(centres, 2)
+    out_levels = np.empty(2*len(edges), dtype=levels.dtype)
+    out_levels[0::2] = mins
+    out_levels[1::2] = maxs
+    return out_freqs, out_levels
+
+
+# unused directory for the archive of a new run, named from the base and the start time. every run has its own archive so that the report of a
+# run never shows traces of an earlier run of the same project on the same day
+def run_directory(base):
+    directory = candidate = base + time.strftime('_%H-%M-%S')
+    number = 1
+    while os.path.exists(candidate):
+        number += 1
+        candidate = f'{directory}_{number}'
+    return candidate
+
+
+# archive in a directory of three files: float32 traces, int16 deltas and the structured index
+class TraceArchive:
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.trace_file = os.path.join(directory, 'traces.f32')
+        self.delta_file = os.path.join(directory, 'deltas.i16')
+        self.index_file = os.path.join(directory, 'index.bin')
+        for filepath in (self.trace_file, self.delta_file, self.index_file):
+            open(filepath, 'ab').close()
+        self.index = np.fromfile(self.index_file, dtype=INDEX_DTYPE)
+
+    ### WRITING
+    # append a trace with its settings, traces with the same label and frequency axis as an earlier one are stored as delta. lossless traces
+    # (e.g. evaluated against a mask for a verdict) are always stored as float32 so that the archived levels reproduce the margin. returns the record number
+    def append(self, freqs, levels, label, condition, channel, settings, lossless=False):
+        levels = np.asarray(levels, dtype=np.float32)
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record['timestamp'] = time.time()
+        record['label'] = label.encode()
+        record['condition'] = condition.encode()
+        record['channel'] = channel
+        record['start'] = freqs[0]
+        record['stop'] = freqs[-1]
+        record['points'] = len(levels)
+        record['rbw'] = settings.get('rbw', np.nan)
+        record['vbw'] = settings.get('vbw', np.nan)
+        record['detector'] = settings.get('detector', '').encode()[:8]
+
+        reference = None if lossless else self._find_reference(record[0])
+        delta = None
+        if reference is not None:
+            delta = np.round((levels - self.levels(reference)) / DELTA_STEP)
+            if not np.all(np.isfinite(delta)) or np.abs(delta).max() > np.iinfo(np.int16).max:
+                delta = None        # difference too large (or not finite) for the delta encoding, store in full
+
+        if delta is None:
+            record['encoding'] = FLOAT32
+            record['reference'] = -1
+            record['offset'] = self._append_data(self.trace_file, levels)
+        else:
+            record['encoding'] = DELTA16
+            record['reference'] = reference
+            record['offset'] = self._append_data(self.delta_file, delta.astype(np.int16))
+
+        # index written last, readers never see a record without its data
+        with open(self.index_file, 'ab') as f:
+            record.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.index = np.concatenate([self.index, record])
+
+        tags.log('Trace Archive', f'Trace {label} ({condition}) archived as record {len(self.index) - 1}.')
+        return len(self.index) - 1
+
+    # first float32 trace with same label and frequency axis
+    def _find_reference(self, record):
+        matches = np.flatnonzero((self.index['encoding'] == FLOAT32) & (self.index['label'] == record['label'])
+                                 & (self.index['start'] == record['start']) & (self.index['stop'] == record['stop'])
+                                 & (self.index['points'] == record['points']))
+        return int(matches[0]) if len(matches) else None
+
+    # append samples to a data file, returns the offset in samples
+    def _append_data(self, filepath, samples):
+        with open(filepath, 'ab') as f:
+            offset = f.tell() // samples.itemsize
+            samples.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        return offset
+
+    ### READING
+    def __len__(self):
+        return len(self.index)
+
+    # reload the index, e.g. while a running measurement appends to the archive
+    def refresh(self):
+        self.index = np.fromfile(self.index_file, dtype=INDEX_DTYPE)
+
+    # record numbers matching the given label, condition and/or channel
+    def select(self, label=None, condition=None, channel=None):
+        mask = np.ones(len(self.index), dtype=bool)
+        if label is not None:
+            mask &= self.index['label'] == label.encode()
+        if condition is not None:
+            mask &= self.index['condition'] == condition.encode()
+        if channel is not None:
+            mask &= self.index['channel'] == channel
+        return np.flatnonzero(mask)
+
+    def freqs(self, i):
+        record = self.index[i]
+        return np.linspace(record['start'], record['stop'], record['points'])
+
+    # levels of a record, float32 traces are returned as read-only view into the memory-mapped file without copy
+    def levels(self, i):
+        record = self.index[i]
+        if record['encoding'] == FLOAT32:
+            return self._map(self.trace_file, np.float32, record['offset'], record['points'])
+        delta = self._map(self.delta_file, np.int16, record['offset'], record['points'])
+        return self.levels(record['reference']) + delta.astype(np.float32) * np.float32(DELTA_STEP)
+
+    def trace(self, i):
+        return self.freqs(i), self.levels(i)
+
+    def _map(self, filepath, dtype, offset, points):
+        return np.memmap(filepath, dtype=dtype, mode='r', offset=int(offset) * np.dtype(dtype).itemsize, shape=(int(points),))
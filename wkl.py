@@ -1,10 +1,11 @@
 """
 file: implementation of class for climatic test chamber based on work by Matias Senger on GitHub
 author: rueck.joshua@gmail.com
-last updated: 02/08/2024
+last updated: 19/10/2026
 """
 
 import socket
+import time
 from threading import RLock
 import tags
 from time import sleep
@@ -19,23 +20,45 @@ cmd_start = b'14001\xb61\xb61\xb61\r'
 cmd_stop = b'14001\xb61\xb61\xb60\r'
 cmd_getrunning = b'14003\xb61\xb61\r'
 
+# factory of the chamber socket, replaced by cassette.py to record or replay sessions
+socket_factory = socket.socket
+
+# temperature range of the chamber in °C
+TEMPERATURE_MIN = -40
+TEMPERATURE_MAX = 180
+
 class WKL:
 
     # initialize instance and communication with device via direct socket connection
     def __init__(self, ip: str, timeout=1):
         self.communication_lock = RLock()
-        self.temperature_min = -40
-        self.temperature_max = 180
+        self.temperature_min = TEMPERATURE_MIN
+        self.temperature_max = TEMPERATURE_MAX
+        self.ip = ip
+        self.timeout = timeout
+        self.setpoint = None            # last set temperature and running state, replayed after a lost connection
+        self.running = False
+        self.last_activity = 0.0        # monotonic timestamp of last successful communication
+        self._open_socket()
+
+    # open socket connection to the chamber
+    def _open_socket(self):
         with self.communication_lock:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((ip, 2049))
-            self.socket.settimeout(timeout)
+            self.socket = socket_factory(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.settimeout(self.timeout)     # set before connecting so an unreachable chamber fails within the timeout
+            self.socket.connect((self.ip, 2049))
+
+    # close the socket connection to the chamber
+    def close(self):
+        with self.communication_lock:
+            self.socket.close()
 
     # helper function for low level communication with climate chamber
     def _send_and_receive(self, command):
         with self.communication_lock:
             self.socket.send(command)
             response_raw = self.socket.recv(512)
+            self.last_activity = time.monotonic()
         response = response_raw.decode('utf-8', errors='backslashreplace').replace('\\xb6', '¶').replace('\r\n', '')
         return response.split('¶')[1:]
 
@@ -72,6 +95,7 @@ class WKL:
             cmd = cmd_settmp + f'{temp}'.encode('ascii') + b'\r'
             with self.communication_lock:
                 self.socket.send(cmd)
+            self.setpoint = temp
             tags.log('WKL', f'Temperature set to {temp} °C.')
             return True
         else:
@@ -83,6 +107,7 @@ class WKL:
             self.socket.send(cmd_start)
             response_raw = self.socket.recv(512)    # two socket reads to clear buffer, turned out to be necessary during testing
             response_raw = self.socket.recv(512)
+            self.running = True
             tags.log('WKL', 'Climate chamber turned on.')
             sleep(1)
 
@@ -91,5 +116,44 @@ class WKL:
         with self.communication_lock:
             self.socket.send(cmd_stop)
             response_raw = self.socket.recv(512)    # socket read to clear buffer
+            self.running = False
             tags.log('WKL', 'Climate chamber turned off.')
-            sleep(1)
\ No newline at end of file
+            sleep(1)
+
+    # stop chamber if running and verify by readback, raises if the chamber is still running
+    def safe_stop(self):
+        if self.is_running:
+            self.stop()
+            if self.is_running:
+                raise RuntimeError('Chamber still running after stop command')
+            return f'stopped at {self.current_temp:.1f} °C'
+        return 'not running'
+
+    ### CONNECTION WATCHDOG
+    # check if the socket connection is alive, returns False if the socket is busy with another request
+    def heartbeat(self, timeout=1500):
+        if not self.communication_lock.acquire(timeout=timeout/1000):
+            return False
+        try:
+            self.is_running
+            return True
+        finally:
+            self.communication_lock.release()
+
+    # replace a dead socket by a new connection
+    def reconnect(self):
+        with self.communication_lock:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self._open_socket()
+            self.is_running
+
+    # re-apply set temperature and running state after the connection was lost
+    def restore_state(self):
+        if self.setpoint is not None:
+            self.set_temp(self.setpoint)
+        if self.running and not self.is_running:
+            self.start()
+        tags.log('WKL', 'Chamber state restored after reconnect.')